@@ -1,6 +1,7 @@
 # Django_Playground/DjangoPlayground/DjangoPlayground/settings_base.py
 import os
 from pathlib import Path
+from urllib.parse import urlsplit
 
 BASE_DIR = Path(__file__).resolve().parent.parent  # dir containing manage.py
 
@@ -16,6 +17,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Request id, timing and acting user for signals and logging (contextvars;
+    # first, so its timing covers the rest).
+    "firstsite.middleware.RequestContextMiddleware",
     "django.middleware.security.SecurityMiddleware",
     # Serves collected static files directly from the app process (no separate
     # web server needed) — used in prod; harmless in dev, where runserver's
@@ -25,8 +29,8 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
-    # Attaches request.user to thread-local storage so signals can log the actor.
-    "firstsite.middleware.CurrentUserMiddleware",
+    # Re-saves the session only when its expiry is due a refresh (see below).
+    "firstsite.middleware.SessionRefreshMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -47,16 +51,130 @@ TEMPLATES = [{
 
 WSGI_APPLICATION = "DjangoPlayground.wsgi.application"
 
+def sqlite_options(profile):
+    """
+    SQLite connection OPTIONS for a profile. "production" sets, on every new
+    connection: WAL (readers no longer wait for writers), synchronous=NORMAL
+    (safe with WAL, syncs at checkpoints instead of every commit), a memory
+    map, a bigger page cache and a busy timeout so a writer waits for the lock
+    instead of failing. It also starts transactions with BEGIN IMMEDIATE:
+    with the default (DEFERRED), two transactions that read and then write
+    can't both upgrade their lock, and one fails at once with "database is
+    locked" whatever the timeout. Each value can be overridden from env.
+    """
+    if profile != "production":
+        return {}
+    pragmas = {
+        "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+        "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "mmap_size": os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+        "cache_size": os.environ.get("SQLITE_CACHE_SIZE", "-32000"),  # negative: KiB
+        "busy_timeout": os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"),
+    }
+    return {
+        "init_command": ";".join(f"PRAGMA {name}={value}" for name, value in pragmas.items()),
+        "transaction_mode": os.environ.get("SQLITE_TRANSACTION_MODE", "IMMEDIATE"),
+    }
+
+def postgres_options(pool):
+    """
+    PostgreSQL connection OPTIONS. With `pool`, Django 5.1+ keeps a psycopg
+    connection pool per worker (needs `psycopg[pool]`): a request borrows an
+    open connection and returns it at the end, instead of a new
+    connect + auth (+ TLS) handshake every time.
+    """
+    if not pool:
+        return {}
+    return {"pool": {
+        "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", "2")),
+        "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", "10")),
+        "timeout": float(os.environ.get("DB_POOL_TIMEOUT", "10")),  # seconds to wait for a free one
+    }}
+
+def conn_max_age(value):
+    """DB_CONN_MAX_AGE: seconds, or "none" for unlimited."""
+    return None if value.lower() == "none" else int(value)
+
+# SQLITE_PROFILE=production (docker-compose.prod.yml) tunes SQLite for
+# several gunicorn workers writing at once; see sqlite_options above.
+DB_ENGINE = os.environ.get("DB_ENGINE", "django.db.backends.sqlite3")
+SQLITE_PROFILE = os.environ.get("SQLITE_PROFILE", "default")
+# Connection reuse (compare with `manage.py bench_db_connect`): a worker keeps
+# its connection for DB_CONN_MAX_AGE seconds across requests instead of
+# reconnecting per request (0), and with DB_CONN_HEALTH_CHECKS pings it
+# before reusing it so a dropped connection doesn't fail the request.
+# DB_POOL=true (PostgreSQL only) uses a connection pool instead; pooled
+# connections are never persistent, so CONN_MAX_AGE is 0 then. It is 0 under
+# ASGI too (APP_SERVER=asgi, docker/entrypoint.prod.sh): the sync parts of
+# each request run on a thread of their own, and a persistent connection
+# left on a thread that no later request uses is never closed.
+APP_SERVER = os.environ.get("APP_SERVER", "wsgi")
+DB_POOL = os.environ.get("DB_POOL", "false").lower() == "true" and DB_ENGINE.endswith("postgresql")
+if DB_ENGINE.endswith("sqlite3"):
+    DB_OPTIONS = sqlite_options(SQLITE_PROFILE)
+elif DB_ENGINE.endswith("postgresql"):
+    DB_OPTIONS = postgres_options(DB_POOL)
+else:
+    DB_OPTIONS = {}
+
 DATABASES = {
     "default": {
-        "ENGINE": os.environ.get("DB_ENGINE", "django.db.backends.sqlite3"),
+        "ENGINE": DB_ENGINE,
         "NAME": os.environ.get("DB_NAME", BASE_DIR / "db.sqlite3"),
         "USER": os.environ.get("DB_USER", ""),
         "PASSWORD": os.environ.get("DB_PASS", ""),
         "HOST": os.environ.get("DB_HOST", ""),
         "PORT": os.environ.get("DB_PORT", ""),
+        "OPTIONS": DB_OPTIONS,
+        "CONN_MAX_AGE": (0 if DB_POOL or APP_SERVER == "asgi"
+                         else conn_max_age(os.environ.get("DB_CONN_MAX_AGE", "60"))),
+        "CONN_HEALTH_CHECKS": os.environ.get("DB_CONN_HEALTH_CHECKS", "true").lower() == "true",
+    }
+}
+
+
+def cache_from_url(url, max_entries=10000):
+    """
+    CACHES["default"] from a URL:
+      locmem://[name]          per-process memory (default; dev and tests)
+      file:///path/to/dir      files, shared by the workers on one host
+      redis://host:6379/0      shared (rediss:// for TLS); needs `redis`
+      memcached://host:11211   shared; needs `pymemcache`
+    """
+    parts = urlsplit(url)
+    if parts.scheme == "locmem":
+        return {"BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": parts.netloc or "default",
+                "OPTIONS": {"MAX_ENTRIES": max_entries}}
+    if parts.scheme == "file":
+        return {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": parts.path,
+                "OPTIONS": {"MAX_ENTRIES": max_entries}}
+    if parts.scheme in ("redis", "rediss"):
+        return {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": url}
+    if parts.scheme == "memcached":
+        return {"BACKEND": "django.core.cache.backends.memcached.PyMemcacheCache",
+                "LOCATION": parts.netloc}
+    raise ValueError(f"Unsupported CACHE_URL scheme: {parts.scheme!r}")
+
+# Cache backend (firstsite/caching.py). Every gunicorn worker has its own
+# locmem cache, so use a Redis/Memcached URL (or file://, whose add/incr
+# aren't atomic; see firstsite/caching.py) to share one between workers.
+# CACHE_TIMEOUT is the default entry lifetime in seconds (callers can set
+# their own), CACHE_MAX_ENTRIES bounds the locmem and file caches, and
+# CACHE_KEY_PREFIX keeps deployments sharing one server apart.
+CACHE_URL = os.environ.get("CACHE_URL", "locmem://")
+CACHES = {
+    "default": {
+        **cache_from_url(CACHE_URL,
+                         int(os.environ.get("CACHE_MAX_ENTRIES", "10000"))),
+        "TIMEOUT": int(os.environ.get("CACHE_TIMEOUT", "300")),
+        "KEY_PREFIX": os.environ.get("CACHE_KEY_PREFIX", ""),
     }
 }
+# Longest a caller computing a missing entry holds off the others asking for
+# it (caching.get_or_compute); they compute themselves after that.
+CACHE_LOCK_TIMEOUT = int(os.environ.get("CACHE_LOCK_TIMEOUT", "10"))
 
 LANGUAGE_CODE = "en-us"
 TIME_ZONE = "UTC"
@@ -81,6 +199,71 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Part of every ETag (firstsite/conditional.py) and note card cache key
+# (templatetags/note_cards.py); change it (e.g. to the release id) when
+# templates change so browsers and the cache stop serving old pages.
+ETAG_VERSION = os.environ.get("ETAG_VERSION", "1")
+
+# Note list page cache (firstsite/listcache.py): seconds an entry lives (0
+# turns it off) and how many cached pages each user can have at once. Off by
+# default with a per-process locmem cache: a write handled by one worker bumps
+# the generation in that worker's cache only, and the others would keep
+# serving the old page until it expired.
+NOTE_LIST_CACHE_TTL = int(os.environ.get(
+    "NOTE_LIST_CACHE_TTL", "0" if urlsplit(CACHE_URL).scheme == "locmem" else "300"))
+NOTE_LIST_CACHE_SLOTS = int(os.environ.get("NOTE_LIST_CACHE_SLOTS", "32"))
+
+# Seconds a rendered note card stays cached (templatetags/note_cards.py)
+NOTE_CARD_CACHE_TTL = int(os.environ.get("NOTE_CARD_CACHE_TTL", "86400"))
+
+# Per-worker LRU of rendered note Markdown (templatetags/markdown_extras.py)
+MARKDOWN_CACHE_SIZE = int(os.environ.get("MARKDOWN_CACHE_SIZE", "512"))
+
+# NoteVersion storage (firstsite/versioning.py): "delta" keeps a full keyframe
+# every NOTE_VERSION_KEYFRAME_INTERVAL versions and line diffs in between;
+# "full" stores every version's complete text.
+NOTE_VERSION_STORAGE = os.environ.get("NOTE_VERSION_STORAGE", "delta")
+NOTE_VERSION_KEYFRAME_INTERVAL = int(os.environ.get("NOTE_VERSION_KEYFRAME_INTERVAL", "10"))
+
+# NoteEvent writes (firstsite/events.py): "sync" inserts each event in the
+# request; "buffered" queues them and bulk-inserts from a background thread.
+NOTE_EVENT_SINK = os.environ.get("NOTE_EVENT_SINK", "sync")
+NOTE_EVENT_BUFFER_SIZE = int(os.environ.get("NOTE_EVENT_BUFFER_SIZE", "1000"))
+NOTE_EVENT_FLUSH_BATCH = int(os.environ.get("NOTE_EVENT_FLUSH_BATCH", "100"))
+NOTE_EVENT_FLUSH_INTERVAL = float(os.environ.get("NOTE_EVENT_FLUSH_INTERVAL", "2.0"))
+# Failed flushes in a row before a batch is written event by event and the
+# events that still fail are dropped (logged), so one bad row can't block the queue.
+NOTE_EVENT_MAX_ATTEMPTS = int(os.environ.get("NOTE_EVENT_MAX_ATTEMPTS", "5"))
+
+# The app's log lines carry the request id, user and ms since the request
+# started (firstsite.middleware.RequestContextFilter). LOG_LEVEL=INFO adds one
+# line per request with its status and duration (logger firstsite.requests).
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "filters": {
+        "request_context": {"()": "firstsite.middleware.RequestContextFilter"},
+    },
+    "formatters": {
+        "request": {
+            "format": "%(levelname)s %(name)s [%(request_id)s %(username)s +%(elapsed_ms)sms] %(message)s",
+        },
+    },
+    "handlers": {
+        "firstsite": {
+            "class": "logging.StreamHandler",
+            "filters": ["request_context"],
+            "formatter": "request",
+        },
+    },
+    "loggers": {
+        "firstsite": {
+            "handlers": ["firstsite"],
+            "level": os.environ.get("LOG_LEVEL", "WARNING"),
+        },
+    },
+}
+
 LOGIN_URL = "login"
 LOGIN_REDIRECT_URL = "note_lists"
 LOGOUT_REDIRECT_URL = "login"
@@ -88,4 +271,17 @@ LOGOUT_REDIRECT_URL = "login"
 # Session settings (CustomLoginView "remember me" reads SESSION_COOKIE_AGE)
 SESSION_COOKIE_AGE = 60 * 60 * 24 * 14   # 2 weeks
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False  # allow persistent cookies
-SESSION_SAVE_EVERY_REQUEST = True        # refresh expiry on every request
+# Expiry is refreshed by firstsite.middleware.SessionRefreshMiddleware instead:
+# an unchanged session is re-saved once at most SESSION_REFRESH_FRACTION of
+# its lifetime is left (1 = every request, the old behaviour; 0 = never).
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_FRACTION = float(os.environ.get("SESSION_REFRESH_FRACTION", "0.5"))
+# Where sessions live: "db" (default), "cached_db" (reads served from the
+# cache; only correct with a shared CACHE_URL, not per-worker locmem) or
+# "signed_cookies" (no server-side storage; the data is signed, not
+# encrypted, and must stay under ~4 KB).
+SESSION_ENGINE = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}[os.environ.get("SESSION_BACKEND", "db")]
@@ -1,7 +1,16 @@
 import pytest
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from firstsite.models import Note, Tag
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """
+    Start every test with an empty cache: user ids repeat between tests,
+    so cached list pages (firstsite/listcache.py) would leak into the next one.
+    """
+    cache.clear()
+
 @pytest.fixture
 def user(db):
     """
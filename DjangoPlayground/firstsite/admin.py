@@ -1,7 +1,23 @@
 from django.contrib import admin
+
+from . import versioning
 from .models import Note, NoteVersion, Tag
 
 # Register your models here.
 admin.site.register(Note)
 admin.site.register(Tag)
-admin.site.register(NoteVersion)
+
+
+@admin.register(NoteVersion)
+class NoteVersionAdmin(admin.ModelAdmin):
+    # Deltas are built on earlier versions: repack around the deleted ones
+    # instead of refusing (versioning.delete_versions).
+    def get_deleted_objects(self, objs, request):
+        deleted, model_count, perms_needed, _ = super().get_deleted_objects(objs, request)
+        return deleted, model_count, perms_needed, []  # only later versions, repacked
+
+    def delete_model(self, request, obj):
+        versioning.delete_versions([obj])
+
+    def delete_queryset(self, request, queryset):
+        versioning.delete_versions(queryset)
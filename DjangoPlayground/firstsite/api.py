@@ -1,17 +1,31 @@
+import base64
+import binascii
+import json
+import zipfile
+from datetime import datetime
 from math import ceil
 
 from django.shortcuts import get_object_or_404
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
 from django.core.paginator import Paginator
-from django.db.models import Q, Count
-from django.db.models.functions import TruncDay, TruncWeek, TruncMonth, TruncYear
+from django.db import connection
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from .utils import attach_actor, log_note_event, copy_tags_for_recipient
-from .models import Note, NoteVersion, Tag, NoteSend, NoteEvent
+from .utils import attach_actor
+from .versioning import snapshot_note, resolve_many
+from .conditional import conditional, api_note_validators, api_version_validators
+from .models import Note, NoteVersion, Tag, NoteSend
 from .serializers import NoteSerializer, TagSerializer, NoteVersionSerializer
+from . import search as note_search
+from . import batch, export, importing, rollup, sending, sync
 
 """
 To generate tokens for users, you can use the following command in your terminal:
@@ -29,57 +43,16 @@ Have fun!
 def api_user_notes(request):
     if request.method == 'GET':
         """
-        Retrieve all notes for the authenticated user and support tag filtering.
+        Retrieve the authenticated user's notes, one cursor page at a time.
+        Filters: ?tag=, ?untagged=1, ?search=, ?pinned=, ?archived=
+        Paging:  ?limit= (default 50, max 200), ?cursor=<next_cursor from the previous page>
         """
 
-        # Get the tag ID from the query parameters
-        tag_id = request.query_params.get('tag')
-
-        # Support search with no taggs.
-        untagged = request.query_params.get('untagged') == '1'
-        
-        # Query search 
-        search_query = request.query_params.get('search')
-
-        # Filter notes by tag if tag_id is provided
-        notes = Note.objects.filter(owner=request.user)
-
-        # pinned requests, we need to have 'notes' defined before we filter it.
-        pinned = request.query_params.get('pinned')
-
-        if pinned == '1':
-            notes = notes.filter(is_pinned=True)
-        elif pinned == '0':
-            notes = notes.filter(is_pinned=False)
-            
-        # achieved via query parameters.
-        archived = request.query_params.get('archived')
-
-        if archived == '1':
-            notes = notes.filter(is_archived=True)
-        elif archived == '0':
-            notes = notes.filter(is_archived=False)
-
-
-        if tag_id:
-            # Filter notes by tag if tag_id is provided
-            try:
-                tag = Tag.objects.get(id=tag_id, owner=request.user)
-                notes = notes.filter(tags=tag)
-            except Tag.DoesNotExist:
-                notes = Note.objects.none()
-        elif untagged:
-            notes = notes.filter(tags__isnull=True)
-
-        if search_query:
-            notes = notes.filter(
-                Q(title__icontains=search_query) | Q(content__icontains=search_query)
-                )
-
-        # Lastly, order notes by creation date (newest first)
-        notes = notes.order_by('-created_at')
-        serializer = NoteSerializer(notes, many=True)
-        return Response(serializer.data)
+        try:
+            notes, limit = _notes_list_query(request)
+        except ValueError:
+            return Response({'detail': 'Invalid cursor.'}, status=400)
+        return Response(_notes_page(list(notes[:limit + 1]), limit))
 
     elif request.method == 'POST':
         """
@@ -105,6 +78,7 @@ def api_user_notes(request):
 # API endpoint to retrieve a specific note
 @api_view(['GET', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
+@conditional(api_note_validators)  # GET only: ETag/Last-Modified -> 304
 def api_note_detail(request, pk):
     """
     Retrieve a specific note for the authenticated user.
@@ -119,12 +93,7 @@ def api_note_detail(request, pk):
     
     elif request.method == 'PUT':
         # snapshot first for versioning
-        NoteVersion.objects.create(
-        note=note,
-        title=note.title,
-        content=note.content,
-        updated_by=request.user
-        )
+        snapshot_note(note, request.user)
 
         #  Update the note details
         serializer = NoteSerializer(note, data=request.data)
@@ -146,6 +115,133 @@ def api_note_detail(request, pk):
         # NoteEvent('delete') is logged automatically by the post_delete signal.
         return Response(status=204)
 
+# Delta sync endpoint (offline clients)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def api_note_changes(request):
+    """
+    GET /api/notes/changes/?since=<next_cursor>&limit=100
+    Notes created/updated after the cursor, oldest change first, plus
+    tombstones for trashed and purged notes (see sync.py). Omit `since` for a
+    full initial sync. Keep the returned next_cursor and poll with it; it stays
+    the same when nothing changed.
+      {"results": [
+          {"id": 5, "change": "upsert", "at": "...", "note": {...}},
+          {"id": 7, "change": "deleted", "reason": "trashed", "at": "..."},
+          {"id": 3, "change": "deleted", "reason": "purged", "at": "..."}],
+       "next_cursor": "...", "has_more": false}
+    """
+    limit = _parse_limit(request, CHANGES_PAGE_DEFAULT, CHANGES_PAGE_MAX)
+    cursor = None
+    if request.GET.get('since'):
+        try:
+            cursor = sync.decode_cursor(request.GET['since'])
+        except ValueError:
+            return Response({'detail': 'Invalid cursor.'}, status=400)
+
+    entries, next_cursor, has_more = sync.changes(request.user, cursor, limit)
+    results = []
+    for stamp, stream, _, obj in entries:
+        if stream == sync.TOMBSTONES:
+            results.append({'id': obj.note_id, 'change': 'deleted', 'reason': 'purged', 'at': stamp})
+        elif obj.deleted_at is not None:
+            results.append({'id': obj.pk, 'change': 'deleted', 'reason': 'trashed', 'at': stamp})
+        else:
+            results.append({'id': obj.pk, 'change': 'upsert', 'at': stamp, 'note': NoteSerializer(obj).data})
+    return Response({'results': results, 'next_cursor': next_cursor, 'has_more': has_more})
+
+# Export endpoint
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def api_notes_export(request):
+    """
+    GET /api/notes/export/?as=jsonl|zip&versions=1&trashed=1
+    Streams all of the user's notes with their tags (see export.py):
+    JSON Lines (default) or a zip of Markdown files. versions=1 adds each
+    note's version history; trashed=1 includes notes in the Trash.
+    ("as" rather than "format": DRF reserves ?format=.)
+    """
+    fmt = (request.GET.get('as') or 'jsonl').lower()
+    if fmt not in export.FORMATS:
+        return Response({'detail': 'as must be one of: jsonl, zip'}, status=400)
+    versions = request.GET.get('versions') == '1'
+    trashed = request.GET.get('trashed') == '1'
+
+    # Under ASGI an async iterator, or Django buffers the whole export first.
+    stream = export.astream if isinstance(request._request, ASGIRequest) else export.stream
+    response = StreamingHttpResponse(
+        stream(request.user, fmt, versions=versions, trashed=trashed),
+        content_type=export.CONTENT_TYPES[fmt],
+    )
+    filename = f"notes-{request.user.username}-{timezone.localdate():%Y%m%d}.{fmt}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+# Import endpoint
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def api_notes_import(request):
+    """
+    POST /api/notes/import/  (multipart, field "file": a .jsonl file or a zip of .md files)
+    Optional: start_at=<next_position from an interrupted import>
+    Notes are written in batches (see importing.py); the response says how
+    far it got:
+      {"imported": 1200, "failed": 2, "errors": [{"position": 7, "detail": "..."}],
+       "next_position": 1203}
+    If a batch can't be written (database error) the import stops there: the
+    same summary comes back with "stopped": {"position", "detail"} and HTTP
+    500, and next_position is where to resume.
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'detail': 'Upload the notes as a "file" field.'}, status=400)
+    try:
+        start_at = int(request.data.get('start_at') or 0)
+    except (TypeError, ValueError):
+        return Response({'detail': 'start_at must be an integer.'}, status=400)
+
+    fmt = importing.detect_format(upload)
+    try:
+        summary = importing.import_records(
+            request.user, importing.iter_records(upload, fmt), start_at=start_at,
+        )
+    except zipfile.BadZipFile:
+        return Response({'detail': 'The zip archive is damaged.'}, status=400)
+    if 'stopped' in summary:
+        return Response(summary, status=500)
+    return Response(summary, status=201 if summary['imported'] else 200)
+
+# Batch API endpoint (sync clients)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def api_notes_batch(request):
+    """
+    POST /api/notes/batch/
+    Body: {"operations": [
+              {"op": "create", "title": "...", "content": "...", "tags": [1, 2]},
+              {"op": "update", "id": 5, "content": "..."},     (partial update)
+              {"op": "delete", "id": 6}
+           ],
+           "atomic": false}
+    Up to 100 operations, applied in one transaction (see batch.py).
+    Response: {"applied": true, "results": [
+                  {"index": 0, "op": "create", "status": "created", "id": 9, "note": {...}},
+                  {"index": 1, "op": "update", "status": "failed", "detail": "Note not found."},
+                  ...]}
+    Invalid operations fail on their own; with "atomic": true they cancel the
+    whole batch instead (the others come back "skipped", HTTP 400).
+    """
+    operations = request.data.get('operations') if isinstance(request.data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return Response({'detail': 'operations must be a non-empty list'}, status=400)
+    if len(operations) > batch.MAX_OPERATIONS:
+        return Response({'detail': f'At most {batch.MAX_OPERATIONS} operations per request'}, status=400)
+
+    results, applied = batch.apply_operations(
+        request.user, operations, atomic=bool(request.data.get('atomic')),
+    )
+    return Response({'applied': applied, 'results': results}, status=200 if applied else 400)
+
 # Note Version API endpoint
 @api_view(['GET','POST','DELETE'])
 @permission_classes([IsAuthenticated])
@@ -174,7 +270,9 @@ def api_note_versions(request, pk):
 
         paginator = Paginator(qs, page_size)
         page_obj = paginator.get_page(page)
-        data = NoteVersionSerializer(page_obj.object_list, many=True).data
+        versions = list(page_obj.object_list)
+        resolve_many(versions)  # rebuild any delta-stored versions in one query
+        data = NoteVersionSerializer(versions, many=True).data
 
         return Response({
             'count': paginator.count,
@@ -185,12 +283,7 @@ def api_note_versions(request, pk):
         }, status=status.HTTP_200_OK)
 
     if request.method == 'POST':
-        v = NoteVersion.objects.create(
-            note=note,
-            title=note.title,
-            content=note.content,
-            updated_by=request.user,
-        )
+        v = snapshot_note(note, request.user)
         return Response(NoteVersionSerializer(v).data, status=status.HTTP_201_CREATED)
 
     if request.method == 'DELETE':
@@ -212,16 +305,11 @@ def api_note_restore_version(request, pk, version_id):
     version = get_object_or_404(NoteVersion, pk=version_id, note=note)
 
     # Snapshot the current state before restoring (so we don't lose it)
-    NoteVersion.objects.create(
-        note=note,
-        title=note.title,
-        content=note.content,
-        updated_by=request.user,
-    )
+    snapshot_note(note, request.user)
 
     # Restore the note's content from the selected version
     note.title = version.title
-    note.content = version.content
+    note.content = version.full_content
     attach_actor(note, request.user)
     note.save(update_fields=['title', 'content', 'updated_at'])
 
@@ -254,6 +342,7 @@ def api_list_tags(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional(api_version_validators)  # versions never change: cheap 304s
 def api_note_version_detail(request, pk, version_id):
     """
     Return a specific note version for a note the user owns.
@@ -275,9 +364,18 @@ def api_note_send(request,pk):
     """
     POST /api/notes/<pk>/send/
     Body: {"recipient_username": "bob"}
-    Action: creates a COPY for recipient; logs NoteSend + NoteEvent('send')
+      or  {"recipient_usernames": ["bob", "carol", ...]}  (up to 50)
+    Action: creates a COPY per recipient; logs NoteSend + NoteEvent('send')
+    The batch form reports each recipient separately:
+      {"sent": 1, "failed": 1, "results": [
+          {"recipient": "bob", "status": "sent", "copy_id": 12},
+          {"recipient": "zed", "status": "failed", "detail": "Recipient not found"}]}
+    with 201 if anything was sent, 400 otherwise.
     """
     note = get_object_or_404(Note, pk=pk, owner=request.user)
+    if 'recipient_usernames' in request.data:
+        return _send_to_many(request, note)
+
     username = (request.data.get('recipient_username') or "").strip()
     # Validate recipient username
     if not username:
@@ -288,26 +386,162 @@ def api_note_send(request,pk):
     except User.DoesNotExist:
         return Response({'detail': 'Recipient not found'}, status=404)
 
-    # Create a copy of the note for the recipient.
-    copy = Note(
-        title = note.title,
-        content = note.content,
-        owner =  recipient,
-        is_pinned = False,
-        is_archived = False,
-    )
-    attach_actor(copy, request.user)
-    copy.save()
-    # Copy tags by name into the recipient's own tags (not the sender's Tag rows).
-    copy_tags_for_recipient(note, copy, recipient)
-
-    # Log send action
-    NoteSend.objects.create(original_note=note, sender=request.user, recipient=recipient)
-    log_note_event(request.user, note, NoteEvent.ACTION_SEND)
+    # Copy (with tags, by name, into the recipient's own tags) and log the send.
+    copy, = sending.send_copies(note, request.user, [recipient])
     
     # Return success response
     return Response({"status": "sent","recipient": recipient.username,"copy_id": copy.pk}, status=201)
 
+def _send_to_many(request, note):
+    if hasattr(request.data, 'getlist'):  # form-encoded: repeated field
+        raw = request.data.getlist('recipient_usernames')
+    else:
+        raw = request.data.get('recipient_usernames')
+    if not isinstance(raw, (list, str)):
+        return Response({'detail': 'recipient_usernames must be a list of usernames'}, status=400)
+    usernames = sending.parse_usernames(raw)
+    if not usernames:
+        return Response({'detail': 'At least one recipient username is required'}, status=400)
+    if len(usernames) > sending.MAX_RECIPIENTS:
+        return Response({'detail': f'At most {sending.MAX_RECIPIENTS} recipients per request'}, status=400)
+
+    found, missing = sending.resolve_recipients(usernames)
+    recipients = [found[name] for name in usernames if name in found]
+    copies = dict(zip((r.username for r in recipients), sending.send_copies(note, request.user, recipients)))
+
+    results = []
+    for name in usernames:
+        if name in copies:
+            results.append({"recipient": name, "status": "sent", "copy_id": copies[name].pk})
+        else:
+            results.append({"recipient": name, "status": "failed", "detail": "Recipient not found"})
+    return Response(
+        {"sent": len(copies), "failed": len(missing), "results": results},
+        status=201 if copies else 400,
+    )
+
+# Cursor (keyset) pagination helpers for api_user_notes.
+NOTES_PAGE_DEFAULT = 50
+NOTES_PAGE_MAX = 200
+CHANGES_PAGE_DEFAULT = 100
+CHANGES_PAGE_MAX = 500
+
+def _notes_list_query(request):
+    """
+    (queryset, limit) for one page of GET /api/notes/ (also used by the async
+    variant in api_async.py); the queryset is sliced [:limit + 1] by the
+    caller. Raises ValueError for a bad cursor.
+    """
+    user = request.user
+    # Get the tag ID from the query parameters
+    tag_id = request.GET.get('tag')
+
+    # Support search with no taggs.
+    untagged = request.GET.get('untagged') == '1'
+
+    # Query search
+    search_query = request.GET.get('search')
+
+    # Filter notes by tag if tag_id is provided
+    notes = Note.objects.filter(owner=user).for_listing()
+
+    # pinned requests, we need to have 'notes' defined before we filter it.
+    pinned = request.GET.get('pinned')
+
+    if pinned == '1':
+        notes = notes.filter(is_pinned=True)
+    elif pinned == '0':
+        notes = notes.filter(is_pinned=False)
+
+    # achieved via query parameters.
+    archived = request.GET.get('archived')
+
+    if archived == '1':
+        notes = notes.filter(is_archived=True)
+    elif archived == '0':
+        notes = notes.filter(is_archived=False)
+
+    if tag_id:
+        # Only the user's own tag matches; an unknown tag id gives no notes.
+        if tag_id.isdigit():
+            notes = notes.filter(tags__id=tag_id, tags__owner=user)
+        else:
+            notes = notes.none()
+    elif untagged:
+        notes = notes.filter(tags__isnull=True)
+
+    if search_query:
+        # Full-text index (see search.py); API ordering stays newest-first.
+        notes = note_search.filter_notes(notes, search_query)
+
+    # Pinned first, then newest first. Keyset (cursor) pagination on
+    # (is_pinned, created_at, id): every page is one index range scan, so
+    # page N costs the same as page 1 (unlike OFFSET).
+    after = _decode_cursor(request.GET.get('cursor'))
+    limit = _parse_limit(request, NOTES_PAGE_DEFAULT, NOTES_PAGE_MAX)
+
+    notes = notes.order_by('-is_pinned', '-created_at', '-id')
+    if after is not None:
+        notes = notes.filter(_after_cursor(*after))
+    return notes, limit
+
+def _notes_page(page, limit):
+    """Response body for up to limit + 1 fetched notes."""
+    has_more = len(page) > limit
+    page = page[:limit]
+    last = page[-1] if page else None
+    return {
+        'results': NoteSerializer(page, many=True).data,
+        'limit': limit,
+        'next_cursor': _encode_cursor(last) if has_more else None,
+    }
+
+def _parse_limit(request, default, max_size):
+    try:
+        limit = int(request.GET.get("limit", default))
+    except ValueError:
+        limit = default
+    return min(max(limit, 1), max_size)
+
+def _encode_cursor(note):
+    """
+    Opaque cursor for "everything after this note" in the
+    (-is_pinned, -created_at, -id) ordering.
+    """
+    raw = json.dumps([int(note.is_pinned), note.created_at.isoformat(), note.pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor):
+    """
+    Returns (is_pinned, created_at, id) or None when no cursor was given.
+    Raises ValueError for anything that isn't a cursor we handed out.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        pinned, created, pk = json.loads(base64.urlsafe_b64decode(padded))
+        created_at = datetime.fromisoformat(created)
+        return bool(pinned), created_at, int(pk)
+    except (TypeError, ValueError, binascii.Error):
+        raise ValueError("invalid cursor")
+
+def _after_cursor(is_pinned, created_at, pk):
+    """
+    Rows strictly after the cursor in (-is_pinned, -created_at, -id) order, as
+    one row-value comparison so note_owner_keyset_idx seeks to the cursor. The
+    same condition spelled as an OR of Qs is only checked row by row, and page
+    N would scan every row of the pages before it.
+    """
+    qn = connection.ops.quote_name
+    table = qn(Note._meta.db_table)
+    columns = ", ".join(f"{table}.{qn(name)}" for name in ("is_pinned", "created_at", "id"))
+    return RawSQL(
+        f"({columns}) < (%s, %s, %s)",
+        (is_pinned, connection.ops.adapt_datetimefield_value(created_at), pk),
+        output_field=BooleanField(),
+    )
+
 # Helper function for pagination
 def _paginate(request, qs, default_size=20, max_size=100):
     """
@@ -320,6 +554,12 @@ def _paginate(request, qs, default_size=20, max_size=100):
     :return: A tuple containing the list of items for the current page and a dictionary with pagination metadata.
     
     """
+    start, end, meta = _page_window(request, qs.count(), default_size, max_size)
+    items = list(qs[start:end])
+    return items, meta
+
+def _page_window(request, total, default_size=20, max_size=100):
+    """(start, end, meta) of the requested page given the total row count."""
     try:
         page = max(int(request.GET.get("page", 1)), 1)
     except ValueError:
@@ -330,15 +570,13 @@ def _paginate(request, qs, default_size=20, max_size=100):
         size = default_size
     size = min(max(size, 1), max_size)
 
-    total = qs.count()
     num_pages = ceil(total / size) if size else 1
     if page > num_pages and num_pages > 0:
         page = num_pages
 
     start = (page - 1) * size
     end = start + size
-    items = list(qs[start:end])
-    return items, {"count": total, "page": page, "page_size": size, "num_pages": num_pages}
+    return start, end, {"count": total, "page": page, "page_size": size, "num_pages": num_pages}
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -347,18 +585,19 @@ def api_inbox_list(request):
     List notes received by the user via NoteSend.
     GET /api/notes/inbox/
     """
-    qs = NoteSend.objects.filter(recipient=request.user).select_related("original_note", "sender").order_by("-created_at")
-    items, meta = _paginate(request, qs)
-    data = [
-        {
-            "id": s.id,
-            "sender": s.sender.username if s.sender_id else None,
-            "original_note_id": s.original_note_id,
-            "created_at": s.created_at,
-        }
-        for s in items
-    ]
-    return Response({"results": data, **meta}, status=200)
+    items, meta = _paginate(request, _inbox_qs(request.user))
+    return Response({"results": [_inbox_item(s) for s in items], **meta}, status=200)
+
+def _inbox_qs(user):
+    return NoteSend.objects.filter(recipient=user).select_related("original_note", "sender").order_by("-created_at")
+
+def _inbox_item(s):
+    return {
+        "id": s.id,
+        "sender": s.sender.username if s.sender_id else None,
+        "original_note_id": s.original_note_id,
+        "created_at": s.created_at,
+    }
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -367,18 +606,44 @@ def api_sent_list(request):
     List notes sent by the user via NoteSend.
     GET /api/notes/sent/
     """
-    qs = NoteSend.objects.filter(sender=request.user).select_related("original_note", "recipient").order_by("-created_at")
-    items, meta = _paginate(request, qs)
-    data = [
-        {
-            "id": s.id,
-            "recipient": s.recipient.username if s.recipient_id else None,
-            "original_note_id": s.original_note_id,
-            "created_at": s.created_at,
-        }
-        for s in items
-    ]
-    return Response({"results": data, **meta}, status=200)
+    items, meta = _paginate(request, _sent_qs(request.user))
+    return Response({"results": [_sent_item(s) for s in items], **meta}, status=200)
+
+def _sent_qs(user):
+    return NoteSend.objects.filter(sender=user).select_related("original_note", "recipient").order_by("-created_at")
+
+def _sent_item(s):
+    return {
+        "id": s.id,
+        "recipient": s.recipient.username if s.recipient_id else None,
+        "original_note_id": s.original_note_id,
+        "created_at": s.created_at,
+    }
+
+ANALYTICS_MAX_POINTS = 1000  # upper bound for ?max_points=
+
+def _parse_day(value):
+    if not value:
+        return None
+    try:
+        day = parse_date(value)  # None if not YYYY-MM-DD at all
+    except ValueError:  # right shape, impossible date (e.g. month 13)
+        day = None
+    if day is None:
+        raise ValueError(f"Invalid date {value!r}; expected YYYY-MM-DD.")
+    return day
+
+def _parse_max_points(value):
+    if not value:
+        return None
+    try:
+        points = int(value)
+    except ValueError:
+        raise ValueError("max_points must be an integer.")
+    if points < 1:
+        raise ValueError("max_points must be at least 1.")
+    return min(points, ANALYTICS_MAX_POINTS)
+
 # Note Analytics API endpoint
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -388,7 +653,10 @@ def api_note_analytics(request):
       - bucket: daily | weekly | monthly | yearly  (default: daily)
       - actions: comma-separated subset of: create,update,delete,send
                  (default: create,update,delete,send)
-    Response:
+      - from, to: YYYY-MM-DD, inclusive day range (default: all history)
+      - max_points: merge the range into at most this many equal time spans
+      - shape: series (default) | columns
+    Response (shape=series):
       {
         "bucket": "daily",
         "actions": ["create","delete","send"],
@@ -397,7 +665,26 @@ def api_note_analytics(request):
           ...
         }
       }
+    Response (shape=columns), one count per period for every action:
+      {
+        "bucket": "daily",
+        "actions": ["create","delete","send"],
+        "periods": ["2025-10-30", "2025-10-31"],
+        "counts": {"create": [2, 0], "delete": [1, 0], "send": [1, 3]}
+      }
+    ("format" would have been the natural name, but DRF reserves ?format=.)
     """
+    try:
+        params = _analytics_params(request)
+    except ValueError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    # Read the pre-aggregated daily rollup (see rollup.py), not the raw events.
+    rows = rollup.series(request.user, params['actions'], params['bucket'],
+                         date_from=params['date_from'], date_to=params['date_to'])
+    return Response(_analytics_payload(rows, params), status=status.HTTP_200_OK)
+
+def _analytics_params(request):
+    """Parsed api_note_analytics query params; ValueError for a bad date or max_points."""
     # parse params 
     bucket =(request.GET.get('bucket') or 'daily').lower()
     raw_actions = (request.GET.get('actions') or 'create,update,delete,send').lower()
@@ -409,39 +696,41 @@ def api_note_analytics(request):
     if not actions:
         actions = ['create','update','delete','send']
     
-    #choose the trunc function
-    trunc_map = {
-        'daily': TruncDay('created_at'),
-        'weekly': TruncWeek('created_at'),
-        'monthly': TruncMonth('created_at'),
-        'yearly': TruncYear('created_at'),
-    }
-    trunc = trunc_map.get(bucket, TruncDay('created_at'))
-    if bucket not in trunc_map:
+    if bucket not in rollup.BUCKETS:
         bucket = 'daily'  # reset to default if invalid
 
-    # aggregate
-    qs = (NoteEvent.objects
-        .filter(user=request.user, action__in=actions)
-        .annotate(period=trunc)
-        .values('period','action')
-        .annotate(count=Count('id'))
-        .order_by('period','action')
-    )
-
-    # Group data into {period: {action: count}}
-    series = {}
+    shape = (request.GET.get('shape') or 'series').lower()
+    if shape not in ('series', 'columns'):
+        shape = 'series'
 
-    for row in qs:
-        period = row['period']
-        # I want to normalize period to ISO date string for JSON keys
-        # (TruncWeek/Month/Year return datetimes too, safe to .date())
-        key = period.date().isoformat() if hasattr(period, 'date') else str(period)
-        series.setdefault(key, {})
-        series[key][row['action']] = row['count']
+    # Whole bucket periods: a mid-week `from` still counts its whole first week.
+    date_from, date_to = rollup.whole_periods(
+        _parse_day(request.GET.get('from')), _parse_day(request.GET.get('to')), bucket)
 
-    return Response({
+    return {
         'bucket': bucket,
         'actions': actions,
-        'series': series
-    }, status=status.HTTP_200_OK)
+        'shape': shape,
+        'date_from': date_from,
+        'date_to': date_to,
+        'max_points': _parse_max_points(request.GET.get('max_points')),
+    }
+
+def _analytics_payload(rows, params):
+    """Response body of api_note_analytics from the rollup rows."""
+    bucket, actions, shape = params['bucket'], params['actions'], params['shape']
+    periods, counts = rollup.downsample(*rollup.columns(rows, actions), params['max_points'],
+                                        bucket, params['date_from'], params['date_to'])
+
+    payload = {'bucket': bucket, 'actions': actions}
+    if shape == 'columns':
+        payload['periods'] = periods
+        payload['counts'] = counts
+    else:
+        # Group data into {period: {action: count}}; periods are ISO dates.
+        # Actions with no events in a period are left out, as before.
+        payload['series'] = {
+            period: {a: counts[a][i] for a in actions if counts[a][i]}
+            for i, period in enumerate(periods)
+        }
+    return payload
@@ -0,0 +1,128 @@
+"""
+Async variants of the read-heavy API endpoints, for the ASGI server
+(APP_SERVER=asgi in docker/entrypoint.prod.sh). Served under /api/async/...
+next to the sync DRF views in api.py, with the same query params and the
+same response bodies; the queries and response builders are shared with
+api.py, only the database calls are awaited (Django's async ORM).
+
+DRF has no async views, so `async_api` does what @api_view +
+IsAuthenticated do for these read-only endpoints: Token or session
+authentication, 401/404/405 as JSON, DRF's JSON encoding.
+"""
+from functools import wraps
+
+from django.http import Http404, JsonResponse
+from django.shortcuts import aget_object_or_404
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import (
+    AuthenticationFailed,
+    MethodNotAllowed,
+    NotAuthenticated,
+)
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import api, rollup
+from .conditional import api_note_validators, conditional
+from .models import Note
+from .serializers import NoteSerializer
+
+
+def _json(data, status=200):
+    # Like DRF's JSONRenderer: its encoder (datetimes as ISO 8601 with "Z") and UTF-8 output.
+    return JsonResponse(data, status=status, safe=False, encoder=JSONEncoder,
+                        json_dumps_params={"ensure_ascii": False})
+
+
+async def _authenticate(request):
+    """The user from an `Authorization: Token ...` header or the session (None if neither)."""
+    auth = request.headers.get("Authorization", "").split()
+    if auth and auth[0].lower() == "token":
+        # Same checks and messages as rest_framework.authentication.TokenAuthentication.
+        if len(auth) == 1:
+            raise AuthenticationFailed("Invalid token header. No credentials provided.")
+        if len(auth) > 2:
+            raise AuthenticationFailed("Invalid token header. Token string should not contain spaces.")
+        try:
+            token = await Token.objects.select_related("user").aget(key=auth[1])
+        except Token.DoesNotExist:
+            raise AuthenticationFailed("Invalid token.")
+        if not token.user.is_active:
+            raise AuthenticationFailed("User inactive or deleted.")
+        return token.user
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+def async_api(view):
+    """GET/HEAD only, authenticated user required (request.user is set for the view)."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            if request.method not in ("GET", "HEAD"):
+                raise MethodNotAllowed(request.method)
+            user = await _authenticate(request)
+            if user is None:
+                raise NotAuthenticated()
+            request.user = user
+            return await view(request, *args, **kwargs)
+        except (AuthenticationFailed, NotAuthenticated) as exc:
+            response = _json({"detail": exc.detail}, status=401)
+            response["WWW-Authenticate"] = "Token"
+            return response
+        except MethodNotAllowed as exc:
+            response = _json({"detail": exc.detail}, status=405)
+            response["Allow"] = "GET, HEAD"
+            return response
+        except Http404 as exc:
+            return _json({"detail": str(exc)}, status=404)
+    return wrapper
+
+
+async def _paginate(request, qs, default_size=20, max_size=100):
+    """api._paginate, awaited."""
+    start, end, meta = api._page_window(request, await qs.acount(), default_size, max_size)
+    return [item async for item in qs[start:end]], meta
+
+
+@async_api
+async def api_user_notes(request):
+    """GET /api/async/notes/ — as GET /api/notes/."""
+    try:
+        notes, limit = api._notes_list_query(request)
+    except ValueError:
+        return _json({"detail": "Invalid cursor."}, status=400)
+    return _json(api._notes_page([note async for note in notes[:limit + 1]], limit))
+
+
+@async_api
+@conditional(api_note_validators)  # ETag/Last-Modified -> 304, as for the sync view
+async def api_note_detail(request, pk):
+    """GET /api/async/notes/<pk>/ — as GET /api/notes/<pk>/."""
+    note = await aget_object_or_404(Note.objects.for_listing(), pk=pk, owner=request.user)
+    return _json(NoteSerializer(note).data)
+
+
+@async_api
+async def api_inbox_list(request):
+    """GET /api/async/inbox/ — as GET /api/inbox/."""
+    items, meta = await _paginate(request, api._inbox_qs(request.user))
+    return _json({"results": [api._inbox_item(s) for s in items], **meta})
+
+
+@async_api
+async def api_sent_list(request):
+    """GET /api/async/sent/ — as GET /api/sent/."""
+    items, meta = await _paginate(request, api._sent_qs(request.user))
+    return _json({"results": [api._sent_item(s) for s in items], **meta})
+
+
+@async_api
+async def api_note_analytics(request):
+    """GET /api/async/analytics/notes/ — as GET /api/analytics/notes/."""
+    try:
+        params = api._analytics_params(request)
+    except ValueError as exc:
+        return _json({"detail": str(exc)}, status=400)
+    rows = await rollup.aseries(request.user, params["actions"], params["bucket"],
+                                date_from=params["date_from"], date_to=params["date_to"])
+    return _json(api._analytics_payload(rows, params))
@@ -0,0 +1,184 @@
+"""
+Batch note writes for sync clients: POST /api/notes/batch/ (see api.py).
+
+A client that changed many notes used to send one request per note, each
+with its own auth lookup, transaction and per-row writes. `apply_operations`
+takes a list of create / update / delete operations and:
+
+1. validates all of them up front (one query for the referenced notes, one
+   for the referenced tags; NoteSerializer for the fields);
+2. writes the valid ones in a single transaction with bulk statements:
+   NoteVersion snapshots for updates (versioning.snapshot_notes), created and
+   updated notes, tag links, set-based deletes (trash.delete_notes), and the
+   NoteEvents (plus their analytics rollup) the single-note API would log;
+3. returns one result per operation, in request order.
+
+Differences from the single-note endpoints: updates are partial (only the
+fields sent change, and `tags` only if sent), and with "atomic": true any
+invalid operation cancels the whole batch.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from . import listcache, rollup, search, trash
+from .models import Note, NoteEvent, RenderedMarkdown, Tag
+from .serializers import NoteSerializer
+from .utils import build_note_event
+from .versioning import snapshot_notes
+
+MAX_OPERATIONS = 100
+OPS = ('create', 'update', 'delete')
+
+
+def _failed(index, op, detail, errors=None):
+    result = {'index': index, 'op': op, 'status': 'failed', 'detail': detail}
+    if errors is not None:
+        result['errors'] = errors
+    return result
+
+
+def _tag_ids(item):
+    """The item's `tags` as a list of ints, None if absent; ValueError if malformed."""
+    if 'tags' not in item:
+        return None
+    tags = item['tags']
+    if not isinstance(tags, list) or not all(isinstance(t, int) and not isinstance(t, bool) for t in tags):
+        raise ValueError('tags must be a list of tag ids')
+    return tags
+
+
+def _fields(item):
+    return {k: v for k, v in item.items() if k not in ('op', 'id', 'tags')}
+
+
+def apply_operations(user, operations, atomic=False):
+    """
+    Validate and apply `operations` for `user`. Returns (results, applied)
+    where `applied` is False if nothing was written because of `atomic`.
+    """
+    results = [None] * len(operations)
+
+    # Pass 1: shape checks, and collect what to look up.
+    note_ids, tag_ids = set(), set()
+    for index, item in enumerate(operations):
+        if not isinstance(item, dict):
+            results[index] = _failed(index, None, 'Each operation must be an object.')
+            continue
+        op = item.get('op')
+        if op not in OPS:
+            results[index] = _failed(index, op, 'op must be one of: create, update, delete.')
+            continue
+        if op != 'create':
+            if not isinstance(item.get('id'), int) or isinstance(item.get('id'), bool):
+                results[index] = _failed(index, op, 'id is required.')
+                continue
+            note_ids.add(item['id'])
+        try:
+            tag_ids.update(_tag_ids(item) or [])
+        except ValueError as exc:
+            results[index] = _failed(index, op, str(exc))
+
+    notes = {n.pk: n for n in Note.objects.filter(owner=user, pk__in=note_ids)}
+    # Tags the user doesn't own are dropped, as in the single-note endpoints.
+    owned_tags = set(Tag.objects.filter(owner=user, pk__in=tag_ids).values_list('pk', flat=True))
+
+    # Pass 2: validate against the data.
+    creates, updates, deletes = [], [], []
+    seen = set()
+    for index, item in enumerate(operations):
+        if results[index] is not None:
+            continue
+        op = item['op']
+        tags = _tag_ids(item)
+        if tags is not None:
+            tags = [t for t in dict.fromkeys(tags) if t in owned_tags]
+        if op == 'create':
+            serializer = NoteSerializer(data=_fields(item))
+            if not serializer.is_valid():
+                results[index] = _failed(index, op, 'Invalid note.', serializer.errors)
+                continue
+            creates.append((index, Note(owner=user, **serializer.validated_data), tags))
+            continue
+
+        note = notes.get(item['id'])
+        if note is None:
+            results[index] = _failed(index, op, 'Note not found.')
+            continue
+        if note.pk in seen:
+            results[index] = _failed(index, op, 'Note appears more than once in this batch.')
+            continue
+        seen.add(note.pk)
+        if op == 'delete':
+            deletes.append((index, note))
+            continue
+        serializer = NoteSerializer(note, data=_fields(item), partial=True)
+        if not serializer.is_valid():
+            results[index] = _failed(index, op, 'Invalid note.', serializer.errors)
+            continue
+        updates.append((index, note, serializer.validated_data, tags))
+
+    if atomic and any(r is not None for r in results):
+        for index, item in enumerate(operations):
+            if results[index] is None:
+                results[index] = {'index': index, 'op': item['op'], 'status': 'skipped'}
+        return results, False
+
+    _write(user, creates, updates, deletes)
+
+    # Serialize created/updated notes with their tags in two queries.
+    written = [n for _, n, _ in creates] + [n for _, n, _, _ in updates]
+    fresh = {n.pk: n for n in Note.objects.filter(pk__in=[n.pk for n in written]).for_listing()}
+    for index, note, _ in creates:
+        results[index] = {'index': index, 'op': 'create', 'status': 'created',
+                          'id': note.pk, 'note': NoteSerializer(fresh[note.pk]).data}
+    for index, note, _, _ in updates:
+        results[index] = {'index': index, 'op': 'update', 'status': 'updated',
+                          'id': note.pk, 'note': NoteSerializer(fresh[note.pk]).data}
+    for index, note in deletes:
+        results[index] = {'index': index, 'op': 'delete', 'status': 'deleted', 'id': note.pk}
+    return results, True
+
+
+def _write(user, creates, updates, deletes):
+    now = timezone.now()
+    events = []
+    Link = Note.tags.through
+    with transaction.atomic():
+        if updates:
+            # Snapshot first: the instances still hold the stored values.
+            snapshot_notes([note for _, note, _, _ in updates], user)
+            for _, note, data, _ in updates:
+                for field, value in data.items():
+                    setattr(note, field, value)
+                note.updated_at = now  # bulk_update skips auto_now
+            Note.objects.bulk_update(
+                [note for _, note, _, _ in updates],
+                ['title', 'content', 'is_pinned', 'is_archived', 'updated_at'],
+            )
+            RenderedMarkdown.objects.filter(
+                note_id__in=[note.pk for _, note, data, _ in updates if 'content' in data]
+            ).delete()
+            retagged = [note.pk for _, note, _, tags in updates if tags is not None]
+            Link.objects.filter(note_id__in=retagged).delete()
+            events += [build_note_event(user, note, NoteEvent.ACTION_UPDATE) for _, note, _, _ in updates]
+
+        if creates:
+            Note.objects.bulk_create([note for _, note, _ in creates])
+            events += [build_note_event(user, note, NoteEvent.ACTION_CREATE) for _, note, _ in creates]
+
+        tagged = [(note, tags) for _, note, tags in creates] + [(note, tags) for _, note, _, tags in updates]
+        Link.objects.bulk_create(
+            [Link(note_id=note.pk, tag_id=tag_id) for note, tags in tagged if tags for tag_id in tags],
+            ignore_conflicts=True,
+        )
+
+        if deletes:
+            # Built like DELETE /api/notes/<id>/ logs it (post_delete signal):
+            # the note is gone, so no note and no title.
+            events += [build_note_event(user, None, NoteEvent.ACTION_DELETE) for _ in deletes]
+            trash.delete_notes([note.pk for _, note in deletes])
+
+        NoteEvent.objects.bulk_create(events)
+        rollup.record_events(events)
+        search.index_notes([note for _, note, _ in creates] + [note for _, note, _, _ in updates])
+        listcache.bump(user.pk)
@@ -0,0 +1,127 @@
+"""
+Helpers over the shared cache (settings.CACHES, chosen by CACHE_URL in
+settings_base.py).
+
+- `make_key(namespace, *parts)`: every key this app writes is
+  "firstsite:<namespace>:<parts>", so features can't collide and a namespace
+  can be told apart in the backend (CACHE_KEY_PREFIX separates deployments
+  sharing one Redis/Memcached).
+- `get_or_compute(key, compute, timeout, namespace)`: read-through with
+  stampede protection. On a miss, one caller takes a short lock (cache.add)
+  and computes; the others poll for its result instead of all running the
+  same expensive render at once. If the lock holder dies, its lock expires
+  and a waiter computes.
+- hit/miss counters per namespace: counted in-process and added to shared
+  counters in the cache (cache.incr) every STATS_FLUSH_EVERY lookups, so they
+  sum over all workers without an extra cache write per request. `stats()` /
+  `manage.py cache_stats` read them.
+
+cache.add and cache.incr are atomic across processes only on Redis and
+Memcached; locmem's are atomic within its one process. On the file backend (file://) both are a read followed by a write,
+so two workers can both take a lock, which costs a duplicate compute, and
+concurrent flushes can lose counts. Nothing here relies on them for
+correctness; use Redis or Memcached for a single render per miss and exact
+counters.
+"""
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+# The namespaces this app uses (cache_stats reports these by default).
+NAMESPACES = ("notes-list", "notes-card", "note-diff")
+
+STATS_FLUSH_EVERY = 100
+LOCK_POLL = 0.05  # seconds between checks while another caller computes
+
+_MISSING = object()
+_stats_lock = threading.Lock()
+_pending = Counter()  # (namespace, "hits" | "misses") -> not yet flushed
+
+
+def make_key(namespace, *parts):
+    return ":".join(["firstsite", namespace, *map(str, parts)])
+
+
+def record(namespace, hit):
+    """Count a lookup in `namespace` (None: don't count)."""
+    if namespace is None:
+        return
+    with _stats_lock:
+        _pending[(namespace, "hits" if hit else "misses")] += 1
+        due = sum(_pending.values()) >= STATS_FLUSH_EVERY
+    if due:
+        flush_stats()
+
+
+def flush_stats():
+    """Add this process's counts to the shared counters in the cache."""
+    with _stats_lock:
+        pending = dict(_pending)
+        _pending.clear()
+    for (namespace, kind), n in pending.items():
+        key = make_key("stats", namespace, kind)
+        cache.add(key, 0, timeout=None)
+        try:
+            cache.incr(key, n)
+        except ValueError:  # evicted between add and incr
+            cache.set(key, n, timeout=None)
+
+
+def stats(namespaces=NAMESPACES):
+    """{namespace: {"hits", "misses", "hit_ratio"}}, over every process."""
+    flush_stats()
+    keys = {make_key("stats", ns, kind): (ns, kind) for ns in namespaces for kind in ("hits", "misses")}
+    found = cache.get_many(list(keys))
+    result = {ns: {"hits": 0, "misses": 0} for ns in namespaces}
+    for key, (ns, kind) in keys.items():
+        result[ns][kind] = found.get(key, 0)
+    for counts in result.values():
+        total = counts["hits"] + counts["misses"]
+        counts["hit_ratio"] = counts["hits"] / total if total else None
+    return result
+
+
+def reset_stats(namespaces=NAMESPACES):
+    with _stats_lock:
+        _pending.clear()
+    cache.delete_many([make_key("stats", ns, kind) for ns in namespaces for kind in ("hits", "misses")])
+
+
+def get_or_compute(key, compute, timeout=DEFAULT_TIMEOUT, namespace=None, accept=None):
+    """
+    cache[key], or `compute()` stored under key for `timeout` seconds.
+    `accept(value)` can reject a cached value (treated as a miss).
+    """
+    def usable(value):
+        return value is not _MISSING and (accept is None or accept(value))
+
+    value = cache.get(key, _MISSING)
+    if usable(value):
+        record(namespace, True)
+        return value
+    record(namespace, False)
+
+    lock_key = key + ":lock"
+    lock_timeout = settings.CACHE_LOCK_TIMEOUT
+    if not cache.add(lock_key, 1, timeout=lock_timeout):
+        # Someone else is computing it: wait for their result while they
+        # hold the lock (it expires by itself if they die).
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL)
+            value = cache.get(key, _MISSING)
+            if usable(value):
+                return value
+            if cache.get(lock_key) is None:
+                break
+        return compute()
+    try:
+        value = compute()
+        cache.set(key, value, timeout=timeout)
+    finally:
+        cache.delete(lock_key)
+    return value
@@ -0,0 +1,150 @@
+"""
+HTTP conditional GET (ETag / Last-Modified -> 304) for note reads.
+
+`@conditional(validators)` works like django.views.decorators.http.condition,
+but with one function that returns both validators (so they share their
+queries) and a private, must-revalidate Cache-Control. The validator
+functions below only read timestamps and ids — they never render Markdown or
+run a serializer — so a 304 costs a few small queries. They return None when
+there's nothing to validate (e.g. the note doesn't exist or isn't visible),
+and the view then runs as usual and 404s.
+
+ETags are built from everything the response shows that can change:
+- note page: the note's updated_at, its tags (ids + names, since renaming a
+  tag doesn't touch the note), the viewer and their CSRF secret, and for the
+  owner the version and share lists, for a recipient their own share;
+- API note: updated_at and tag ids (what NoteSerializer outputs);
+- API version: versions are immutable, so its id (+ the author's username).
+Plus settings.ETAG_VERSION (bump on deploy when templates change) and the
+Markdown renderer fingerprint.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.db.models import Count, Max, Q
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .models import Note, NoteShare, NoteVersion, Tag
+from .templatetags.markdown_extras import CONFIG_FINGERPRINT
+
+
+def make_etag(*parts):
+    raw = repr((getattr(settings, "ETAG_VERSION", ""), CONFIG_FINGERPRINT) + parts)
+    return f'"{hashlib.sha256(raw.encode()).hexdigest()[:32]}"'
+
+
+def conditional(validators):
+    """
+    Wraps sync and async views alike; for an async view the validators (sync
+    ORM code) run through sync_to_async.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return await view(request, *args, **kwargs)
+                found = await sync_to_async(validators)(request, *args, **kwargs)
+                if found is None:
+                    return await view(request, *args, **kwargs)
+                response = _not_modified(request, found)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return _finish(response, found)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            found = validators(request, *args, **kwargs)
+            if found is None:
+                return view(request, *args, **kwargs)
+            response = _not_modified(request, found)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return _finish(response, found)
+        return wrapper
+    return decorator
+
+
+def _last_modified(modified):
+    return int(modified.timestamp()) if modified else None
+
+
+def _not_modified(request, found):
+    etag, modified = found
+    return get_conditional_response(request, etag=etag, last_modified=_last_modified(modified))
+
+
+def _finish(response, found):
+    etag, modified = found
+    last_modified = _last_modified(modified)
+    if response.status_code in (200, 304):
+        response.headers.setdefault("ETag", etag)
+        if last_modified and not response.has_header("Last-Modified"):
+            response.headers["Last-Modified"] = http_date(last_modified)
+        # Per-user content: browsers may keep it but must revalidate.
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _tags(note_id):
+    return list(Tag.objects.filter(note=note_id).order_by("id").values_list("id", "name"))
+
+
+def note_page_validators(request, pk):
+    if not request.user.is_authenticated:
+        return None
+    # A flash message would be lost inside a 304; render the page instead.
+    storage = messages.get_messages(request)
+    pending = len(list(storage))
+    storage.used = False
+    if pending:
+        return None
+    row = (
+        Note.objects.filter(Q(owner=request.user) | Q(shares__shared_with=request.user), pk=pk)
+        .values("owner_id", "updated_at").first()
+    )
+    if row is None:
+        return None
+    if row["owner_id"] == request.user.pk:
+        history = NoteVersion.objects.filter(note_id=pk).aggregate(last=Max("id"), count=Count("id"))
+        access = (
+            "owner",
+            history["last"], history["count"],
+            list(NoteShare.objects.filter(note_id=pk).order_by("id").values_list("id", flat=True)),
+        )
+    else:
+        access = ("shared", NoteShare.objects.filter(note_id=pk, shared_with=request.user)
+                  .values_list("id", flat=True).first())
+    # The page embeds CSRF tokens; a new CSRF secret (e.g. after logging in
+    # again) must not revalidate a page whose forms carry the old one.
+    get_token(request)  # creates the secret on a first visit, as rendering would
+    csrf_secret = request.META["CSRF_COOKIE"]
+    etag = make_etag("note-page", pk, request.user.pk, csrf_secret,
+                     row["updated_at"].isoformat(), _tags(pk), access)
+    return etag, row["updated_at"]
+
+
+def api_note_validators(request, pk):
+    updated_at = (Note.objects.filter(pk=pk, owner=request.user)
+                  .values_list("updated_at", flat=True).first())
+    if updated_at is None:
+        return None
+    tag_ids = [tag_id for tag_id, _ in _tags(pk)]
+    return make_etag("api-note", pk, updated_at.isoformat(), tag_ids), updated_at
+
+
+def api_version_validators(request, pk, version_id):
+    row = (NoteVersion.objects
+           .filter(pk=version_id, note_id=pk, note__owner=request.user, note__deleted_at__isnull=True)
+           .values("timestamp", "updated_by__username").first())
+    if row is None:
+        return None
+    return make_etag("api-version", version_id, row["updated_by__username"]), row["timestamp"]
@@ -0,0 +1,244 @@
+"""
+Line diff engine for the version diff view (P-016).
+
+`difflib.ndiff` does intraline matching that is super-linear in the note size,
+so large notes took seconds to diff. This engine:
+
+- trims the common prefix/suffix, then splits the remaining region on
+  "patience" anchors (lines that occur exactly once on each side, kept in
+  order via a longest increasing subsequence), recursing between anchors;
+- diffs anchor-free gaps with a greedy Myers O((N+M)·D) search whose edit
+  distance D is capped, so its memory stays bounded;
+- gives up on all of the above once MAX_LINES or TIME_BUDGET is exceeded and
+  returns a coarse diff (common prefix/suffix + one replaced block), marked
+  `coarse` so the page can say so.
+
+Long unchanged runs are collapsed into 'skip' rows (CONTEXT lines of context
+stay visible around every change) that the template renders as expandable
+<details> hunks.
+"""
+import time
+from bisect import bisect_left
+
+MAX_LINES = 20000       # per side
+TIME_BUDGET = 0.5       # seconds
+MAX_MYERS_D = 500       # edit distance cap for anchor-free gaps
+CONTEXT = 3             # unchanged lines kept visible around each change
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+def _unique_anchors(a, alo, ahi, b, blo, bhi):
+    """
+    Lines unique on both sides of the region, as (i, j) pairs forming the
+    longest run that is increasing in both i and j.
+    """
+    counts = {}
+    for i in range(alo, ahi):
+        entry = counts.setdefault(a[i], [0, 0, i, 0])
+        entry[0] += 1
+    for j in range(blo, bhi):
+        entry = counts.get(b[j])
+        if entry is not None:
+            entry[1] += 1
+            entry[3] = j
+    pairs = sorted((i, j) for ca, cb, i, j in counts.values() if ca == 1 and cb == 1)
+    if not pairs:
+        return []
+
+    # Longest increasing subsequence on j (patience sorting).
+    tails, tail_idx, prev = [], [], [None] * len(pairs)
+    for n, (_, j) in enumerate(pairs):
+        k = bisect_left(tails, j)
+        if k == len(tails):
+            tails.append(j)
+            tail_idx.append(n)
+        else:
+            tails[k] = j
+            tail_idx[k] = n
+        prev[n] = tail_idx[k - 1] if k else None
+    out = []
+    n = tail_idx[-1]
+    while n is not None:
+        out.append(pairs[n])
+        n = prev[n]
+    out.reverse()
+    return out
+
+
+def _myers(a, alo, ahi, b, blo, bhi, deadline):
+    """
+    Greedy Myers diff of a[alo:ahi] vs b[blo:bhi]. Returns a list of
+    (kind, text) ops, or None if the edit distance exceeds MAX_MYERS_D.
+    """
+    n, m = ahi - alo, bhi - blo
+    v = {1: 0}
+    trace = []
+    for d in range(min(n + m, MAX_MYERS_D) + 1):
+        if time.monotonic() > deadline:
+            raise _BudgetExceeded
+        trace.append(dict(v))
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v.get(k - 1, -1) < v.get(k + 1, -1)):
+                x = v.get(k + 1, 0)
+            else:
+                x = v.get(k - 1, 0) + 1
+            y = x - k
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            v[k] = x
+            if x >= n and y >= m:
+                return _myers_backtrack(a, alo, b, blo, trace, n, m)
+    return None
+
+
+def _myers_backtrack(a, alo, b, blo, trace, x, y):
+    ops = []
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v.get(k - 1, -1) < v.get(k + 1, -1)):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = v.get(prev_k, 0)
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            ops.append(("same", a[alo + x]))
+        if d > 0:
+            if x == prev_x:
+                ops.append(("add", b[blo + prev_y]))
+            else:
+                ops.append(("del", a[alo + prev_x]))
+        x, y = prev_x, prev_y
+    ops.reverse()
+    return ops
+
+
+def _replace(a, alo, ahi, b, blo, bhi):
+    return [("del", a[i]) for i in range(alo, ahi)] + [("add", b[j]) for j in range(blo, bhi)]
+
+
+def _fine_ops(a, b, deadline):
+    ops = []
+    # Work stack of regions to diff, and ready-made ops, processed in order.
+    stack = [("range", 0, len(a), 0, len(b))]
+    while stack:
+        item = stack.pop()
+        if item[0] == "ops":
+            ops.extend(item[1])
+            continue
+        if time.monotonic() > deadline:
+            raise _BudgetExceeded
+        _, alo, ahi, blo, bhi = item
+
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            ops.append(("same", a[alo]))
+            alo += 1
+            blo += 1
+        suffix = []
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+            suffix.append(("same", a[ahi]))
+        suffix.reverse()
+
+        if alo == ahi or blo == bhi:
+            ops.extend(_replace(a, alo, ahi, b, blo, bhi))
+            ops.extend(suffix)
+            continue
+
+        anchors = _unique_anchors(a, alo, ahi, b, blo, bhi)
+        if anchors:
+            # Gaps between anchors, each followed by its anchor line, then the
+            # suffix; pushed in reverse so they come off the stack in order.
+            pending = []
+            ends = anchors + [(ahi, bhi)]
+            starts = [(alo, blo)] + [(i + 1, j + 1) for i, j in anchors]
+            for n, ((i0, j0), (i1, j1)) in enumerate(zip(starts, ends)):
+                pending.append(("range", i0, i1, j0, j1))
+                if n < len(anchors):
+                    pending.append(("ops", [("same", a[i1])]))
+            pending.append(("ops", suffix))
+            stack.extend(reversed(pending))
+            continue
+
+        region = _myers(a, alo, ahi, b, blo, bhi, deadline)
+        ops.extend(region if region is not None else _replace(a, alo, ahi, b, blo, bhi))
+        ops.extend(suffix)
+    return ops
+
+
+def _coarse_ops(a, b):
+    lo = 0
+    while lo < len(a) and lo < len(b) and a[lo] == b[lo]:
+        lo += 1
+    hi_a, hi_b = len(a), len(b)
+    while hi_a > lo and hi_b > lo and a[hi_a - 1] == b[hi_b - 1]:
+        hi_a -= 1
+        hi_b -= 1
+    return (
+        [("same", line) for line in a[:lo]]
+        + _replace(a, lo, hi_a, b, lo, hi_b)
+        + [("same", line) for line in a[hi_a:]]
+    )
+
+
+def _collapse(ops):
+    """
+    Turn ops into template rows, folding unchanged runs longer than
+    2 * CONTEXT + 1 into a {'kind': 'skip', 'count', 'rows'} hunk.
+    """
+    rows = []
+    run = []
+
+    def flush(at_start, at_end):
+        keep_head = 0 if at_start else CONTEXT
+        keep_tail = 0 if at_end else CONTEXT
+        if len(run) > keep_head + keep_tail + 1:
+            rows.extend(run[:keep_head])
+            hidden = run[keep_head:len(run) - keep_tail]
+            rows.append({"kind": "skip", "count": len(hidden), "rows": hidden})
+            rows.extend(run[len(run) - keep_tail:])
+        else:
+            rows.extend(run)
+
+    for kind, text in ops:
+        if kind == "same":
+            run.append({"kind": "same", "text": text})
+            continue
+        if run:
+            flush(at_start=not rows, at_end=False)
+            run = []
+        rows.append({"kind": kind, "text": text})
+    if run:
+        # A note with no changes at all stays fully visible.
+        if rows:
+            flush(at_start=False, at_end=True)
+        else:
+            rows.extend(run)
+    return rows
+
+
+def diff_lines(old_text, new_text):
+    """
+    Diff two texts line by line. Returns {'rows': [...], 'coarse': bool} where
+    rows are {'kind': 'add'|'del'|'same', 'text'} or
+    {'kind': 'skip', 'count', 'rows'} for a collapsed unchanged hunk.
+    """
+    a = (old_text or "").splitlines()
+    b = (new_text or "").splitlines()
+    coarse = False
+    if len(a) > MAX_LINES or len(b) > MAX_LINES:
+        ops, coarse = _coarse_ops(a, b), True
+    else:
+        try:
+            ops = _fine_ops(a, b, time.monotonic() + TIME_BUDGET)
+        except _BudgetExceeded:
+            ops, coarse = _coarse_ops(a, b), True
+    return {"rows": _collapse(ops), "coarse": coarse}
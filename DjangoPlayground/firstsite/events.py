@@ -0,0 +1,174 @@
+"""
+Optional write-behind sink for NoteEvent rows.
+
+By default `log_note_event` (utils.py) inserts each event inside the request.
+With settings.NOTE_EVENT_SINK = "buffered" events are queued in process and a
+background thread writes them with `bulk_create` once NOTE_EVENT_FLUSH_BATCH
+are waiting or NOTE_EVENT_FLUSH_INTERVAL seconds have passed, plus a final
+flush at worker shutdown (atexit). When the queue is full (NOTE_EVENT_BUFFER_SIZE)
+the event is written synchronously instead, so nothing is dropped.
+
+Events logged inside a transaction are queued when it commits, so a request
+that rolls back leaves none behind. A batch that fails to write is put back
+and retried on the next flush; after NOTE_EVENT_MAX_ATTEMPTS failures in a
+row its events are written one by one and the ones that still fail are
+dropped (logged at ERROR with their data), so one bad row can't hold up
+every later event.
+
+Trade-off: analytics can lag by up to one flush interval, and events still in
+the queue are lost if the worker is killed hard (SIGKILL / OOM).
+"""
+import atexit
+import logging
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import close_old_connections, transaction
+
+from . import rollup
+from .models import Note, NoteEvent
+
+log = logging.getLogger(__name__)
+
+
+class BufferedEventSink:
+    def __init__(self, max_queue=1000, batch_size=100, interval=2.0, max_attempts=5, start_thread=True):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self._failures = 0  # failed flushes in a row
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()  # one bulk_create at a time
+        self._stopping = False
+        self._thread = None
+        if start_thread:
+            self._thread = threading.Thread(target=self._run, name="note-event-sink", daemon=True)
+            self._thread.start()
+
+    def emit(self, event):
+        """Queue an unsaved NoteEvent. Returns False if the queue is full."""
+        with self._cond:
+            if self._stopping or len(self._queue) >= self.max_queue:
+                return False
+            self._queue.append(event)
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def pending(self):
+        return len(self._queue)
+
+    def flush(self):
+        """Write everything queued so far. Returns the number of events written."""
+        with self._flush_lock:
+            with self._cond:
+                batch = list(self._queue)
+                self._queue.clear()
+            if not batch:
+                return 0
+            try:
+                _bulk_insert(batch)
+            except Exception:
+                self._failures += 1
+                if self._failures < self.max_attempts:
+                    # Put the batch back so a later flush (or shutdown) retries it.
+                    log.exception("NoteEvent flush failed (%d of %d); %d event(s) requeued",
+                                  self._failures, self.max_attempts, len(batch))
+                    with self._cond:
+                        self._queue.extendleft(reversed(batch))
+                    raise
+                log.exception("NoteEvent flush failed %d times; writing the batch one by one",
+                              self._failures)
+                self._failures = 0
+                return self._write_each(batch)
+            self._failures = 0
+            return len(batch)
+
+    def _write_each(self, batch):
+        """Write events one at a time, dropping those that fail. Returns the number written."""
+        written = 0
+        for event in batch:
+            try:
+                _bulk_insert([event])
+            except Exception:
+                log.error(
+                    "NoteEvent dropped: action=%s actor=%s user_id=%s note_id=%s note_title=%r created_at=%s",
+                    event.action, event.actor_username, event.user_id, event.note_id,
+                    event.note_title, event.created_at.isoformat(), exc_info=True,
+                )
+            else:
+                written += 1
+        return written
+
+    def shutdown(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.interval + 5)
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._stopping or len(self._queue) >= self.batch_size,
+                    timeout=self.interval,
+                )
+                stopping = self._stopping
+            if self._queue:
+                close_old_connections()
+                try:
+                    self.flush()
+                except Exception:
+                    pass  # already logged; retried on the next tick
+                close_old_connections()
+            if stopping:
+                return
+
+
+def _bulk_insert(events):
+    """
+    bulk_create a batch. A note or user deleted while its event sat in the queue
+    would fail the FK check for the whole batch, so those links are nulled here,
+    which is what on_delete=SET_NULL would have done had the row existed. The
+    actor_username / note_title snapshots are untouched.
+    """
+    note_ids = {e.note_id for e in events if e.note_id}
+    user_ids = {e.user_id for e in events if e.user_id}
+    live_notes = set(Note.all_objects.filter(pk__in=note_ids).values_list("pk", flat=True))
+    live_users = set(User.objects.filter(pk__in=user_ids).values_list("pk", flat=True))
+    for e in events:
+        if e.note_id and e.note_id not in live_notes:
+            e.note = None
+        if e.user_id and e.user_id not in live_users:
+            e.user = None
+    with transaction.atomic():
+        NoteEvent.objects.bulk_create(events)
+        rollup.record_events(events)
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_event_sink():
+    """The process-wide buffered sink, or None when events are written synchronously."""
+    global _sink
+    if getattr(settings, "NOTE_EVENT_SINK", "sync") != "buffered":
+        return None
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                _sink = BufferedEventSink(
+                    max_queue=getattr(settings, "NOTE_EVENT_BUFFER_SIZE", 1000),
+                    batch_size=getattr(settings, "NOTE_EVENT_FLUSH_BATCH", 100),
+                    interval=getattr(settings, "NOTE_EVENT_FLUSH_INTERVAL", 2.0),
+                    max_attempts=getattr(settings, "NOTE_EVENT_MAX_ATTEMPTS", 5),
+                )
+                atexit.register(_sink.shutdown)
+    return _sink
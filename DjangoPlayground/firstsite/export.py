@@ -0,0 +1,179 @@
+"""
+Streaming export of a user's notes (GET /api/notes/export/, `manage.py export_notes`).
+
+Everything here is a generator: notes are read with `.iterator(chunk_size=...)`,
+versions are loaded (and their deltas resolved) one chunk of notes at a time,
+and output is yielded as soon as each note is serialized. Memory stays flat
+however big the account is, and the HTTP response starts straight away
+(StreamingHttpResponse). Under ASGI the response needs `astream`: Django
+reads a sync iterator to the end, into memory, before sending any of it.
+
+Formats:
+- "jsonl": one JSON object per line per note; tags by name, versions (if
+  asked for) with their full text. This is what `import_notes` reads back.
+- "zip": one Markdown file per note (`notes/<id>-<slug>.md`) with a small
+  front-matter header, plus `versions/<id>-<slug>/<version id>.md` files.
+  Written with zipfile onto an unseekable sink (zipfile then uses data
+  descriptors), and drained after every note, so at most one note's files
+  are buffered at a time.
+"""
+import json
+import zipfile
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.utils.text import slugify
+
+from .models import Note, NoteVersion
+from .versioning import resolve_many
+
+CHUNK_SIZE = 500
+FORMATS = ("jsonl", "zip")
+CONTENT_TYPES = {"jsonl": "application/x-ndjson", "zip": "application/zip"}
+
+_DONE = object()
+
+
+def _chunks(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_notes(user, versions=False, trashed=False, chunk_size=CHUNK_SIZE):
+    """
+    Yield (note, tag_names, versions) for the user's notes in id order. Tags
+    are prefetched per chunk; versions (oldest first, full text resolved) cost
+    one query per chunk plus one for their delta chains.
+    """
+    manager = Note.all_objects if trashed else Note.objects
+    qs = manager.filter(owner=user).prefetch_related("tags").order_by("id")
+    for chunk in _chunks(qs.iterator(chunk_size=chunk_size), chunk_size):
+        history = {}
+        if versions:
+            rows = list(
+                NoteVersion.objects.filter(note_id__in=[n.pk for n in chunk])
+                .select_related("updated_by").order_by("note_id", "id")
+            )
+            resolve_many(rows)
+            for v in rows:
+                history.setdefault(v.note_id, []).append(v)
+        for note in chunk:
+            yield note, sorted(t.name for t in note.tags.all()), history.get(note.pk, [])
+
+
+def note_record(note, tag_names, versions=None):
+    record = {
+        "id": note.pk,
+        "title": note.title,
+        "content": note.content,
+        "created_at": note.created_at.isoformat(),
+        "updated_at": note.updated_at.isoformat(),
+        "is_pinned": note.is_pinned,
+        "is_archived": note.is_archived,
+        "deleted_at": note.deleted_at.isoformat() if note.deleted_at else None,
+        "tags": tag_names,
+    }
+    if versions is not None:
+        record["versions"] = [
+            {
+                "id": v.pk,
+                "title": v.title,
+                "content": v.full_content,
+                "timestamp": v.timestamp.isoformat(),
+                "updated_by": getattr(v.updated_by, "username", None),
+            }
+            for v in versions
+        ]
+    return record
+
+
+def stream_jsonl(user, versions=False, trashed=False):
+    for note, tags, history in iter_notes(user, versions, trashed):
+        record = note_record(note, tags, history if versions else None)
+        yield (json.dumps(record, ensure_ascii=False) + "\n").encode()
+
+
+def _front_matter(fields):
+    lines = ["---"]
+    for key, value in fields:
+        lines.append(f"{key}: {json.dumps(value, ensure_ascii=False)}")
+    lines.append("---")
+    return "\n".join(lines) + "\n\n"
+
+
+def note_markdown(note, tag_names):
+    header = _front_matter([
+        ("title", note.title),
+        ("tags", tag_names),
+        ("created_at", note.created_at.isoformat()),
+        ("updated_at", note.updated_at.isoformat()),
+        ("pinned", note.is_pinned),
+        ("archived", note.is_archived),
+    ])
+    return header + note.content
+
+
+class _ChunkSink:
+    """Write-only, unseekable file object that hands written bytes back out."""
+
+    def __init__(self):
+        self._parts = []
+        self._pos = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def stream_zip(user, versions=False, trashed=False):
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for note, tags, history in iter_notes(user, versions, trashed):
+            name = f"{note.pk}-{slugify(note.title) or 'note'}"
+            archive.writestr(f"notes/{name}.md", note_markdown(note, tags))
+            for v in history:
+                header = _front_matter([
+                    ("title", v.title),
+                    ("timestamp", v.timestamp.isoformat()),
+                    ("updated_by", getattr(v.updated_by, "username", None)),
+                ])
+                archive.writestr(f"versions/{name}/{v.pk}.md", header + v.full_content)
+            yield sink.drain()
+    yield sink.drain()  # the central directory, written on close
+
+
+def stream(user, fmt="jsonl", versions=False, trashed=False):
+    if fmt == "zip":
+        return stream_zip(user, versions, trashed)
+    return stream_jsonl(user, versions, trashed)
+
+
+async def astream(user, fmt="jsonl", versions=False, trashed=False):
+    """
+    `stream` as an async iterator. Each chunk is produced by the sync
+    generator through sync_to_async, so it and its database cursor stay on
+    the request's one sync thread.
+    """
+    chunks = stream(user, fmt, versions, trashed)
+    next_chunk = sync_to_async(next)
+    try:
+        while (chunk := await next_chunk(chunks, _DONE)) is not _DONE:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
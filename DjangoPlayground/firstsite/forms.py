@@ -1,6 +1,7 @@
 from django import forms
 from .models import Note, Tag
 from django.contrib.auth.models import User
+from . import sending
 
 # Form for creating and updating notes
 class NoteForm(forms.ModelForm):
@@ -46,18 +47,22 @@ class TagForm(forms.ModelForm):
 
 # Form for sending a note to another user   
 class SendNoteForm(forms.Form):
-    recipient_username = forms.CharField(max_length=150, label="Send to (username)")
+    recipient_username = forms.CharField(max_length=1000, label="Send to (usernames, comma-separated)")
 
     def clean_recipient_username(self):
-        name = (self.cleaned_data.get('recipient_username') or "")
-        name = str(name).strip()
-        if not name:
+        # Returns the list of Users, in the order typed (see sending.py).
+        names = sending.parse_usernames(self.cleaned_data.get('recipient_username') or "")
+        if not names:
             raise forms.ValidationError("Please enter a username.")
-        
-        try:
-            return User.objects.get(username=name)
-        except User.DoesNotExist:
-            raise forms.ValidationError("No such user.")
+        if len(names) > sending.MAX_RECIPIENTS:
+            raise forms.ValidationError(f"You can send to at most {sending.MAX_RECIPIENTS} users at once.")
+
+        found, missing = sending.resolve_recipients(names)
+        if missing:
+            if len(names) == 1:
+                raise forms.ValidationError("No such user.")
+            raise forms.ValidationError(f"No such user: {', '.join(missing)}.")
+        return [found[name] for name in names]
 
 # Form for sharing a note (live, read-only) with another user
 class ShareNoteForm(forms.Form):
@@ -0,0 +1,214 @@
+"""
+Bulk import of notes (POST /api/notes/import/, `manage.py import_notes`).
+
+Creating notes one by one costs an INSERT, the post_save handlers and a
+NoteEvent each. Here the input is parsed as a stream of records and written
+in batches, each in one transaction:
+
+- notes with one bulk_create, tag links with one more (tags are resolved by
+  name for the whole batch with utils.resolve_tags, created if missing);
+- ONE aggregate NoteEvent per batch ('create', no note link, titled
+  "Imported N notes"), so analytics count an import batch as one create;
+- the batch's notes are added to the search index.
+
+Inputs:
+- JSON Lines, as written by export.py: title, content, tags (names),
+  is_pinned, is_archived, deleted_at. Other keys (id, timestamps, versions)
+  are ignored; imported notes are new notes created now.
+- A zip of .md files (export.py's zip, or any folder of Markdown zipped up):
+  an optional `---` front-matter block (`key: <json value>` lines) gives
+  title/tags/pinned/archived; otherwise the title is the first "# heading"
+  or the file name. `versions/` members are skipped.
+
+Resumability: every record has a position (line number, or member index in
+the zip). `import_records` reports the position to resume from after each
+committed batch; pass it back as `start_at` to skip what is already in. A
+database error while writing a batch rolls that batch back and ends the
+import early: the summary then has `stopped` (position + detail) and
+next_position is the failed batch's first record.
+"""
+import json
+import os
+import zipfile
+from itertools import islice
+
+from django.db import DatabaseError, transaction
+from django.utils.dateparse import parse_datetime
+
+from . import listcache, search
+from .models import Note, NoteEvent, Tag
+from .utils import build_note_event, resolve_tags
+
+BATCH_SIZE = 500
+FORMATS = ("jsonl", "zip")
+MAX_REPORTED_ERRORS = 20
+
+_TITLE_MAX = Note._meta.get_field("title").max_length
+_TAG_MAX = Tag._meta.get_field("name").max_length
+
+
+class RecordError(ValueError):
+    pass
+
+
+def detect_format(fileobj):
+    """'zip' or 'jsonl', by content. Leaves the file at the start."""
+    fmt = "zip" if zipfile.is_zipfile(fileobj) else "jsonl"
+    fileobj.seek(0)
+    return fmt
+
+
+def iter_jsonl(fileobj):
+    """Yield (position, record-or-RecordError) per non-blank line; position = line number."""
+    for position, raw in enumerate(fileobj, start=1):
+        line = raw.decode("utf-8-sig") if isinstance(raw, bytes) else raw
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield position, RecordError("Not valid JSON.")
+            continue
+        if not isinstance(data, dict):
+            yield position, RecordError("Each line must be a JSON object.")
+            continue
+        yield position, data
+
+
+def parse_markdown(text, filename):
+    """Split optional front matter off a Markdown file; returns a record dict."""
+    record = {}
+    body = text
+    if text.startswith("---\n"):
+        end = text.find("\n---\n", 4)
+        if end != -1:
+            for line in text[4:end].splitlines():
+                key, sep, value = line.partition(":")
+                if not sep:
+                    continue
+                try:
+                    record[key.strip()] = json.loads(value)
+                except ValueError:
+                    record[key.strip()] = value.strip()
+            body = text[end + len("\n---\n"):].lstrip("\n")
+    record["content"] = body
+    if "pinned" in record:
+        record["is_pinned"] = record.pop("pinned")
+    if "archived" in record:
+        record["is_archived"] = record.pop("archived")
+    if not record.get("title"):
+        heading = next((line for line in body.splitlines() if line.startswith("# ")), None)
+        record["title"] = heading[2:].strip() if heading else os.path.splitext(os.path.basename(filename))[0]
+    return record
+
+
+def iter_markdown_zip(fileobj):
+    """Yield (position, record-or-RecordError) per .md member, in name order."""
+    with zipfile.ZipFile(fileobj) as archive:
+        names = sorted(
+            n for n in archive.namelist()
+            if n.lower().endswith(".md") and not n.startswith(("versions/", "__MACOSX/"))
+        )
+        for position, name in enumerate(names, start=1):
+            try:
+                text = archive.read(name).decode("utf-8-sig")
+            except UnicodeDecodeError:
+                yield position, RecordError(f"{name}: not UTF-8 text.")
+                continue
+            yield position, parse_markdown(text, name)
+
+
+def iter_records(fileobj, fmt):
+    return iter_markdown_zip(fileobj) if fmt == "zip" else iter_jsonl(fileobj)
+
+
+def _clean(data):
+    """Record dict -> (Note field values, tag names). Raises RecordError."""
+    title = data.get("title")
+    content = data.get("content")
+    if title is not None and not isinstance(title, str):
+        raise RecordError("title must be a string.")
+    if content is not None and not isinstance(content, str):
+        raise RecordError("content must be a string.")
+    title, content = (title or "").strip(), content or ""
+    if not title and not content.strip():
+        raise RecordError("A note needs a title or content.")
+    tags = data.get("tags") or []
+    if not isinstance(tags, list) or not all(isinstance(t, str) for t in tags):
+        raise RecordError("tags must be a list of names.")
+    deleted_at = None
+    if data.get("deleted_at"):
+        deleted_at = parse_datetime(str(data["deleted_at"]))
+        if deleted_at is None:
+            raise RecordError("deleted_at is not a valid timestamp.")
+    if not title:
+        first_line = content.strip().splitlines()[0]
+        title = first_line.lstrip("#").strip() or "Untitled"
+    fields = {
+        "title": title[:_TITLE_MAX],
+        "content": content,
+        "is_pinned": bool(data.get("is_pinned")),
+        "is_archived": bool(data.get("is_archived")),
+        "deleted_at": deleted_at,
+    }
+    names = list(dict.fromkeys(t.strip()[:_TAG_MAX] for t in tags if t.strip()))
+    return fields, names
+
+
+def _write_batch(user, batch):
+    """batch: [(Note field values, tag names), ...]. Returns the notes created."""
+    with transaction.atomic():
+        notes = Note.objects.bulk_create([Note(owner=user, **fields) for fields, _ in batch])
+        tags = resolve_tags({user.pk}, {name for _, names in batch for name in names})
+        Link = Note.tags.through
+        Link.objects.bulk_create(
+            [
+                Link(note_id=note.pk, tag_id=tags[(user.pk, name)].pk)
+                for note, (_, names) in zip(notes, batch)
+                for name in names
+            ],
+            ignore_conflicts=True,
+        )
+        event = build_note_event(user, None, NoteEvent.ACTION_CREATE)
+        event.note_title = f"Imported {len(notes)} note{'s' if len(notes) != 1 else ''}"
+        event.save()  # the post_save handler adds it to the analytics rollup
+        search.index_notes(notes)
+        listcache.bump(user.pk)
+    return notes
+
+
+def import_records(user, records, batch_size=BATCH_SIZE, start_at=0, on_batch=None):
+    """
+    Import (position, record) pairs for `user`, skipping positions below
+    `start_at`. Returns a summary dict:
+      imported, failed, errors (first few: {position, detail}), next_position
+    and, if a batch could not be written, stopped: {position, detail}.
+    `on_batch(summary)` is called after each committed batch; its
+    next_position is where to resume if the import stops there.
+    """
+    summary = {"imported": 0, "failed": 0, "errors": [], "next_position": start_at}
+    records = ((p, r) for p, r in records if p >= start_at)
+    while True:
+        chunk = list(islice(records, batch_size))
+        if not chunk:
+            return summary
+        batch, errors = [], []
+        for position, data in chunk:
+            try:
+                if isinstance(data, RecordError):
+                    raise data
+                batch.append(_clean(data))
+            except RecordError as exc:
+                errors.append({"position": position, "detail": str(exc)})
+        if batch:
+            try:
+                summary["imported"] += len(_write_batch(user, batch))
+            except DatabaseError as exc:
+                # Rolled back: resuming at next_position retries the whole chunk.
+                summary["stopped"] = {"position": chunk[0][0], "detail": str(exc)}
+                return summary
+        summary["failed"] += len(errors)
+        summary["errors"] += errors[:MAX_REPORTED_ERRORS - len(summary["errors"])]
+        summary["next_position"] = chunk[-1][0] + 1
+        if on_batch is not None:
+            on_batch(summary)
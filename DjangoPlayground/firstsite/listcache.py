@@ -0,0 +1,94 @@
+"""
+Per-user cache of the note list page (note_lists_view).
+
+Every user has a "notes generation" value in the cache. Anything that
+changes what their list page shows bumps it: Note and Tag saves/deletes and
+tag-link changes through signals (signals.py, which covers the pin/archive
+toggles, trash and restore), and the bulk writers that send no signals
+(batch, import, send, trash.delete_notes) by calling `bump` themselves.
+
+The rendered page content is cached under the current generation, so a bump
+makes every older entry unreachable at once, with nothing to delete; stale
+entries just expire (NOTE_LIST_CACHE_TTL). A repeat visit costs two cache
+reads: the generation, then the entry.
+
+Entries per user are bounded by NOTE_LIST_CACHE_SLOTS: a page's key is one of
+that many slots, picked by hashing its URL, and the entry stores the URL it
+was rendered for, so two pages sharing a slot just evict each other.
+Entries are read and filled through caching.get_or_compute, so a burst of
+requests for the same page after a bump renders it once.
+
+The cached HTML contains the page's CSRF tokens, so the user's CSRF secret is
+part of the URL identity: after a new login (new secret) pages re-render.
+"""
+import time
+import zlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.middleware.csrf import get_token
+from django.utils.safestring import mark_safe
+
+from . import caching
+
+
+def _generation_key(user_id):
+    return caching.make_key("notes-gen", user_id)
+
+
+def _start():
+    # A generation that was evicted restarts at a value never used before,
+    # not at 0, so entries from before the eviction can't come back.
+    return time.time_ns()
+
+
+def generation(user_id):
+    key = _generation_key(user_id)
+    value = cache.get(key)
+    if value is None:
+        value = _start()
+        if not cache.add(key, value, timeout=None):
+            value = cache.get(key, value)
+    return value
+
+
+def _incr(user_id):
+    # A fresh value rather than cache.incr: incr is a read-then-write on the
+    # file backend, and a plain set can't lose a bump to a concurrent one.
+    cache.set(_generation_key(user_id), _start(), timeout=None)
+
+
+def bump(user_id):
+    """Invalidate every cached list page of this user."""
+    _incr(user_id)
+    # Inside a transaction, a request between this bump and the commit can
+    # still read the old rows and cache them under the new generation; bump
+    # again once the change is visible.
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _incr(user_id))
+
+
+def bump_many(user_ids):
+    for user_id in set(user_ids):
+        bump(user_id)
+
+
+def cached_page(request, render):
+    """
+    The list page content for this request: from the cache, or `render()`
+    (which returns the HTML) stored for next time.
+    """
+    ttl = settings.NOTE_LIST_CACHE_TTL
+    if ttl <= 0:
+        return render()
+    user_id = request.user.pk
+    get_token(request)  # creates the CSRF secret on a first visit
+    identity = f"{request.META['CSRF_COOKIE']} {request.get_full_path()}"
+    slot = zlib.crc32(identity.encode()) % settings.NOTE_LIST_CACHE_SLOTS
+    key = caching.make_key("notes-list", user_id, generation(user_id), slot)
+    _, html = caching.get_or_compute(
+        key, lambda: (identity, str(render())), timeout=ttl, namespace="notes-list",
+        accept=lambda entry: entry[0] == identity,
+    )
+    return mark_safe(html)
@@ -0,0 +1,116 @@
+import socket
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class DelayProxy:
+    """
+    Local TCP forwarder that waits `latency` seconds before connecting each new
+    client to the real server: a stand-in for a database across a network
+    (round trips, TLS) when the server under test is a local container.
+    """
+
+    def __init__(self, host, port, latency):
+        self.target = (host, int(port))
+        self.latency = latency
+        self.server = socket.create_server(("127.0.0.1", 0))
+        self.port = self.server.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self.server.accept()
+            except OSError:  # closed
+                return
+            threading.Thread(target=self._serve, args=(client,), daemon=True).start()
+
+    def _serve(self, client):
+        time.sleep(self.latency)
+        upstream = socket.create_connection(self.target)
+        for src, dst in ((client, upstream), (upstream, client)):
+            threading.Thread(target=self._pump, args=(src, dst), daemon=True).start()
+
+    @staticmethod
+    def _pump(src, dst):
+        try:
+            while data := src.recv(65536):
+                dst.sendall(data)
+        except OSError:
+            pass
+        finally:
+            dst.close()
+
+    def close(self):
+        self.server.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the per-request database connection cost of a new connection per "
+        "request (CONN_MAX_AGE=0, no pool) with the configured setup (persistent "
+        "connections or a pool, see DB_CONN_MAX_AGE / DB_POOL). Each simulated request "
+        "runs what Django's request_started/request_finished handlers do around one "
+        "SELECT 1. For PostgreSQL, --proxy-latency MS routes connections through a "
+        "local proxy that adds MS to every connect (e.g. against a local container)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--proxy-latency", type=float, default=0, help="Milliseconds added to each connect.")
+
+    def handle(self, *args, **options):
+        default = connections["default"]
+        settings_dict = dict(default.settings_dict)
+        proxy = None
+        if options["proxy_latency"]:
+            if not settings_dict["HOST"]:
+                raise CommandError("--proxy-latency needs a database reached over TCP (DB_HOST).")
+            proxy = DelayProxy(settings_dict["HOST"], settings_dict["PORT"] or 5432, options["proxy_latency"] / 1000)
+            settings_dict.update(HOST="127.0.0.1", PORT=str(proxy.port))
+
+        fresh = {**settings_dict, "CONN_MAX_AGE": 0,
+                 "OPTIONS": {k: v for k, v in settings_dict["OPTIONS"].items() if k != "pool"}}
+        pool = "pool" in settings_dict["OPTIONS"]
+        configured = f"pool={pool}" if pool else f"CONN_MAX_AGE={settings_dict['CONN_MAX_AGE']}"
+        self.stdout.write(f"{settings_dict['ENGINE']}, {options['requests']} requests per mode")
+        try:
+            modes = [
+                ("fresh", "new connection per request", fresh),
+                ("configured", f"configured ({configured})", settings_dict),
+            ]
+            for alias, label, conn_settings in modes:
+                wrapper = default.__class__(conn_settings, alias=f"bench-{alias}")
+                try:
+                    times = self.simulate(wrapper, options["requests"])
+                finally:
+                    wrapper.close()
+                    if pool:
+                        wrapper.close_pool()
+                self.stdout.write(
+                    f"{label}: mean={sum(times) / len(times):.2f} ms "
+                    f"p50={percentile(times, 50):.2f} ms p99={percentile(times, 99):.2f} ms"
+                )
+        finally:
+            if proxy:
+                proxy.close()
+
+    def simulate(self, wrapper, n):
+        times = []
+        for _ in range(n):
+            start = time.perf_counter()
+            wrapper.close_if_unusable_or_obsolete()  # request_started
+            with wrapper.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            wrapper.close_if_unusable_or_obsolete()  # request_finished
+            times.append((time.perf_counter() - start) * 1000)
+        return times
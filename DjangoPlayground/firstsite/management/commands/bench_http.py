@@ -0,0 +1,118 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(samples, p):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection; reconnects when the server closes it."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def get(self, target, headers):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        request = f"GET {target} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+        request += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+        self.writer.write((request + "\r\n").encode())
+        try:
+            status_line = await self.reader.readline()
+            if not status_line:
+                raise ConnectionError("connection closed")
+            status = int(status_line.split()[1])
+            length, keep_alive = 0, True
+            while (line := await self.reader.readline()) not in (b"\r\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                name, value = name.strip().lower(), value.strip().lower()
+                if name == "content-length":
+                    length = int(value)
+                elif name == "connection" and value == "close":
+                    keep_alive = False
+            await self.reader.readexactly(length)
+        except BaseException:
+            self.close()
+            raise
+        if not keep_alive:
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+class Command(BaseCommand):
+    help = (
+        "HTTP load generator: `concurrency` keep-alive connections send GETs to URL "
+        "(as fast as the server answers) until `requests` have completed. Reports "
+        "requests/s, latency percentiles and errors (connection errors and non-2xx/304 "
+        "answers). Point it at the WSGI stack (gunicorn sync workers) and at the ASGI "
+        "one (APP_SERVER=asgi, uvicorn workers), e.g. /api/notes/ and /api/async/notes/, "
+        "to compare throughput under many concurrent connections."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("urls", nargs="+", metavar="URL", help="Benchmarked one after the other.")
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--requests", type=int, default=2000, help="Per URL.")
+        parser.add_argument("--token", help="API token, sent as 'Authorization: Token ...'.")
+
+    def handle(self, *args, **options):
+        headers = {"Connection": "keep-alive"}
+        if options["token"]:
+            headers["Authorization"] = f"Token {options['token']}"
+        for url in options["urls"]:
+            parts = urlsplit(url)
+            if parts.scheme != "http" or not parts.hostname:
+                raise CommandError(f"{url}: only http:// URLs are supported.")
+            result = asyncio.run(self.run(parts, headers, options["concurrency"], options["requests"]))
+            self.stdout.write(
+                f"{url}: {result['ok']} ok, {result['errors']} errors, "
+                f"{result['rps']:.0f} req/s, p50={result['p50']:.1f} ms p99={result['p99']:.1f} ms "
+                f"(concurrency {options['concurrency']})"
+            )
+
+    async def run(self, parts, headers, concurrency, total):
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        times, counts = [], {"ok": 0, "errors": 0}
+        remaining = total
+
+        async def worker():
+            nonlocal remaining
+            conn = Connection(parts.hostname, parts.port or 80)
+            try:
+                while remaining > 0:
+                    remaining -= 1
+                    start = time.perf_counter()
+                    try:
+                        status = await conn.get(target, headers)
+                    except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+                        counts["errors"] += 1
+                        continue
+                    times.append((time.perf_counter() - start) * 1000)
+                    counts["ok" if 200 <= status < 300 or status == 304 else "errors"] += 1
+            finally:
+                conn.close()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        return {
+            **counts,
+            "rps": counts["ok"] / elapsed if elapsed else 0.0,
+            "p50": percentile(times, 50),
+            "p99": percentile(times, 99),
+        }
@@ -0,0 +1,55 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+PATH = "/notes/list/"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure session writes per request: SESSION_REFRESH_FRACTION=1 (a save on "
+        "every request, the old SESSION_SAVE_EVERY_REQUEST) against the configured "
+        f"fraction, over N logged-in GETs of {PATH}. Runs in a transaction that is "
+        "rolled back, so it leaves no data behind."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+
+    def handle(self, *args, **options):
+        n = options["requests"]
+        modes = [("every request", 1.0), (f"fraction={settings.SESSION_REFRESH_FRACTION}", settings.SESSION_REFRESH_FRACTION)]
+        self.stdout.write(f"SESSION_ENGINE={settings.SESSION_ENGINE}, {n} requests per mode")
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=["testserver"]):
+            user = User.objects.create_user("bench-sessions", password="x")
+            for label, fraction in modes:
+                with override_settings(SESSION_REFRESH_FRACTION=fraction):
+                    writes, cookies, elapsed = self.run_mode(user, n)
+                self.stdout.write(
+                    f"{label}: {writes / n:.2f} session row writes/request, "
+                    f"{cookies / n:.2f} session Set-Cookies/request, "
+                    f"{elapsed / n * 1000:.2f} ms/request"
+                )
+            transaction.set_rollback(True)
+
+    def run_mode(self, user, n):
+        client = Client()
+        client.force_login(user)
+        client.get(PATH, secure=True)  # warm-up: the first request stamps the new session
+        cookies = 0
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            for _ in range(n):
+                response = client.get(PATH, secure=True)
+                cookies += settings.SESSION_COOKIE_NAME in response.cookies
+            elapsed = time.perf_counter() - start
+        writes = sum(
+            q["sql"].startswith(("UPDATE", "INSERT")) and "django_session" in q["sql"]
+            for q in ctx.captured_queries
+        )
+        return writes, cookies, elapsed
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from firstsite import caching
+
+
+class Command(BaseCommand):
+    help = (
+        "Show hit/miss counts per cache namespace, summed over every worker "
+        "sharing the cache (each worker adds its counts every "
+        f"{caching.STATS_FLUSH_EVERY} lookups). --reset zeroes them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("namespaces", nargs="*",
+                            help=f"Namespaces to show (default: {', '.join(caching.NAMESPACES)}).")
+        parser.add_argument("--reset", action="store_true", help="Zero the counters afterwards.")
+
+    def handle(self, *args, **options):
+        namespaces = options["namespaces"] or caching.NAMESPACES
+        for namespace, counts in caching.stats(namespaces).items():
+            ratio = counts["hit_ratio"]
+            ratio = f"{ratio:.1%}" if ratio is not None else "-"
+            self.stdout.write(f"{namespace}: hits={counts['hits']} misses={counts['misses']} hit ratio={ratio}")
+        if options["reset"]:
+            caching.reset_stats(namespaces)
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
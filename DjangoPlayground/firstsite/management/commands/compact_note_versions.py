@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from firstsite import versioning
+from firstsite.models import NoteVersion
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert existing NoteVersion history to delta storage (keyframes + line "
+        "diffs), or back to full copies with --mode full. Reports the stored size "
+        "before/after and how long it takes to rebuild a version afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--mode", choices=["delta", "full"], default=None,
+                            help="Target storage (default: settings.NOTE_VERSION_STORAGE).")
+        parser.add_argument("--note", type=int, action="append", dest="notes",
+                            help="Only repack this note id (repeatable).")
+
+    def handle(self, *args, **options):
+        mode = options["mode"] or versioning.storage_mode()
+        if mode not in ("delta", "full"):
+            raise CommandError(f"Unknown NOTE_VERSION_STORAGE mode: {mode!r}")
+
+        note_ids = options["notes"] or list(
+            NoteVersion.objects.order_by().values_list("note_id", flat=True).distinct()
+        )
+        before = after = 0
+        for note_id in note_ids:
+            b, a = versioning.repack_note_history(note_id, mode)
+            before += b
+            after += a
+
+        ratio = after / before if before else 1.0
+        self.stdout.write(
+            f"Repacked {len(note_ids)} note(s) as {mode}: "
+            f"{before} -> {after} bytes stored ({ratio:.1%} of the previous size)."
+        )
+        self._report_latency(note_ids)
+
+    def _report_latency(self, note_ids):
+        """Rebuild every version from scratch, one at a time, and time it."""
+        timings = []
+        for pk in NoteVersion.objects.filter(note_id__in=note_ids).values_list("pk", flat=True).iterator():
+            start = time.perf_counter()
+            NoteVersion.objects.get(pk=pk).full_content
+            timings.append(time.perf_counter() - start)
+        if not timings:
+            return
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconstruction over {len(timings)} version(s): "
+            f"avg {sum(timings) / len(timings) * 1000:.2f} ms, "
+            f"p95 {p95 * 1000:.2f} ms, max {timings[-1] * 1000:.2f} ms."
+        ))
@@ -0,0 +1,44 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from firstsite import export
+
+
+class Command(BaseCommand):
+    help = (
+        "Export one user's notes (with tags, optionally version history) as "
+        "JSON Lines or a zip of Markdown files. Streams, so memory use does "
+        "not depend on the number of notes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("--as", dest="fmt", choices=export.FORMATS, default="jsonl",
+                            help="Output format (default: %(default)s).")
+        parser.add_argument("--versions", action="store_true", help="Include version history.")
+        parser.add_argument("--trashed", action="store_true", help="Include notes in the Trash.")
+        parser.add_argument("-o", "--output", help="File to write (default: stdout).")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"No such user: {options['username']}")
+
+        chunks = export.stream(user, options["fmt"], versions=options["versions"],
+                               trashed=options["trashed"])
+        if options["output"]:
+            with open(options["output"], "wb") as out:
+                for chunk in chunks:
+                    out.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Wrote {options['output']}."))
+        elif options["fmt"] == "jsonl":
+            for chunk in chunks:
+                self.stdout.write(chunk.decode(), ending="")
+        else:
+            # Binary: bypass the text wrapper.
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
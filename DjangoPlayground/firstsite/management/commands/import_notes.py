@@ -0,0 +1,85 @@
+import json
+import os
+import zipfile
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from firstsite import importing
+
+
+class Command(BaseCommand):
+    help = (
+        "Import notes for a user from a JSON Lines file or a zip of Markdown "
+        "files, in batches. Progress is printed per batch; with --state the "
+        "position reached is saved after every batch and a rerun continues "
+        "from there."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("path", help="A .jsonl file or a .zip of .md files.")
+        parser.add_argument("--batch-size", type=int, default=importing.BATCH_SIZE,
+                            help="Notes per transaction (default: %(default)s).")
+        parser.add_argument("--start-at", type=int, default=None, metavar="POSITION",
+                            help="Skip records before this position (line number / zip member).")
+        parser.add_argument("--state", metavar="FILE",
+                            help="Resume file: read on start, rewritten after each batch, "
+                                 "removed when the import completes.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"No such user: {options['username']}")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        path = options["path"]
+        state_path = options["state"]
+        start_at = options["start_at"] or 0
+        if options["start_at"] is None and state_path and os.path.exists(state_path):
+            with open(state_path) as fh:
+                state = json.load(fh)
+            if state.get("source") != os.path.abspath(path):
+                raise CommandError(f"{state_path} belongs to an import of {state.get('source')}.")
+            start_at = state["next_position"]
+            self.stdout.write(f"Resuming at position {start_at}.")
+
+        def progress(summary):
+            self.stdout.write(
+                f"  {summary['imported']} imported, {summary['failed']} failed, "
+                f"next position {summary['next_position']}"
+            )
+            if state_path:
+                with open(state_path, "w") as fh:
+                    json.dump({"source": os.path.abspath(path),
+                               "next_position": summary["next_position"]}, fh)
+
+        try:
+            with open(path, "rb") as fh:
+                fmt = importing.detect_format(fh)
+                summary = importing.import_records(
+                    user, importing.iter_records(fh, fmt),
+                    batch_size=options["batch_size"], start_at=start_at, on_batch=progress,
+                )
+        except OSError as exc:
+            raise CommandError(str(exc))
+        except zipfile.BadZipFile:
+            raise CommandError(f"{path} is not a valid zip archive.")
+
+        for error in summary["errors"]:
+            self.stderr.write(f"position {error['position']}: {error['detail']}")
+        if "stopped" in summary:
+            stopped = summary["stopped"]
+            raise CommandError(
+                f"Stopped at position {stopped['position']} ({stopped['detail']}) after "
+                f"{summary['imported']} note(s); rerun with --start-at {summary['next_position']}"
+                + (" or the same --state file." if state_path else ".")
+            )
+        if state_path and os.path.exists(state_path):
+            os.remove(state_path)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {summary['imported']} note(s) for {user.username} "
+            f"({summary['failed']} record(s) failed)."
+        ))
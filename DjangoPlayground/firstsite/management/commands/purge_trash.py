@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from firstsite import trash
+
+
+class Command(BaseCommand):
+    help = (
+        "Permanently delete notes that have been in the Trash for more than "
+        "--older-than days, in small batches (one short transaction each) so "
+        "the notes table is never locked for long. Safe to run from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than", type=int, required=True, metavar="DAYS",
+                            help="Purge notes trashed more than this many days ago.")
+        parser.add_argument("--batch-size", type=int, default=trash.BATCH_SIZE,
+                            help="Notes deleted per transaction (default: %(default)s).")
+        parser.add_argument("--pause", type=float, default=0.0, metavar="SECONDS",
+                            help="Sleep between batches to leave room for other writers.")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Only report how many notes would be purged.")
+
+    def handle(self, *args, **options):
+        days = options["older_than"]
+        if days < 0:
+            raise CommandError("--older-than must be 0 or more.")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        qs = trash.expired(days)
+        if options["dry_run"]:
+            self.stdout.write(f"{qs.count()} note(s) trashed more than {days} day(s) ago would be purged.")
+            return
+
+        def progress(total):
+            if options["verbosity"] > 1:
+                self.stdout.write(f"  {total} purged so far")
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+        purged = trash.purge_notes(qs, batch_size=options["batch_size"], on_batch=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Purged {purged} note(s) trashed more than {days} day(s) ago."
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from firstsite import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index from every live (non-trashed) note."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        if search.backend() is None:
+            self.stdout.write("No search index for this database backend; nothing to do.")
+            return
+        count = search.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} note(s)."))
@@ -0,0 +1,36 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from firstsite import rollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfill the NoteEventDaily analytics rollup from the raw NoteEvent table, "
+        "or with --check, report where the two disagree (exit code 1 on mismatch)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true",
+                            help="Compare only; don't write anything.")
+        parser.add_argument("--user", help="Limit to one username.")
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            try:
+                user = User.objects.get(username=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"No such user: {options['user']}")
+
+        if options["check"]:
+            mismatches = rollup.check(user)
+            for user_id, day, action, rolled, raw in mismatches:
+                self.stdout.write(f"user={user_id} day={day} action={action}: rollup={rolled} raw={raw}")
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} rollup row(s) disagree with the raw events.")
+            self.stdout.write(self.style.SUCCESS("Rollup matches the raw events."))
+            return
+
+        written = rollup.rebuild(user)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} daily rollup row(s)."))
@@ -0,0 +1,137 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from DjangoPlayground.settings_base import sqlite_options
+
+SETUP = """
+CREATE TABLE note (id INTEGER PRIMARY KEY, owner_id INTEGER, title TEXT, content TEXT, updated_at REAL);
+CREATE INDEX note_owner ON note (owner_id, updated_at);
+CREATE TABLE version (id INTEGER PRIMARY KEY, note_id INTEGER, content TEXT, timestamp REAL);
+"""
+NOTES = 200
+
+
+def percentile(samples, p):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def connect(path, options):
+    # Like Django's sqlite backend: autocommit connection (isolation_level=None,
+    # transactions opened explicitly), default 5 s timeout, init_command run
+    # statement by statement.
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    for command in options.get("init_command", "").split(";"):
+        if command.strip():
+            conn.execute(command)
+    return conn
+
+
+class Command(BaseCommand):
+    help = (
+        "Stress a scratch SQLite file with parallel writers (each op: a transaction "
+        "that reads a note, updates it and adds a version, like a note edit) and "
+        "readers (list queries), once per SQLite profile from settings_base. Reports "
+        "'database is locked' errors and write/read latency percentiles."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profile", choices=["default", "production", "both"], default="both")
+        parser.add_argument("--writers", type=int, default=8)
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--ops", type=int, default=200, help="Transactions per writer.")
+
+    def handle(self, *args, **options):
+        profiles = ["default", "production"] if options["profile"] == "both" else [options["profile"]]
+        for profile in profiles:
+            result = self.run_profile(profile, options["writers"], options["readers"], options["ops"])
+            self.stdout.write(
+                f"{profile}: {result['committed']} writes committed, {result['locked']} lock errors, "
+                f"write p50={result['write_p50']:.2f} ms p99={result['write_p99']:.2f} ms, "
+                f"read p99={result['read_p99']:.2f} ms, {result['throughput']:.0f} writes/s"
+            )
+
+    def run_profile(self, profile, writers, readers, ops):
+        opts = sqlite_options(profile)
+        begin = f"BEGIN {opts['transaction_mode']}" if opts.get("transaction_mode") else "BEGIN"
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "stress.sqlite3")
+            setup = connect(path, opts)
+            setup.executescript(SETUP)
+            setup.executemany(
+                "INSERT INTO note (owner_id, title, content, updated_at) VALUES (?, ?, ?, ?)",
+                [(i % 10, f"note {i}", "x" * 500, time.time()) for i in range(NOTES)],
+            )
+            setup.close()
+
+            write_times, read_times = [], []
+            counts = {"committed": 0, "locked": 0}
+            lock = threading.Lock()
+            done = threading.Event()
+
+            def writer(n):
+                conn = connect(path, opts)
+                for i in range(ops):
+                    note_id = (n * ops + i) % NOTES + 1
+                    start = time.perf_counter()
+                    try:
+                        conn.execute(begin)
+                        (content,) = conn.execute("SELECT content FROM note WHERE id = ?", (note_id,)).fetchone()
+                        conn.execute("INSERT INTO version (note_id, content, timestamp) VALUES (?, ?, ?)",
+                                     (note_id, content, time.time()))
+                        conn.execute("UPDATE note SET content = ?, updated_at = ? WHERE id = ?",
+                                     (content[::-1], time.time(), note_id))
+                        conn.execute("COMMIT")
+                        outcome = "committed"
+                    except sqlite3.OperationalError as exc:
+                        if "locked" not in str(exc) and "busy" not in str(exc):
+                            raise
+                        if conn.in_transaction:
+                            conn.execute("ROLLBACK")
+                        outcome = "locked"
+                    with lock:
+                        counts[outcome] += 1
+                        write_times.append((time.perf_counter() - start) * 1000)
+                conn.close()
+
+            def reader(n):
+                conn = connect(path, opts)
+                while not done.is_set():
+                    start = time.perf_counter()
+                    try:
+                        conn.execute(
+                            "SELECT id, title FROM note WHERE owner_id = ? ORDER BY updated_at DESC LIMIT 8",
+                            (n % 10,),
+                        ).fetchall()
+                    except sqlite3.OperationalError:
+                        continue
+                    with lock:
+                        read_times.append((time.perf_counter() - start) * 1000)
+                conn.close()
+
+            threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+            read_threads = [threading.Thread(target=reader, args=(n,)) for n in range(readers)]
+            start = time.perf_counter()
+            for t in threads + read_threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - start
+            done.set()
+            for t in read_threads:
+                t.join()
+
+        return {
+            **counts,
+            "write_p50": percentile(write_times, 50),
+            "write_p99": percentile(write_times, 99),
+            "read_p99": percentile(read_times, 99),
+            "throughput": counts["committed"] / elapsed if elapsed else 0.0,
+        }
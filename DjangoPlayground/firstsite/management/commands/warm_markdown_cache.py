@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+
+from firstsite.models import Note, RenderedMarkdown
+from firstsite.templatetags.markdown_extras import content_digest, render_markdown
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-render every live note's Markdown into the RenderedMarkdown table. "
+        "Run after a deploy or a change to the Markdown/sanitizer config."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--force", action="store_true",
+                            help="Re-render even notes whose stored HTML is current.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        notes = Note.objects.only("id", "content").order_by("id")
+        rendered = skipped = 0
+        batch = []
+
+        def flush(batch):
+            nonlocal rendered, skipped
+            current = dict(
+                RenderedMarkdown.objects
+                .filter(note_id__in=[n.pk for n, _ in batch])
+                .values_list("note_id", "digest")
+            )
+            rows = [
+                RenderedMarkdown(note_id=note.pk, digest=digest, html=render_markdown(note.content))
+                for note, digest in batch
+                if options["force"] or current.get(note.pk) != digest
+            ]
+            RenderedMarkdown.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=["note"],
+                update_fields=["digest", "html", "rendered_at"],
+            )
+            rendered += len(rows)
+            skipped += len(batch) - len(rows)
+
+        for note in notes.iterator(chunk_size=batch_size):
+            batch.append((note, content_digest(note.content)))
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {rendered} note(s); {skipped} already up to date."
+        ))
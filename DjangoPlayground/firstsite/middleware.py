@@ -1,23 +1,168 @@
-# We want to store request.user so singals can access it.
-import threading
-_local = threading.local()
+"""
+Request context for code that has no `request` at hand: signals.py reads the
+acting user from it, logging adds the request id and elapsed time to records.
+
+It lives in a contextvars.ContextVar, not a threading.local: under ASGI many
+requests share one thread (one per coroutine context), and asgiref carries
+the context into sync_to_async / async_to_sync calls, so sync code run for an
+async view (signals on an awaited save, thread-sensitive ORM calls) sees the
+request it belongs to. Under WSGI every thread has its own context anyway.
+"""
+import contextvars
+import logging
+import re
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject, empty
+
+log = logging.getLogger('firstsite.requests')
+
+# Incoming X-Request-ID (e.g. from a proxy) is kept when it looks like an id.
+REQUEST_ID_HEADER = 'X-Request-ID'
+_REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+
+class RequestContext:
+    """One request: its id, when it started and (read when needed) its user."""
+
+    def __init__(self, request, request_id):
+        self.request = request
+        self.request_id = request_id
+        self.started = time.perf_counter()
+
+    @property
+    def user(self):
+        # Read at use time, not at request start: AuthenticationMiddleware,
+        # DRF token auth and login() all (re)set request.user later on.
+        return getattr(self.request, 'user', None)
+
+    def username(self):
+        """The user's username if the user is already known, without looking it up."""
+        user = getattr(self.request, 'user', None)
+        # request.user starts as a lazy object that loads the session (a
+        # query; not allowed from async code) when first touched.
+        if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+            return None
+        return getattr(user, 'username', None) or None
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+
+_current = contextvars.ContextVar('firstsite_request_context', default=None)
+
+
+def get_request_context():
+    """The RequestContext of the request being handled, or None outside one."""
+    return _current.get()
+
 
 def get_current_user():
-    return getattr(_local, 'user', None)
+    context = _current.get()
+    return context.user if context is not None else None
 
-class CurrentUserMiddleware:
+
+class RequestContextMiddleware:
     """
-    Middleware to attach the current user to thread local storage.
-    This allows signals and other code to access the user making the request.
+    Opens a RequestContext for each request (sync and async modes, so it
+    never forces a thread switch under ASGI) and sends the request id back in
+    X-Request-ID. Put it first in MIDDLEWARE so its timing covers the others.
     """
+    sync_capable = True
+    async_capable = True
 
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        _local.user = getattr(request, 'user', None)
+        if self.async_mode:
+            return self.__acall__(request)
+        context, token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, context)
+
+    async def __acall__(self, request):
+        context, token = self._start(request)
         try:
-            return self.get_response(request)
+            response = await self.get_response(request)
         finally:
-            _local.user = None  # Clean up after the request is done
-        
\ No newline at end of file
+            _current.reset(token)
+        return self._finish(request, response, context)
+
+    def _start(self, request):
+        request_id = request.headers.get(REQUEST_ID_HEADER, '')
+        if not _REQUEST_ID_RE.match(request_id):
+            request_id = uuid.uuid4().hex
+        context = RequestContext(request, request_id)
+        request.request_id = request_id
+        return context, _current.set(context)
+
+    def _finish(self, request, response, context):
+        response.headers.setdefault(REQUEST_ID_HEADER, context.request_id)
+        log.info('%s %s -> %s in %.1f ms [%s]', request.method, request.path,
+                 response.status_code, context.elapsed_ms(), context.request_id)
+        return response
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Adds request_id, username and elapsed_ms (ms since the request started)
+    to every record, "-" outside a request; see LOGGING in settings_base.py.
+    """
+
+    def filter(self, record):
+        context = _current.get()
+        record.request_id = context.request_id if context is not None else '-'
+        record.username = (context.username() if context is not None else None) or '-'
+        record.elapsed_ms = f'{context.elapsed_ms():.1f}' if context is not None else '-'
+        return True
+
+
+# Stored in the session: when it was last saved (unix seconds).
+SESSION_REFRESHED_KEY = '_refreshed_at'
+
+class SessionRefreshMiddleware:
+    """
+    Sliding session expiry without writing the session on every request.
+
+    SESSION_SAVE_EVERY_REQUEST re-saves the session on every request just to
+    push its expiry forward (an UPDATE of django_session per page view, htmx
+    toggles included). Instead this re-saves an unchanged session only once
+    at most SESSION_REFRESH_FRACTION of its lifetime is left. A session in
+    daily use is still never logged out, while the write rate drops to about
+    one per (1 - fraction) * lifetime. The cost is that an idle session can
+    now expire after (1 - fraction) * lifetime of inactivity, not only after
+    the full lifetime.
+
+    The lifetime is the session's own expiry age, so "remember me" (a
+    persistent SESSION_COOKIE_AGE cookie) and browser-session logins
+    (set_expiry(0)) in CustomLoginView behave as before. Must come after
+    SessionMiddleware so it runs before the session is saved.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        session = getattr(request, 'session', None)
+        if session is None or not session.accessed or session.is_empty():
+            return response
+        now = int(time.time())
+        if session.modified:
+            session[SESSION_REFRESHED_KEY] = now  # it's being saved anyway
+            return response
+        lifetime = session.get_expiry_age()
+        remaining = lifetime - (now - session.get(SESSION_REFRESHED_KEY, 0))
+        if remaining <= settings.SESSION_REFRESH_FRACTION * lifetime:
+            session[SESSION_REFRESHED_KEY] = now
+        return response
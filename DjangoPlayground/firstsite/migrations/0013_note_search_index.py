@@ -0,0 +1,56 @@
+# Full-text search index for notes (see firstsite/search.py).
+#
+# The index is not a Django model: SQLite gets an FTS5 virtual table and
+# PostgreSQL a GIN-indexed tsvector side table. Other backends get nothing and
+# search falls back to icontains. Existing live notes are backfilled here.
+
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS firstsite_note_fts "
+            "USING fts5(title, content, tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            "INSERT INTO firstsite_note_fts(rowid, title, content) "
+            "SELECT id, title, content FROM firstsite_note WHERE deleted_at IS NULL"
+        )
+    elif vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE TABLE IF NOT EXISTS firstsite_note_search ("
+            " note_id bigint PRIMARY KEY REFERENCES firstsite_note(id)"
+            "   ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,"
+            " document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS firstsite_note_search_document_gin "
+            "ON firstsite_note_search USING GIN (document)"
+        )
+        schema_editor.execute(
+            "INSERT INTO firstsite_note_search(note_id, document) "
+            "SELECT id, setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(content, '')), 'B') "
+            "FROM firstsite_note WHERE deleted_at IS NULL"
+        )
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS firstsite_note_fts")
+    elif vendor == "postgresql":
+        schema_editor.execute("DROP TABLE IF EXISTS firstsite_note_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('firstsite', '0012_noteshare'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
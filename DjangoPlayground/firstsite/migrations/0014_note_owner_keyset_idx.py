@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('firstsite', '0013_note_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['owner', '-is_pinned', '-created_at', '-id'], name='note_owner_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('firstsite', '0014_note_owner_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RenderedMarkdown',
+            fields=[
+                ('note', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rendered', serialize=False, to='firstsite.note')),
+                ('digest', models.CharField(max_length=64)),
+                ('html', models.TextField()),
+                ('rendered_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('firstsite', '0015_renderedmarkdown'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='noteversion',
+            name='base',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='firstsite.noteversion'),
+        ),
+        migrations.AddField(
+            model_name='noteversion',
+            name='delta',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='noteversion',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='noteversion',
+            name='keyframe',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='firstsite.noteversion'),
+        ),
+    ]
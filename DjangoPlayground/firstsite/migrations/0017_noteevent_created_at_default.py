@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('firstsite', '0016_noteversion_delta_storage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='noteevent',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill(apps, schema_editor):
+    # Seed the rollup from the existing raw events (see firstsite/rollup.py).
+    NoteEvent = apps.get_model('firstsite', 'NoteEvent')
+    NoteEventDaily = apps.get_model('firstsite', 'NoteEventDaily')
+    rows = (NoteEvent.objects
+            .filter(user__isnull=False)
+            .annotate(day=TruncDate('created_at'))
+            .values('user_id', 'day', 'action')
+            .annotate(count=Count('id'))
+            .order_by())
+    NoteEventDaily.objects.bulk_create(
+        [NoteEventDaily(**row) for row in rows], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('firstsite', '0017_noteevent_created_at_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteEventDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('action', models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('delete', 'Delete'), ('send', 'Send')], max_length=10)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='event_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'day', 'action'), name='uniq_event_daily')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
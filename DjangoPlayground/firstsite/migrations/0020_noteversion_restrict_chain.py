@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('firstsite', '0019_note_changes_sync'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='noteversion',
+            name='base',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.RESTRICT, related_name='+', to='firstsite.noteversion'),
+        ),
+        migrations.AlterField(
+            model_name='noteversion',
+            name='keyframe',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.RESTRICT, related_name='+', to='firstsite.noteversion'),
+        ),
+    ]
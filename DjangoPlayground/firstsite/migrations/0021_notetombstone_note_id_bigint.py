@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('firstsite', '0020_noteversion_restrict_chain'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notetombstone',
+            name='note_id',
+            field=models.BigIntegerField(),
+        ),
+    ]
@@ -1,12 +1,27 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 # Create your models here.
 
 
+class NoteQuerySet(models.QuerySet):
+    def for_listing(self, with_owner=False):
+        """
+        Shared query builder for anything that renders many notes (list page,
+        note cards, API lists). Prefetches tags in one extra query so a
+        page costs the same number of queries however many notes it shows;
+        `with_owner` also joins the owner for views that display it.
+        """
+        qs = self.prefetch_related('tags')
+        if with_owner:
+            qs = qs.select_related('owner')
+        return qs
+
+
 # Manager that hides soft-deleted (trashed) notes. This is the default manager,
 # so every existing `Note.objects...` query excludes trashed notes automatically.
 # Use `Note.all_objects` to reach trashed notes (the Trash page, restore, purge).
-class ActiveNoteManager(models.Manager):
+class ActiveNoteManager(models.Manager.from_queryset(NoteQuerySet)):
     def get_queryset(self):
         return super().get_queryset().filter(deleted_at__isnull=True)
 
@@ -26,7 +41,15 @@ class Note(models.Model):
     deleted_at = models.DateTimeField(null=True, blank=True, db_index=True)
 
     objects = ActiveNoteManager()          # default: active notes only
-    all_objects = models.Manager()         # escape hatch: includes trashed
+    all_objects = NoteQuerySet.as_manager()  # escape hatch: includes trashed
+
+    class Meta:
+        indexes = [
+            # Keyset pagination for the notes API (pinned first, newest first).
+            models.Index(fields=['owner', '-is_pinned', '-created_at', '-id'], name='note_owner_keyset_idx'),
+            # Delta sync (/api/notes/changes/): a user's notes in change order.
+            models.Index(fields=['owner', 'updated_at', 'id'], name='note_owner_changes_idx'),
+        ]
 
     @property
     def is_trashed(self):
@@ -51,12 +74,33 @@ class Tag(models.Model):
 class NoteVersion(models.Model):
     note = models.ForeignKey(Note, on_delete=models.CASCADE,related_name = 'versions')
     title = models.CharField(max_length=100)
+    # Full text for keyframes, empty for deltas. Read `full_content` instead.
     content = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
     updated_by = models.ForeignKey( User,on_delete=models.SET_NULL, null=True, blank=True, related_name='note_versions')
-    
+
+    # Delta storage (see versioning.py). All NULL/empty/0 for a keyframe.
+    # RESTRICT: a version later deltas are built on can only go together with
+    # its note (or through versioning.delete_versions).
+    base = models.ForeignKey('self', on_delete=models.RESTRICT, null=True, blank=True, related_name='+')
+    keyframe = models.ForeignKey('self', on_delete=models.RESTRICT, null=True, blank=True, related_name='+')
+    delta = models.TextField(blank=True, default='')
+    depth = models.PositiveSmallIntegerField(default=0)
+
     def __str__(self):
         return f"Version of {self.note.title} at {self.timestamp}"
+
+    @property
+    def is_delta(self):
+        return self.base_id is not None
+
+    @property
+    def full_content(self):
+        """The version's text, rebuilt from its keyframe if stored as a delta."""
+        if not hasattr(self, '_full_content'):
+            from .versioning import resolve
+            resolve(self)
+        return self._full_content
     
 # NoteSend Model
 class NoteSend (models.Model):
@@ -114,10 +158,73 @@ class NoteEvent(models.Model):
     note_title     = models.CharField(max_length=255, null=True, blank=True)
 
     action = models.CharField(max_length=10, choices=ACTION_CHOICES,db_index=True)
-    created_at = models.DateTimeField(auto_now_add=True,db_index=True)
+    # default (not auto_now_add) so buffered events keep the time they happened
+    # rather than the time they were bulk-inserted (see events.py).
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
 
     def __str__(self):
         # Format: "actor action note @ timestamp", preserving info if user or note is deleted
         who  = self.actor_username or (self.user.username if self.user_id else "unknown")
         what = self.note_title or (getattr(self.note, "title", None) or "note")
-        return f"{who} {self.action} {what} @ {self.created_at:%Y-%m-%d %H:%M}"
\ No newline at end of file
+        return f"{who} {self.action} {what} @ {self.created_at:%Y-%m-%d %H:%M}"
+
+# RenderedMarkdown (persistent tier of the Markdown render cache)
+class RenderedMarkdown(models.Model):
+    """
+    Sanitized HTML for a note's content, so note_detail doesn't rerun
+    python-markdown + nh3 on every view. `digest` hashes the content together
+    with the renderer config (see templatetags/markdown_extras.py); a row whose
+    digest no longer matches is simply re-rendered. Rows are dropped when the
+    note's content is saved and cascade away when the note is purged.
+    """
+    note = models.OneToOneField(Note, on_delete=models.CASCADE, primary_key=True, related_name='rendered')
+    digest = models.CharField(max_length=64)
+    html = models.TextField()
+    rendered_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Rendered note {self.note_id} ({self.digest[:12]})"
+
+
+# NoteEventDaily (pre-aggregated analytics rollup)
+class NoteEventDaily(models.Model):
+    """
+    Per-user, per-day, per-action NoteEvent counts. Kept up to date as events are
+    logged (see rollup.py) so analytics never has to GROUP BY a user's whole
+    event history; weekly/monthly/yearly buckets are summed from these rows.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='event_rollups')
+    day = models.DateField()
+    action = models.CharField(max_length=10, choices=NoteEvent.ACTION_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day', 'action'], name='uniq_event_daily'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.day} {self.action}: {self.count}"
+
+
+# NoteTombstone (purged notes, for delta sync)
+class NoteTombstone(models.Model):
+    """
+    Left behind when a note row is permanently deleted, so clients syncing via
+    /api/notes/changes/ learn about purges (a trashed note still has its row
+    and shows up there through `updated_at`). See sync.py.
+    """
+    # No DB constraint: when a user is deleted, their notes' post_delete can
+    # write tombstones after the cascade has already collected that user's
+    # tombstones. Such leftovers are harmless (nobody can sync as that user).
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False, related_name='+')
+    note_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'deleted_at', 'id'], name='tombstone_owner_changes_idx'),
+        ]
+
+    def __str__(self):
+        return f"Note {self.note_id} purged at {self.deleted_at}"
@@ -0,0 +1,207 @@
+"""
+Pre-aggregated analytics: NoteEventDaily(user, day, action, count).
+
+Analytics used to run TruncDay/Week/Month/Year + Count over a user's whole
+NoteEvent history on every page load. Instead:
+
+- every logged event bumps its (user, day, action) row: single events through
+  the NoteEvent post_save handler (signals.py), bulk inserts (the buffered
+  sink in events.py, batch endpoints) by calling `record_events` directly;
+- `series()` serves all buckets from the daily rows (weeks/months/years are
+  summed from days), for both the analytics page and the API;
+- `rebuild()` / `check()` backfill the table from, and compare it against, the
+  raw events (`manage.py rollup_note_events [--check]`).
+
+Days are calendar days in the current time zone, same as TruncDay gave.
+"""
+from collections import Counter
+from datetime import date, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek, TruncYear
+from django.utils import timezone
+
+from .models import NoteEvent, NoteEventDaily
+
+BUCKETS = {
+    'daily': None,  # rows are already daily
+    'weekly': TruncWeek,
+    'monthly': TruncMonth,
+    'yearly': TruncYear,
+}
+
+
+def _bump(user_id, day, action, n):
+    updated = (NoteEventDaily.objects
+               .filter(user_id=user_id, day=day, action=action)
+               .update(count=F('count') + n))
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            NoteEventDaily.objects.create(user_id=user_id, day=day, action=action, count=n)
+    except IntegrityError:
+        # Another request created the row between our UPDATE and INSERT.
+        (NoteEventDaily.objects
+         .filter(user_id=user_id, day=day, action=action)
+         .update(count=F('count') + n))
+
+
+def record_events(events):
+    """Add freshly inserted events to the rollup (one UPDATE per distinct day/action)."""
+    groups = Counter(
+        (e.user_id, timezone.localdate(e.created_at), e.action)
+        for e in events
+        if e.user_id
+    )
+    for (user_id, day, action), n in groups.items():
+        _bump(user_id, day, action, n)
+
+
+def series(user, actions, bucket='daily', date_from=None, date_to=None):
+    """
+    [(period 'YYYY-MM-DD', action, count), ...] ordered by period then action.
+    Periods are the first day of the bucket.
+    """
+    return [(period.isoformat(), action, count)
+            for period, action, count in _series_rows(user, actions, bucket, date_from, date_to)]
+
+
+async def aseries(user, actions, bucket='daily', date_from=None, date_to=None):
+    """`series()` for async views."""
+    return [(period.isoformat(), action, count)
+            async for period, action, count in _series_rows(user, actions, bucket, date_from, date_to)]
+
+
+def _series_rows(user, actions, bucket, date_from, date_to):
+    qs = NoteEventDaily.objects.filter(user=user, action__in=actions)
+    if date_from:
+        qs = qs.filter(day__gte=date_from)
+    if date_to:
+        qs = qs.filter(day__lte=date_to)
+    trunc = BUCKETS.get(bucket)
+    if trunc is None:
+        return qs.values_list('day', 'action', 'count').order_by('day', 'action')
+    return (qs.annotate(period=trunc('day'))
+            .values('period', 'action')
+            .annotate(total=Sum('count'))
+            .values_list('period', 'action', 'total')
+            .order_by('period', 'action'))
+
+
+def columns(rows, actions):
+    """
+    Pivot `series()` rows into (periods, {action: [count per period]}), with a
+    0 wherever an action had no events in a period.
+    """
+    periods = sorted({period for period, _, _ in rows})
+    index = {period: i for i, period in enumerate(periods)}
+    counts = {action: [0] * len(periods) for action in actions}
+    for period, action, count in rows:
+        counts[action][index[period]] = count
+    return periods, counts
+
+
+def _unit(day, bucket):
+    """Index of the bucket period containing `day`, counting periods in time."""
+    if bucket == 'weekly':
+        return (day.toordinal() - 1) // 7  # ordinal 1 is a Monday, like TruncWeek
+    if bucket == 'monthly':
+        return day.year * 12 + day.month - 1
+    if bucket == 'yearly':
+        return day.year
+    return day.toordinal()
+
+
+def _unit_start(unit, bucket):
+    """First day of the bucket period with index `unit` (inverse of `_unit`)."""
+    if bucket == 'weekly':
+        return date.fromordinal(unit * 7 + 1)
+    if bucket == 'monthly':
+        return date(unit // 12, unit % 12 + 1, 1)
+    if bucket == 'yearly':
+        return date(unit, 1, 1)
+    return date.fromordinal(unit)
+
+
+def whole_periods(date_from, date_to, bucket):
+    """
+    Widen date_from/date_to (either may be None) to the first and last day of
+    their bucket periods, so a range starting mid-week or mid-month still
+    counts the whole period its first point is labelled with.
+    """
+    if date_from:
+        date_from = _unit_start(_unit(date_from, bucket), bucket)
+    if date_to:
+        date_to = _unit_start(_unit(date_to, bucket) + 1, bucket) - timedelta(days=1)
+    return date_from, date_to
+
+
+def downsample(periods, counts, max_points, bucket='daily', date_from=None, date_to=None):
+    """
+    Merge periods into equal spans of time so at most `max_points` spans
+    cover the range (date_from..date_to, or the first..last period when not
+    given). Spans are counted in calendar periods, not in list positions, so
+    a gap with no events still takes up its share of the range. Each merged
+    point is labelled with the first period of its span and sums the counts in
+    it; spans with no events are left out, as empty periods are.
+    """
+    if not max_points or not periods:
+        return periods, counts
+    units = [_unit(date.fromisoformat(p), bucket) for p in periods]
+    first = _unit(date_from, bucket) if date_from else units[0]
+    last = _unit(date_to, bucket) if date_to else units[-1]
+    if last - first + 1 <= max_points:
+        return periods, counts
+    step = -(-(last - first + 1) // max_points)  # ceil division
+    spans = [(u - first) // step for u in units]
+    labels = sorted(set(spans))
+    index = {span: i for i, span in enumerate(labels)}
+    merged = {action: [0] * len(labels) for action in counts}
+    for i, span in enumerate(spans):
+        for action, values in counts.items():
+            merged[action][index[span]] += values[i]
+    return [_unit_start(first + span * step, bucket).isoformat() for span in labels], merged
+
+
+def _raw_counts(user=None):
+    qs = NoteEvent.objects.filter(user__isnull=False)
+    if user is not None:
+        qs = qs.filter(user=user)
+    return (qs.annotate(day=TruncDate('created_at'))
+            .values_list('user_id', 'day', 'action')
+            .annotate(count=Count('id'))
+            .order_by())
+
+
+def rebuild(user=None):
+    """Recompute the rollup from the raw events. Returns the number of rows written."""
+    with transaction.atomic():
+        existing = NoteEventDaily.objects.all()
+        if user is not None:
+            existing = existing.filter(user=user)
+        existing.delete()
+        rows = [
+            NoteEventDaily(user_id=user_id, day=day, action=action, count=count)
+            for user_id, day, action, count in _raw_counts(user)
+        ]
+        NoteEventDaily.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def check(user=None):
+    """
+    Compare the rollup with the raw events. Returns a list of
+    (user_id, day, action, rollup_count, raw_count) for every mismatch.
+    """
+    raw = {(u, d, a): c for u, d, a, c in _raw_counts(user)}
+    rolled_qs = NoteEventDaily.objects.all()
+    if user is not None:
+        rolled_qs = rolled_qs.filter(user=user)
+    rolled = {(u, d, a): c for u, d, a, c in rolled_qs.values_list('user_id', 'day', 'action', 'count')}
+    return [
+        (*key, rolled.get(key, 0), raw.get(key, 0))
+        for key in sorted(raw.keys() | rolled.keys(), key=str)
+        if rolled.get(key, 0) != raw.get(key, 0)
+    ]
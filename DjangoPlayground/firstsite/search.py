@@ -0,0 +1,167 @@
+"""
+Full-text search for notes.
+
+Replaces the old `Q(title__icontains=...) | Q(content__icontains=...)` filter,
+which scanned every note's content on each search. The index is a side table
+keyed by note id and kept in sync from Note saves / soft-deletes / purges
+(see signals.py); trashed notes are not indexed.
+
+- SQLite: an FTS5 virtual table (`firstsite_note_fts`, rowid = note id).
+- PostgreSQL: `firstsite_note_search`, a GIN-indexed tsvector per note.
+- Any other backend: falls back to the icontains filter.
+
+The search box text is never handed to MATCH / to_tsquery as-is. It is split
+into words and every word becomes a prefix term that must match, so typing
+"proj not" already finds "project notes", and stray quotes or operators in the
+input can't cause a query syntax error.
+"""
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Note
+
+FTS_TABLE = "firstsite_note_fts"
+PG_TABLE = "firstsite_note_search"
+PG_CONFIG = "simple"  # no stemming/stop words: closest to the old substring match
+MAX_TERMS = 16
+
+_WORD_RE = re.compile(r"\w+")
+
+# Title hits weigh more than content hits (PG setweight 'A' vs 'B').
+_PG_DOCUMENT = (
+    f"setweight(to_tsvector('{PG_CONFIG}', coalesce(%s, '')), 'A') || "
+    f"setweight(to_tsvector('{PG_CONFIG}', coalesce(%s, '')), 'B')"
+)
+
+
+def backend():
+    """'sqlite', 'postgresql', or None when there is no index for this DB."""
+    if connection.vendor in ("sqlite", "postgresql"):
+        return connection.vendor
+    return None
+
+
+def _terms(query):
+    return _WORD_RE.findall(query or "")[:MAX_TERMS]
+
+
+def _match_expression(terms):
+    if backend() == "sqlite":
+        # "word"* is an FTS5 prefix phrase; terms separated by spaces are ANDed.
+        return " ".join('"{}"*'.format(t.replace('"', '""')) for t in terms)
+    # \w+ terms contain no tsquery operators, so they can be joined directly.
+    return " & ".join(f"{t}:*" for t in terms)
+
+
+def filter_notes(qs, query, with_rank=False):
+    """
+    Restrict a Note queryset to notes matching `query`. With `with_rank`, also
+    annotate `search_rank` (lower is better on every backend, so
+    order_by('search_rank')); it is a subquery per row, so only ask for it
+    when ordering by relevance.
+    """
+    terms = _terms(query)
+    kind = backend()
+    if not terms or kind is None:
+        # Nothing indexable (e.g. only punctuation) or no index on this DB.
+        qs = qs.filter(Q(title__icontains=query) | Q(content__icontains=query))
+        if with_rank:
+            qs = qs.annotate(search_rank=Value(0.0, output_field=FloatField()))
+        return qs
+
+    expr = _match_expression(terms)
+    note_table = Note._meta.db_table
+    if kind == "sqlite":
+        matches = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (expr,))
+        if not with_rank:
+            return qs.filter(pk__in=matches)
+        # FTS5's built-in `rank` is bm25(), where more negative = more relevant.
+        rank = RawSQL(
+            f"SELECT rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"AND rowid = {note_table}.id",
+            (expr,),
+            output_field=FloatField(),
+        )
+    else:
+        matches = RawSQL(
+            f"SELECT note_id FROM {PG_TABLE} "
+            f"WHERE document @@ to_tsquery('{PG_CONFIG}', %s)",
+            (expr,),
+        )
+        if not with_rank:
+            return qs.filter(pk__in=matches)
+        # ts_rank is higher = better; negate it so both backends sort ascending.
+        rank = RawSQL(
+            f"SELECT -ts_rank(document, to_tsquery('{PG_CONFIG}', %s)) "
+            f"FROM {PG_TABLE} WHERE note_id = {note_table}.id",
+            (expr,),
+            output_field=FloatField(),
+        )
+    return qs.filter(pk__in=matches).annotate(search_rank=rank)
+
+
+def index_notes(notes):
+    """(Re)index the given notes. Trashed notes are removed from the index."""
+    kind = backend()
+    if kind is None:
+        return
+    notes = list(notes)
+    remove_notes([n.pk for n in notes])
+    live = [(n.pk, n.title, n.content) for n in notes if n.deleted_at is None]
+    if not live:
+        return
+    with connection.cursor() as cur:
+        if kind == "sqlite":
+            cur.executemany(
+                f"INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (%s, %s, %s)",
+                live,
+            )
+        else:
+            cur.executemany(
+                f"INSERT INTO {PG_TABLE}(note_id, document) VALUES (%s, {_PG_DOCUMENT})",
+                live,
+            )
+
+
+def index_note(note):
+    index_notes([note])
+
+
+def remove_notes(pks):
+    """Drop notes from the index (soft-delete or purge)."""
+    kind = backend()
+    pks = [pk for pk in pks if pk is not None]
+    if kind is None or not pks:
+        return
+    column = "rowid" if kind == "sqlite" else "note_id"
+    table = FTS_TABLE if kind == "sqlite" else PG_TABLE
+    placeholders = ", ".join(["%s"] * len(pks))
+    with connection.cursor() as cur:
+        cur.execute(f"DELETE FROM {table} WHERE {column} IN ({placeholders})", pks)
+
+
+def rebuild(batch_size=500):
+    """
+    Wipe and repopulate the index from every live note. Returns the number of
+    notes indexed. Used by `manage.py rebuild_search_index`.
+    """
+    kind = backend()
+    if kind is None:
+        return 0
+    with connection.cursor() as cur:
+        cur.execute(f"DELETE FROM {FTS_TABLE if kind == 'sqlite' else PG_TABLE}")
+    count = 0
+    batch = []
+    for note in Note.objects.only("id", "title", "content", "deleted_at").iterator(chunk_size=batch_size):
+        batch.append(note)
+        if len(batch) >= batch_size:
+            index_notes(batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        index_notes(batch)
+        count += len(batch)
+    return count
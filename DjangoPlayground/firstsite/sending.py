@@ -0,0 +1,77 @@
+"""
+Sending note copies to several users at once.
+
+A single send (api_note_send / note_send_view with one recipient) saves the
+copy, copies its tags, and writes one NoteSend plus the 'create' (copy) and
+'send' (original) events. Sending to a team that way was N requests of several
+queries each, so `send_copies` does the same work for any number of recipients
+with a fixed number of statements, all in one transaction:
+
+- copies, NoteSend rows and events are bulk_created (events are then added to
+  the analytics rollup explicitly, since bulk_create sends no post_save);
+- tags go through utils.copy_tags; the copies are added to the search index
+  and the recipients' list caches are invalidated (listcache.py).
+
+The events are the same ones the single path logs, so analytics don't change.
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from . import listcache, rollup, search
+from .models import Note, NoteEvent, NoteSend
+from .utils import build_note_event, copy_tags
+
+MAX_RECIPIENTS = 50
+
+
+def parse_usernames(raw):
+    """
+    Normalize a list of usernames (or one comma-separated string): strip
+    whitespace, drop blanks and duplicates, keep the order given.
+    """
+    if isinstance(raw, str):
+        raw = raw.split(',')
+    names = []
+    for name in raw:
+        name = str(name).strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def resolve_recipients(usernames):
+    """({username: User} for the names that exist, [names that don't]) — one query."""
+    found = {u.username: u for u in User.objects.filter(username__in=usernames)}
+    return found, [name for name in usernames if name not in found]
+
+
+def send_copies(note, sender, recipients):
+    """
+    Copy `note` to every user in `recipients`. Returns the copies, in the same
+    order as `recipients`.
+    """
+    if not recipients:
+        return []
+    with transaction.atomic():
+        copies = Note.objects.bulk_create([
+            Note(
+                title=note.title,
+                content=note.content,
+                owner=recipient,
+                is_pinned=False,
+                is_archived=False,
+            )
+            for recipient in recipients
+        ])
+        copy_tags(note, copies)
+        NoteSend.objects.bulk_create([
+            NoteSend(original_note=note, sender=sender, recipient=recipient)
+            for recipient in recipients
+        ])
+        events = [build_note_event(sender, copy, NoteEvent.ACTION_CREATE) for copy in copies]
+        events += [build_note_event(sender, note, NoteEvent.ACTION_SEND) for _ in recipients]
+        NoteEvent.objects.bulk_create(events)
+        rollup.record_events(events)
+        search.index_notes(copies)
+        listcache.bump_many(recipient.pk for recipient in recipients)
+    return copies
@@ -24,6 +24,8 @@ class TagSerializer(serializers.ModelSerializer):
 class NoteVersionSerializer(serializers.ModelSerializer):
     # Custom field to get the username of the user who updated the note
     updated_by_username =serializers.SerializerMethodField()
+    # Versions may be stored as deltas (see versioning.py); always expose the full text.
+    content = serializers.CharField(source='full_content', read_only=True)
 
     class Meta:
         model = NoteVersion
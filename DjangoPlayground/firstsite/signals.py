@@ -1,9 +1,10 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth.models import AnonymousUser
 from .middleware import get_current_user
-from .models import Note, NoteEvent
+from .models import Note, NoteEvent, RenderedMarkdown, Tag
 from .utils import log_note_event
+from . import listcache, search, rollup, sync
 import logging
 
 log = logging.getLogger(__name__)
@@ -12,7 +13,7 @@ log = logging.getLogger(__name__)
 
 
 def _actor_for(instance):
-    # Try to get the actor from the instance, else from middleware
+    # Try to get the actor from the instance, else from the request context (middleware.py)
     return getattr(instance, '_actor', None) or get_current_user()
 
 # Trash operations (soft-delete / restore / purge) set `_suppress_event` on the
@@ -46,4 +47,56 @@ def log_note_delete(sender, instance: Note, **kwargs):
         return
     # note is gone, so pass None. Maybe we can store note data in NoteEvent in future.
     log_note_event(actor, None, NoteEvent.ACTION_DELETE)
-        
\ No newline at end of file
+
+
+# Full-text search index sync (see search.py). Unlike the event handlers above
+# these are not affected by `_suppress_event`: soft-delete, restore and purge
+# must all reach the index.
+_INDEXED_FIELDS = {'title', 'content', 'deleted_at'}
+
+@receiver(post_save, sender=Note)
+def sync_search_index(sender, instance: Note, update_fields=None, **kwargs):
+    # Pin/archive toggles save only flags; skip the index write for those.
+    if update_fields is not None and not (_INDEXED_FIELDS & set(update_fields)):
+        return
+    search.index_note(instance)
+
+@receiver(post_delete, sender=Note)
+def drop_from_search_index(sender, instance: Note, **kwargs):
+    search.remove_notes([instance.pk])
+
+# Delta sync (see sync.py): a purged note leaves a tombstone. Bulk deletes
+# (trash.delete_notes) write theirs directly.
+@receiver(post_delete, sender=Note)
+def record_note_tombstone(sender, instance: Note, **kwargs):
+    sync.record_tombstones([(instance.pk, instance.owner_id)])
+
+# Rendered-Markdown cache: a content save makes the stored HTML stale.
+@receiver(post_save, sender=Note)
+def invalidate_rendered_markdown(sender, instance: Note, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and 'content' not in update_fields):
+        return
+    RenderedMarkdown.objects.filter(note_id=instance.pk).delete()
+
+# Analytics rollup (see rollup.py): every saved event bumps its daily counter.
+# Bulk inserts (bulk_create sends no signals) call rollup.record_events themselves.
+@receiver(post_save, sender=NoteEvent)
+def roll_up_note_event(sender, instance: NoteEvent, created, **kwargs):
+    if created:
+        rollup.record_events([instance])
+
+# Note list page cache (see listcache.py): any change to a user's notes, tags
+# or tag links starts a new generation. Not affected by `_suppress_event`
+# (trash and restore change the list too). Bulk writers bump it themselves.
+@receiver(post_save, sender=Note)
+@receiver(post_delete, sender=Note)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_notes_generation(sender, instance, **kwargs):
+    listcache.bump(instance.owner_id)
+
+@receiver(m2m_changed, sender=Note.tags.through)
+def bump_notes_generation_on_retag(sender, instance, action, **kwargs):
+    # Either side works: notes and tags both belong to the user whose list changes.
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        listcache.bump(instance.owner_id)
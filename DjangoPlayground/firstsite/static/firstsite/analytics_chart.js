@@ -8,7 +8,7 @@
      1) fetch the data from the Django API,
      2) turn it into per-period rows that keep each action's count
         separately (so we can draw colored, stacked segments),
-     3) optionally drop rows outside a chosen date range,
+     3) (the date range is applied by the server — see fetchSeries),
      4) draw an SVG stacked bar chart from what's left.
 
    Style note: this file sticks to ui.js's conventions (var, function
@@ -35,26 +35,44 @@
   var clearBtn     = document.getElementById('clearRange');
   var legend       = document.getElementById('legend');
 
-  // We only need a fresh fetch when the BUCKET changes — toggling actions
-  // or the date range just re-filters data we already have, no extra
+  // We need a fresh fetch when the BUCKET or the DATE RANGE changes —
+  // toggling actions just re-filters data we already have, no extra
   // network round trip.
   var currentBucket = null;
   var currentSeries = null;
+  var requestId = 0;      // ignore responses that arrive after a newer request
+
+  // The plot is 640px wide; more bars than this would be thinner than a
+  // few pixels each, so the server merges adjacent periods past this.
+  var MAX_POINTS = 60;
 
   /* --- 1) GET DATA -------------------------------------------------------
      We always ask the API for all four actions and filter client-side,
      so ticking/unticking a checkbox doesn't need another request.
-       GET /api/analytics/notes/?bucket=daily
-       -> { bucket, actions, series: { "<period>": { action: count, ... } } } */
-  function fetchSeries(bucket) {
-    var url = '/api/analytics/notes/?bucket=' + encodeURIComponent(bucket);
+     The date range and the number of bars are handled by the SERVER, so
+     we only download the periods we're going to draw:
+       GET /api/analytics/notes/?bucket=daily&shape=columns
+                                 &from=2026-07-01&to=2026-07-31&max_points=60
+       -> { bucket, actions,
+            periods: ["2026-07-01", ...],                 // sorted
+            counts:  { create: [2, ...], update: [0, ...], ... } }
+     "columns" means one array per action, lined up with `periods` — much
+     smaller than repeating every action name for every period.
+     <input type="date"> values are already "YYYY-MM-DD", which is exactly
+     what the API expects, so they go into the URL as-is. */
+  function fetchSeries(bucket, fromStr, toStr) {
+    var url = '/api/analytics/notes/?shape=columns' +
+              '&bucket=' + encodeURIComponent(bucket) +
+              '&max_points=' + MAX_POINTS;
+    if (fromStr) url += '&from=' + encodeURIComponent(fromStr);
+    if (toStr)   url += '&to=' + encodeURIComponent(toStr);
     // credentials: 'same-origin' sends the session cookie so the (already
     // logged-in) request is authenticated, same as any other page view.
     return fetch(url, { credentials: 'same-origin' }).then(function (res) {
       if (!res.ok) throw new Error('HTTP ' + res.status);
       return res.json();
     }).then(function (json) {
-      return json.series || {};
+      return { periods: json.periods || [], counts: json.counts || {} };
     });
   }
 
@@ -62,18 +80,17 @@
      Keep each selected action's count (don't sum them yet — we need the
      breakdown to draw stacked, colored segments). `total` is handy for
      the y-axis scale and the number printed above each bar.
+     Row i takes the i-th entry of every action's array.
      Returns: [{ period, values:{action:count,...}, total }, ...] sorted. */
   function toStackedRows(series, selectedActions) {
     var selected = {};
     selectedActions.forEach(function (a) { selected[a] = true; });
-    var periods = Object.keys(series).sort();   // "YYYY-MM-DD" sorts chronologically
-    return periods.map(function (period) {
-      var counts = series[period];
+    return series.periods.map(function (period, i) {
       var values = {};
       var total = 0;
       ACTION_ORDER.forEach(function (a) {
         if (!selected[a]) return;
-        var v = counts[a] || 0;
+        var v = (series.counts[a] || [])[i] || 0;
         values[a] = v;
         total += v;
       });
@@ -81,26 +98,13 @@
     });
   }
 
-  /* --- 3) DATE RANGE FILTER -------------------------------------------------
-     Simple client-side filter over rows we've already fetched — it does
-     NOT ask the server for a different range (the API has no from/to
-     params today). That's a deliberate simplification: easy to extend to
-     real ?from=&to= query params later without touching anything else here.
-
-     This is simpler than it might sound: the API always reports a period
-     as a full calendar date — e.g. "2026-07-14" for daily, the Monday of
-     the week for weekly, the 1st of the month for monthly, Jan 1st for
-     yearly (see api.py's api_note_analytics). Every period string is
-     already directly comparable to an <input type="date"> value with a
-     plain string comparison — no date math needed. */
-  function filterByDateRange(rows, fromStr, toStr) {
-    if (!fromStr && !toStr) return rows;
-    return rows.filter(function (r) {
-      if (fromStr && r.period < fromStr) return false;
-      if (toStr && r.period > toStr) return false;
-      return true;
-    });
-  }
+  /* --- 3) DATE RANGE ---------------------------------------------------------
+     Nothing to do here any more: the range is sent as ?from=&to= and the
+     server only returns periods inside it. Periods are still full
+     calendar dates — "2026-07-14" for daily, the Monday of the week for
+     weekly, the 1st of the month for monthly, Jan 1st for yearly — and
+     when the server merges periods to stay under max_points, each bar is
+     labelled with the first period it covers. */
 
   // period -> x-axis label, formatted per bucket.
   function formatPeriodLabel(period, bucket) {
@@ -219,34 +223,36 @@
     if (!currentSeries) return;                 // nothing fetched yet (or fetch failed)
     var actions = selectedActions();
     var rows = toStackedRows(currentSeries, actions);
-    rows = filterByDateRange(rows, fromInput.value, toInput.value);
     draw(rows, currentBucket);
     drawLegend(actions);
   }
 
-  function loadBucket() {
+  function loadSeries() {
     var bucket = bucketSelect.value;
+    var myId = ++requestId;
     currentBucket = bucket;
     currentSeries = null;
     legend.innerHTML = '';
     showMessage('Loading…');
-    fetchSeries(bucket).then(function (series) {
+    fetchSeries(bucket, fromInput.value, toInput.value).then(function (series) {
+      if (myId !== requestId) return;          // a newer request superseded this one
       currentSeries = series;
       applyFiltersAndDraw();
     }).catch(function () {
+      if (myId !== requestId) return;
       showMessage("Couldn't load chart data.");
     });
   }
 
-  bucketSelect.addEventListener('change', loadBucket);
+  bucketSelect.addEventListener('change', loadSeries);
   actionsBox.addEventListener('change', applyFiltersAndDraw);
-  fromInput.addEventListener('change', applyFiltersAndDraw);
-  toInput.addEventListener('change', applyFiltersAndDraw);
+  fromInput.addEventListener('change', loadSeries);
+  toInput.addEventListener('change', loadSeries);
   clearBtn.addEventListener('click', function () {
     fromInput.value = '';
     toInput.value = '';
-    applyFiltersAndDraw();
+    loadSeries();
   });
 
-  loadBucket();   // initial fetch + draw, using whatever the server already selected
+  loadSeries();   // initial fetch + draw, using whatever the server already selected
 })();
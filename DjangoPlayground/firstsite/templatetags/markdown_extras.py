@@ -4,12 +4,27 @@ Markdown rendering for note content (P-017).
 Pipeline: raw text -> python-markdown (HTML) -> nh3 sanitizer (allow-list) -> safe string.
 The database always stores the raw text; rendering happens only at display time.
 nh3 is the maintained successor to bleach (which is deprecated).
+
+Rendered HTML is cached in two tiers, keyed by a digest of the content plus the
+renderer config below (so changing the allow-list or extensions misses cleanly):
+  1. an in-process LRU (MARKDOWN_CACHE_SIZE entries per worker), shared by
+     every note with the same content;
+  2. the RenderedMarkdown table (one row per note), used by `note_markdown`,
+     dropped on content save (signals.py) and refilled by
+     `manage.py warm_markdown_cache` after a deploy or config change.
 """
+import hashlib
+import threading
+from collections import OrderedDict
+
 import markdown as md
 import nh3
 from django import template
+from django.conf import settings
 from django.utils.safestring import mark_safe
 
+from firstsite.models import RenderedMarkdown
+
 register = template.Library()
 
 # Only these tags survive sanitizing. Anything else (script, style, iframe,
@@ -28,6 +43,110 @@ ALLOWED_ATTRIBUTES = {
     "a": {"href", "title"},
 }
 
+EXTENSIONS = ["fenced_code", "sane_lists", "nl2br", "tables"]
+URL_SCHEMES = {"http", "https", "mailto"}
+LINK_REL = "noopener noreferrer"
+
+# Everything that changes the output for a given input. Library versions are
+# included so an upgrade doesn't keep serving HTML from the old renderer.
+CONFIG_FINGERPRINT = hashlib.sha256(repr((
+    sorted(ALLOWED_TAGS),
+    sorted((tag, sorted(attrs)) for tag, attrs in ALLOWED_ATTRIBUTES.items()),
+    EXTENSIONS,
+    sorted(URL_SCHEMES),
+    LINK_REL,
+    md.__version__,
+    nh3.__version__,
+)).encode()).hexdigest()
+
+
+def content_digest(text):
+    """Cache key for `text` under the current renderer config."""
+    h = hashlib.sha256(CONFIG_FINGERPRINT.encode())
+    h.update(b"\0")
+    h.update((text or "").encode())
+    return h.hexdigest()
+
+
+def render_markdown(text):
+    """The uncached pipeline: Markdown -> HTML -> nh3 allow-list."""
+    html = md.markdown(text or "", extensions=EXTENSIONS)
+    return nh3.clean(
+        html,
+        tags=ALLOWED_TAGS,
+        attributes=ALLOWED_ATTRIBUTES,
+        url_schemes=URL_SCHEMES,
+        link_rel=LINK_REL,
+    )
+
+
+class _LRU:
+    """Small thread-safe LRU (one per worker process) of digest -> html."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_lru = _LRU(getattr(settings, "MARKDOWN_CACHE_SIZE", 512))
+
+
+def _cached_render(text, digest):
+    html = _lru.get(digest)
+    if html is None:
+        html = render_markdown(text)
+        _lru.put(digest, html)
+    return html
+
+
+def render_note(note):
+    """
+    Rendered HTML for a saved note: LRU, then the RenderedMarkdown row, then a
+    fresh render (which is written back to both tiers).
+    """
+    digest = content_digest(note.content)
+    html = _lru.get(digest)
+    if html is not None:
+        return html
+    if note.pk is None:
+        return _cached_render(note.content, digest)
+
+    html = (RenderedMarkdown.objects
+            .filter(note_id=note.pk, digest=digest)
+            .values_list("html", flat=True)
+            .first())
+    if html is None:
+        html = render_markdown(note.content)
+        RenderedMarkdown.objects.update_or_create(
+            note_id=note.pk, defaults={"digest": digest, "html": html}
+        )
+    _lru.put(digest, html)
+    return html
+
 
 @register.filter(name="markdown")
 def markdown_filter(text):
@@ -35,16 +154,15 @@ def markdown_filter(text):
     Usage: {{ note.content|markdown }}
     Renders Markdown to sanitized HTML. Single newlines become <br> (nl2br)
     so existing plain-text notes keep their line breaks.
+    Cached in the in-process LRU only; use `note_markdown` for notes.
     """
-    html = md.markdown(
-        text or "",
-        extensions=["fenced_code", "sane_lists", "nl2br", "tables"],
-    )
-    clean = nh3.clean(
-        html,
-        tags=ALLOWED_TAGS,
-        attributes=ALLOWED_ATTRIBUTES,
-        url_schemes={"http", "https", "mailto"},
-        link_rel="noopener noreferrer",
-    )
-    return mark_safe(clean)
+    return mark_safe(_cached_render(text, content_digest(text)))
+
+
+@register.filter(name="note_markdown")
+def note_markdown_filter(note):
+    """
+    Usage: {{ note|note_markdown }}
+    Same output as {{ note.content|markdown }}, backed by both cache tiers.
+    """
+    return mark_safe(render_note(note))
@@ -0,0 +1,60 @@
+"""
+Fragment cache for note cards (firstsite/note_card.html).
+
+A card is rendered on every list page and by every htmx pin/archive swap;
+`{% note_card note %}` caches its HTML under (note.pk, note.updated_at, a hash
+of its tags), so any save or tag change (tags are hashed with their names)
+picks a new key and old entries simply expire (NOTE_CARD_CACHE_TTL).
+
+The per-request parts are kept out of the cached HTML: the card body is
+rendered with marker strings as its CSRF token and `next` URL, and those are
+replaced with the real values on every use. One cached card therefore serves
+any request, page or user session.
+
+`note.tags.all()` should be prefetched (Note.objects.for_listing()), as for
+the uncached card.
+"""
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from firstsite import caching
+
+register = template.Library()
+
+CARD_TEMPLATE = "firstsite/note_card_body.html"
+CSRF_MARKER = "note-card-csrf-token-9f1c"
+NEXT_MARKER = "note-card-next-url-9f1c"
+
+
+def card_key(note, tags):
+    tag_hash = hashlib.sha256(repr([(t.pk, t.name) for t in tags]).encode()).hexdigest()[:16]
+    return caching.make_key("notes-card", settings.ETAG_VERSION, note.pk, note.updated_at.timestamp(), tag_hash)
+
+
+def render_card(note, tags):
+    """The card's HTML with the CSRF/next markers in it, from cache or rendered."""
+    return caching.get_or_compute(
+        card_key(note, tags),
+        lambda: render_to_string(CARD_TEMPLATE, {
+            "note": note,
+            "note_tags": tags,
+            "csrf_token": CSRF_MARKER,
+            "next_url": NEXT_MARKER,
+        }),
+        timeout=settings.NOTE_CARD_CACHE_TTL, namespace="notes-card",
+    )
+
+
+@register.simple_tag(takes_context=True)
+def note_card(context, note):
+    request = context.get("request")
+    html = render_card(note, list(note.tags.all()))
+    csrf = get_token(request) if request is not None else ""
+    next_url = request.get_full_path() if request is not None else ""
+    return mark_safe(html.replace(CSRF_MARKER, escape(csrf)).replace(NEXT_MARKER, escape(next_url)))
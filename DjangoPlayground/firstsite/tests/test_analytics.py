@@ -1,9 +1,13 @@
+from datetime import date
+
 import pytest
-from django.utils import timezone
 from django.contrib.auth.models import User
-from firstsite.models import Note, NoteEvent
+from django.utils import timezone
 from rest_framework.authtoken.models import Token
 
+from firstsite.models import Note, NoteEvent, NoteEventDaily
+
+
 def auth_header(user):
     token, _ = Token.objects.get_or_create(user=user)
     return {"HTTP_AUTHORIZATION": f"Token {token.key}"}
@@ -67,3 +71,88 @@ def test_api_analytics_periods_are_full_dates_for_every_bucket(auth_client, user
             assert len(period) == 10 and period[4] == "-" and period[7] == "-", (
                 f"bucket={bucket} period={period!r} is not a full YYYY-MM-DD date"
             )
+
+
+def _daily(user, days):
+    # days: {"YYYY-MM-DD": {action: count}} written straight into the rollup
+    for day, counts in days.items():
+        for action, count in counts.items():
+            NoteEventDaily.objects.create(user=user, day=date.fromisoformat(day), action=action, count=count)
+
+
+@pytest.mark.django_db
+def test_api_analytics_date_range_and_columns(auth_client, user):
+    _daily(user, {
+        "2026-07-01": {"create": 1},
+        "2026-07-02": {"create": 2, "send": 1},
+        "2026-07-03": {"update": 4},
+        "2026-07-04": {"create": 8},
+    })
+    r = auth_client.get("/api/analytics/notes/?shape=columns&actions=create,send"
+                        "&from=2026-07-02&to=2026-07-04")
+    assert r.status_code == 200
+    data = r.json()
+    assert "series" not in data
+    # 07-03 only had updates, which weren't asked for
+    assert data["periods"] == ["2026-07-02", "2026-07-04"]
+    assert data["counts"] == {"create": [2, 8], "send": [1, 0]}
+
+    # Default shape honours the range too
+    r = auth_client.get("/api/analytics/notes/?from=2026-07-03")
+    assert r.json()["series"] == {"2026-07-03": {"update": 4}, "2026-07-04": {"create": 8}}
+
+
+@pytest.mark.django_db
+def test_api_analytics_max_points_merges_adjacent_periods(auth_client, user):
+    _daily(user, {f"2026-07-{d:02d}": {"create": d} for d in range(1, 8)})
+    r = auth_client.get("/api/analytics/notes/?shape=columns&actions=create&max_points=3")
+    data = r.json()
+    # 7 periods -> runs of 3: [1..3], [4..6], [7]
+    assert data["periods"] == ["2026-07-01", "2026-07-04", "2026-07-07"]
+    assert data["counts"]["create"] == [6, 15, 7]
+    assert sum(data["counts"]["create"]) == sum(range(1, 8))
+
+
+@pytest.mark.django_db
+def test_api_analytics_max_points_merges_equal_time_spans(auth_client, user):
+    # Sparse days: merging by list position would put 07-02 and 07-20 in one point.
+    _daily(user, {"2026-07-01": {"create": 1}, "2026-07-02": {"create": 2},
+                  "2026-07-20": {"create": 4}, "2026-07-30": {"create": 8}})
+    r = auth_client.get("/api/analytics/notes/?shape=columns&actions=create&max_points=3")
+    data = r.json()
+    # 30 days -> spans of 10 days starting 07-01, 07-11, 07-21 (the empty one is left out)
+    assert data["periods"] == ["2026-07-01", "2026-07-11", "2026-07-21"]
+    assert data["counts"]["create"] == [3, 4, 8]
+
+    # The range comes from from/to when given, and works in weeks as well.
+    r = auth_client.get("/api/analytics/notes/?shape=columns&actions=create&bucket=weekly"
+                        "&from=2026-06-29&to=2026-08-09&max_points=2")
+    data = r.json()
+    # 6 weeks (Mondays 06-29 .. 08-03) -> 2 spans of 3 weeks
+    assert data["periods"] == ["2026-06-29", "2026-07-20"]
+    assert data["counts"]["create"] == [3, 12]
+
+
+@pytest.mark.django_db
+def test_api_analytics_range_covers_whole_periods(auth_client, user):
+    # Monday 07-06 .. Sunday 07-12, then the next Monday.
+    _daily(user, {"2026-07-06": {"create": 1}, "2026-07-08": {"create": 2},
+                  "2026-07-12": {"create": 4}, "2026-07-13": {"create": 8}})
+    # from is a Wednesday, to a Monday: both weeks are counted whole.
+    r = auth_client.get("/api/analytics/notes/?bucket=weekly&from=2026-07-08&to=2026-07-13")
+    assert r.json()["series"] == {"2026-07-06": {"create": 7}, "2026-07-13": {"create": 8}}
+
+    r = auth_client.get("/api/analytics/notes/?bucket=monthly&from=2026-07-13&to=2026-07-13")
+    assert r.json()["series"] == {"2026-07-01": {"create": 15}}
+
+    # Days are their own periods.
+    r = auth_client.get("/api/analytics/notes/?from=2026-07-08&to=2026-07-12")
+    assert r.json()["series"] == {"2026-07-08": {"create": 2}, "2026-07-12": {"create": 4}}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("query", ["from=2026-13-01", "to=yesterday", "max_points=0", "max_points=x"])
+def test_api_analytics_rejects_bad_params(auth_client, user, query):
+    r = auth_client.get(f"/api/analytics/notes/?{query}")
+    assert r.status_code == 400
+    assert "detail" in r.json()
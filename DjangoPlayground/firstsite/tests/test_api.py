@@ -23,7 +23,7 @@ def test_api_list_only_own_notes(client, user, db):
     data = response.json()
     # Check only own notes are returned
     assert response.status_code == 200
-    titles = [i["title"] for i in data]
+    titles = [i["title"] for i in data["results"]]
     assert "Mine" in titles and "Not Mine" not in titles
 
 # Test to check OPTIONS method shows allowed methods
@@ -0,0 +1,85 @@
+import re
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from rest_framework.authtoken.models import Token
+
+from firstsite import rollup
+from firstsite.models import Note, NoteSend, Tag
+
+
+def auth_header(user):
+    token, _ = Token.objects.get_or_create(user=user)
+    return {"HTTP_AUTHORIZATION": f"Token {token.key}"}
+
+
+def assert_same(client, user, sync_url, async_url):
+    sync = client.get(sync_url, **auth_header(user))
+    async_ = client.get(async_url, **auth_header(user))
+    assert (async_.status_code, async_.json()) == (sync.status_code, sync.json())
+    return async_
+
+
+@pytest.mark.django_db
+def test_notes_list_matches_sync_view(client, user):
+    work = Tag.objects.create(owner=user, name="work")
+    for i in range(5):
+        note = Note.objects.create(owner=user, title=f"n{i}", content="x", is_pinned=(i == 2))
+        if i % 2:
+            note.tags.add(work)
+
+    r = assert_same(client, user, "/api/notes/?limit=2", "/api/async/notes/?limit=2")
+    cursor = r.json()["next_cursor"]
+    assert_same(client, user, f"/api/notes/?limit=2&cursor={cursor}", f"/api/async/notes/?limit=2&cursor={cursor}")
+    assert_same(client, user, f"/api/notes/?tag={work.pk}", f"/api/async/notes/?tag={work.pk}")
+    assert_same(client, user, "/api/notes/?search=n1", "/api/async/notes/?search=n1")
+    assert_same(client, user, "/api/notes/?cursor=bogus", "/api/async/notes/?cursor=bogus")
+
+
+@pytest.mark.django_db
+def test_note_detail_matches_sync_view_and_revalidates(client, user, note, tag):
+    note.tags.add(tag)
+    url = f"/api/async/notes/{note.pk}/"
+    r = assert_same(client, user, f"/api/notes/{note.pk}/", url)
+    assert client.get(url, HTTP_IF_NONE_MATCH=r["ETag"], **auth_header(user)).status_code == 304
+
+    other = User.objects.create_user("bob", password="pass1234")
+    assert client.get(url, **auth_header(other)).status_code == 404
+
+
+@pytest.mark.django_db
+def test_inbox_sent_and_analytics_match_sync_views(client, user, note):
+    bob = User.objects.create_user("bob", password="pass1234")
+    for _ in range(3):
+        NoteSend.objects.create(sender=user, recipient=bob, original_note=note)
+    rollup.rebuild(user)
+
+    assert_same(client, user, "/api/sent/?page_size=2&page=2", "/api/async/sent/?page_size=2&page=2")
+    assert_same(client, bob, "/api/inbox/", "/api/async/inbox/")
+    assert_same(client, user, "/api/analytics/notes/?bucket=monthly", "/api/async/analytics/notes/?bucket=monthly")
+    assert_same(client, user, "/api/analytics/notes/?shape=columns", "/api/async/analytics/notes/?shape=columns")
+    assert_same(client, user, "/api/analytics/notes/?from=bad", "/api/async/analytics/notes/?from=bad")
+
+
+@pytest.mark.django_db
+def test_authentication(client, user):
+    r = client.get("/api/async/notes/")
+    assert r.status_code == 401
+    assert r["WWW-Authenticate"] == "Token"
+
+    r = client.get("/api/async/notes/", HTTP_AUTHORIZATION="Token nope")
+    assert (r.status_code, r.json()) == (401, {"detail": "Invalid token."})
+
+    client.force_login(user)  # session auth, as for the sync API
+    assert client.get("/api/async/notes/").status_code == 200
+    assert client.post("/api/async/notes/").status_code == 405
+
+
+@pytest.mark.django_db(transaction=True)
+def test_bench_http(live_server, user, capsys):
+    Note.objects.create(owner=user, title="n", content="x")
+    token, _ = Token.objects.get_or_create(user=user)
+    call_command("bench_http", f"{live_server.url}/api/async/notes/",
+                 "--concurrency", "2", "--requests", "6", "--token", token.key)
+    assert re.search(r"/api/async/notes/: 6 ok, 0 errors, \d+ req/s", capsys.readouterr().out)
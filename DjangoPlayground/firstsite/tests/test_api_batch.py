@@ -0,0 +1,123 @@
+import json
+
+import pytest
+from rest_framework.authtoken.models import Token
+
+from firstsite.models import Note, NoteEvent, NoteEventDaily, NoteVersion
+
+
+def auth_header(user):
+    token, _ = Token.objects.get_or_create(user=user)
+    return {"HTTP_AUTHORIZATION": f"Token {token.key}"}
+
+
+def post_batch(client, user, body):
+    return client.post("/api/notes/batch/", data=json.dumps(body),
+                       content_type="application/json", **auth_header(user))
+
+
+@pytest.mark.django_db
+def test_batch_create_update_delete(client, user, tag):
+    keep = Note.objects.create(owner=user, title="Keep", content="old")
+    gone = Note.objects.create(owner=user, title="Gone", content="x")
+    events_before = NoteEvent.objects.count()
+
+    r = post_batch(client, user, {"operations": [
+        {"op": "create", "title": "New", "content": "fresh", "tags": [tag.pk]},
+        {"op": "update", "id": keep.pk, "content": "new"},
+        {"op": "delete", "id": gone.pk},
+    ]})
+
+    assert r.status_code == 200
+    data = r.json()
+    assert data["applied"] is True
+    created, updated, deleted = data["results"]
+    assert created["status"] == "created" and created["note"]["tags"] == [tag.pk]
+    assert updated["status"] == "updated" and updated["note"]["title"] == "Keep"  # partial
+    assert deleted == {"index": 2, "op": "delete", "status": "deleted", "id": gone.pk}
+
+    keep.refresh_from_db()
+    assert keep.content == "new"
+    assert not Note.all_objects.filter(pk=gone.pk).exists()
+    # the update was snapshotted, like a single PUT
+    assert [v.full_content for v in NoteVersion.objects.filter(note=keep)] == ["old"]
+    # one event per operation, and the rollup saw them
+    actions = sorted(NoteEvent.objects.order_by("id")[events_before:].values_list("action", flat=True))
+    assert actions == ["create", "delete", "update"]
+    assert NoteEventDaily.objects.filter(user=user, action="create").exists()
+
+
+@pytest.mark.django_db
+def test_batch_delete_logs_the_same_event_as_a_single_delete(client, user):
+    single = Note.objects.create(owner=user, title="Single", content="x")
+    batched = Note.objects.create(owner=user, title="Batched", content="x")
+
+    assert client.delete(f"/api/notes/{single.pk}/", **auth_header(user)).status_code == 204
+    post_batch(client, user, {"operations": [{"op": "delete", "id": batched.pk}]})
+
+    fields = ("action", "note_id", "note_title", "actor_username", "user_id")
+    events = NoteEvent.objects.filter(action="delete").order_by("id").values_list(*fields)
+    assert len(events) == 2 and events[0] == events[1]
+
+
+@pytest.mark.django_db
+def test_batch_reports_per_item_failures(client, user, django_user_model):
+    other = django_user_model.objects.create_user("mallory", password="pass1234")
+    foreign = Note.objects.create(owner=other, title="Theirs", content="x")
+    mine = Note.objects.create(owner=user, title="Mine", content="x")
+
+    r = post_batch(client, user, {"operations": [
+        {"op": "update", "id": foreign.pk, "content": "hijack"},
+        {"op": "create", "content": "no title"},
+        {"op": "rename", "id": mine.pk},
+        {"op": "update", "id": mine.pk, "title": "Renamed"},
+        {"op": "delete", "id": mine.pk},
+    ]})
+
+    assert r.status_code == 200
+    statuses = [x["status"] for x in r.json()["results"]]
+    assert statuses == ["failed", "failed", "failed", "updated", "failed"]
+    assert "title" in r.json()["results"][1]["errors"]
+    foreign.refresh_from_db()
+    assert foreign.content == "x"
+    assert Note.objects.get(pk=mine.pk).title == "Renamed"
+
+
+@pytest.mark.django_db
+def test_batch_atomic_writes_nothing_on_failure(client, user):
+    note = Note.objects.create(owner=user, title="T", content="x")
+    r = post_batch(client, user, {"atomic": True, "operations": [
+        {"op": "update", "id": note.pk, "content": "changed"},
+        {"op": "delete", "id": 999999},
+    ]})
+    assert r.status_code == 400
+    assert r.json()["applied"] is False
+    assert [x["status"] for x in r.json()["results"]] == ["skipped", "failed"]
+    note.refresh_from_db()
+    assert note.content == "x"
+
+
+def _batch_queries(client, user, n):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    notes = [Note.objects.create(owner=user, title=f"N{i}", content="x") for i in range(2 * n)]
+    ops = [{"op": "update", "id": note.pk, "content": "y"} for note in notes[:n]]
+    ops += [{"op": "create", "title": f"C{i}", "content": "z", "tags": []} for i in range(n)]
+    ops += [{"op": "delete", "id": note.pk} for note in notes[n:]]
+    with CaptureQueriesContext(connection) as ctx:
+        r = post_batch(client, user, {"operations": ops})
+    assert all(x["status"] != "failed" for x in r.json()["results"])
+    return len(ctx)
+
+
+@pytest.mark.django_db
+def test_batch_query_count_does_not_grow_with_size(client, user):
+    _batch_queries(client, user, 1)  # warm up: auth token, today's rollup rows
+    assert _batch_queries(client, user, 30) == _batch_queries(client, user, 2)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("body", [{}, {"operations": []}, {"operations": "nope"},
+                                  {"operations": [{"op": "delete", "id": 1}] * 101}])
+def test_batch_rejects_malformed_body(client, user, body):
+    assert post_batch(client, user, body).status_code == 400
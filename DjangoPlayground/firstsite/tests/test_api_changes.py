@@ -0,0 +1,127 @@
+import re
+
+import pytest
+from django.db.backends.base.operations import BaseDatabaseOperations
+from rest_framework.authtoken.models import Token
+
+from firstsite import sync
+from firstsite.models import Note, NoteTombstone
+
+
+def auth_header(user):
+    token, _ = Token.objects.get_or_create(user=user)
+    return {"HTTP_AUTHORIZATION": f"Token {token.key}"}
+
+
+def poll(client, user, since=None, limit=None):
+    params = {}
+    if since:
+        params["since"] = since
+    if limit:
+        params["limit"] = limit
+    r = client.get("/api/notes/changes/", params, **auth_header(user))
+    assert r.status_code == 200
+    return r.json()
+
+
+@pytest.mark.django_db
+def test_changes_initial_sync_then_only_new_changes(client, user, django_user_model):
+    a = Note.objects.create(owner=user, title="A", content="x")
+    b = Note.objects.create(owner=user, title="B", content="x")
+    other = django_user_model.objects.create_user("mallory", password="pass1234")
+    Note.objects.create(owner=other, title="Not mine", content="x")
+
+    first = poll(client, user)
+    assert [(e["id"], e["change"]) for e in first["results"]] == [(a.pk, "upsert"), (b.pk, "upsert")]
+    assert first["results"][0]["note"]["title"] == "A"
+    assert first["has_more"] is False
+
+    # nothing changed: empty page, same cursor
+    idle = poll(client, user, first["next_cursor"])
+    assert idle["results"] == [] and idle["next_cursor"] == first["next_cursor"]
+
+    a.content = "edited"
+    a.save()
+    c = Note.objects.create(owner=user, title="C", content="x")
+    later = poll(client, user, first["next_cursor"])
+    assert [(e["id"], e["change"]) for e in later["results"]] == [(a.pk, "upsert"), (c.pk, "upsert")]
+    assert later["results"][0]["note"]["content"] == "edited"
+
+
+@pytest.mark.django_db
+def test_changes_report_trashed_and_purged_notes(client, auth_client, user):
+    trashed = Note.objects.create(owner=user, title="Trashed", content="x")
+    purged = Note.objects.create(owner=user, title="Purged", content="x")
+    api_deleted = Note.objects.create(owner=user, title="API", content="x")
+    cursor = poll(client, user)["next_cursor"]
+
+    auth_client.post(f"/notes/{trashed.pk}/delete/")
+    auth_client.post(f"/notes/{purged.pk}/delete/")
+    auth_client.post(f"/notes/{purged.pk}/purge/")
+    client.delete(f"/api/notes/{api_deleted.pk}/", **auth_header(user))
+
+    changes = poll(client, user, cursor)["results"]
+    deleted = {(e["id"], e["reason"]) for e in changes if e["change"] == "deleted"}
+    assert deleted == {(trashed.pk, "trashed"), (purged.pk, "purged"), (api_deleted.pk, "purged")}
+    assert not any(e["change"] == "upsert" for e in changes)
+
+
+@pytest.mark.django_db
+def test_changes_empty_trash_writes_tombstones(client, auth_client, user):
+    notes = [Note.objects.create(owner=user, title=f"N{i}", content="x") for i in range(3)]
+    for note in notes:
+        auth_client.post(f"/notes/{note.pk}/delete/")
+    cursor = poll(client, user)["next_cursor"]
+
+    auth_client.post("/trash/empty/")
+
+    assert NoteTombstone.objects.filter(owner=user).count() == 3
+    changes = poll(client, user, cursor)["results"]
+    assert sorted(e["id"] for e in changes) == sorted(n.pk for n in notes)
+    assert {e["reason"] for e in changes} == {"purged"}
+
+
+@pytest.mark.django_db
+def test_tombstones_hold_any_note_id(client, user):
+    # As wide as any auto id, so Note can move to the app's BigAutoField default.
+    ranges = BaseDatabaseOperations.integer_field_ranges  # SQLite reports 64 bits for all
+    note_id = NoteTombstone._meta.get_field("note_id").get_internal_type()
+    assert ranges[note_id] == ranges["BigAutoField"]
+
+    big = Note.objects.create(pk=2**40, owner=user, title="Big", content="x")
+    cursor = poll(client, user)["next_cursor"]
+    client.delete(f"/api/notes/{big.pk}/", **auth_header(user))
+    assert [e["id"] for e in poll(client, user, cursor)["results"]] == [2**40]
+
+
+@pytest.mark.django_db
+def test_changes_paging_with_equal_timestamps(client, user):
+    notes = [Note.objects.create(owner=user, title=f"N{i}", content="x") for i in range(5)]
+    # Same updated_at everywhere: the id tie-break must still page cleanly.
+    Note.all_objects.filter(owner=user).update(updated_at=notes[0].updated_at)
+    NoteTombstone.objects.create(owner=user, note_id=999, deleted_at=notes[0].updated_at)
+
+    seen, cursor = [], None
+    while True:
+        page = poll(client, user, cursor, limit=2)
+        seen += [e["id"] for e in page["results"]]
+        cursor = page["next_cursor"]
+        if not page["has_more"]:
+            break
+    assert seen == [n.pk for n in notes] + [999]
+
+
+@pytest.mark.django_db
+def test_changes_rejects_bad_cursor(client, user):
+    r = client.get("/api/notes/changes/?since=not-a-cursor", **auth_header(user))
+    assert r.status_code == 400
+
+
+@pytest.mark.django_db
+def test_changes_poll_seeks_from_the_cursor(user):
+    note = Note.objects.create(owner=user, title="n", content="x")
+    cursor = (note.updated_at, sync.NOTES, note.pk)
+    notes, tombstones = sync._queries(user, cursor, 100)
+    # A range on the timestamp, not every row of the owner (owner_id=?) filtered.
+    assert re.search(r"note_owner_changes_idx \(owner_id=\? AND updated_at>\?", notes.explain())
+    assert re.search(r"tombstone_owner_changes_idx \(owner_id=\? AND deleted_at>\?", tombstones.explain())
@@ -0,0 +1,104 @@
+import re
+
+import pytest
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from firstsite.api import _encode_cursor, _notes_list_query
+from firstsite.models import Note, Tag
+
+
+def auth_header(user):
+    token, _ = Token.objects.get_or_create(user=user)
+    return {"HTTP_AUTHORIZATION": f"Token {token.key}"}
+
+
+def _walk(client, user, url):
+    """Follow next_cursor until the end; return every title in order."""
+    titles, cursor = [], None
+    while True:
+        sep = "&" if "?" in url else "?"
+        r = client.get(url + (f"{sep}cursor={cursor}" if cursor else ""), **auth_header(user))
+        assert r.status_code == 200
+        data = r.json()
+        titles += [n["title"] for n in data["results"]]
+        cursor = data["next_cursor"]
+        if not cursor:
+            return titles
+
+
+@pytest.mark.django_db
+def test_cursor_pages_cover_every_note_once_pinned_first(client, user):
+    for i in range(7):
+        Note.objects.create(owner=user, title=f"n{i}", content="x", is_pinned=(i in (1, 4)))
+
+    titles = _walk(client, user, "/api/notes/?limit=3")
+    assert titles == ["n4", "n1", "n6", "n5", "n3", "n2", "n0"]
+
+
+@pytest.mark.django_db
+def test_cursor_handles_identical_created_at(client, user):
+    notes = [Note.objects.create(owner=user, title=f"t{i}", content="x") for i in range(5)]
+    # Force a tie on created_at: the id tiebreaker must keep pages disjoint.
+    Note.objects.filter(pk__in=[n.pk for n in notes]).update(created_at=notes[0].created_at)
+
+    titles = _walk(client, user, "/api/notes/?limit=2")
+    assert sorted(titles) == sorted(n.title for n in notes)
+    assert len(titles) == 5
+
+
+@pytest.mark.django_db
+def test_filters_hold_across_pages(client, user):
+    work = Tag.objects.create(owner=user, name="work")
+    for i in range(5):
+        n = Note.objects.create(owner=user, title=f"w{i}", content="report")
+        n.tags.add(work)
+    for i in range(3):
+        Note.objects.create(owner=user, title=f"u{i}", content="report")
+
+    assert sorted(_walk(client, user, f"/api/notes/?tag={work.pk}&limit=2")) == [f"w{i}" for i in range(5)]
+    assert sorted(_walk(client, user, "/api/notes/?untagged=1&limit=2")) == ["u0", "u1", "u2"]
+    assert len(_walk(client, user, "/api/notes/?search=report&limit=3")) == 8
+
+
+@pytest.mark.django_db
+def test_limit_is_capped_and_cursor_validated(client, user):
+    Note.objects.create(owner=user, title="only", content="x")
+    r = client.get("/api/notes/?limit=100000", **auth_header(user))
+    assert r.json()["limit"] == 200
+    assert r.json()["next_cursor"] is None
+
+    r = client.get("/api/notes/?cursor=not-a-cursor", **auth_header(user))
+    assert r.status_code == 400
+
+
+@pytest.mark.django_db
+def test_later_pages_cost_the_same_as_the_first(client, user):
+    for i in range(30):
+        Note.objects.create(owner=user, title=f"n{i}", content="x")
+    header = auth_header(user)
+
+    with CaptureQueriesContext(connection) as first:
+        data = client.get("/api/notes/?limit=5", **header).json()
+    cursor = data["next_cursor"]
+    for _ in range(3):
+        cursor = client.get(f"/api/notes/?limit=5&cursor={cursor}", **header).json()["next_cursor"]
+    with CaptureQueriesContext(connection) as later:
+        client.get(f"/api/notes/?limit=5&cursor={cursor}", **header)
+
+    assert len(later) == len(first)
+    # No OFFSET: the page query is a range scan from the cursor.
+    assert not any("OFFSET" in q["sql"] for q in later.captured_queries)
+
+
+@pytest.mark.django_db
+def test_cursor_page_seeks_the_index(user):
+    note = Note.objects.create(owner=user, title="n", content="x")
+    request = RequestFactory().get("/api/notes/", {"cursor": _encode_cursor(note), "limit": 5})
+    request.user = user
+    notes, limit = _notes_list_query(request)
+    plan = notes[:limit + 1].explain()
+    # A range on the keyset columns, not just owner_id=? with a filter on top.
+    assert re.search(r"note_owner_keyset_idx \(owner_id=\? AND \(is_pinned,created_at(,id)?\)<", plan), plan
@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+
+from DjangoPlayground.settings_base import cache_from_url
+from firstsite import caching
+
+
+def test_cache_from_url():
+    assert cache_from_url("locmem://")["BACKEND"].endswith("LocMemCache")
+    assert cache_from_url("file:///tmp/dp-cache", 50) == {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": "/tmp/dp-cache",
+        "OPTIONS": {"MAX_ENTRIES": 50},
+    }
+    assert cache_from_url("redis://cache:6379/1")["LOCATION"] == "redis://cache:6379/1"
+    assert cache_from_url("memcached://mc:11211")["LOCATION"] == "mc:11211"
+    with pytest.raises(ValueError):
+        cache_from_url("mongodb://x")
+
+
+def test_make_key_is_namespaced():
+    assert caching.make_key("notes-list", 3, "a") == "firstsite:notes-list:3:a"
+
+
+def test_get_or_compute_counts_hits_and_misses():
+    caching.reset_stats(["t"])
+    key = caching.make_key("t", 1)
+    assert caching.get_or_compute(key, lambda: "v", namespace="t") == "v"
+    assert caching.get_or_compute(key, lambda: "other", namespace="t") == "v"
+    # a rejected value is a miss and gets recomputed
+    assert caching.get_or_compute(key, lambda: "w", namespace="t", accept=lambda v: v == "w") == "w"
+    assert caching.stats(["t"])["t"] == {"hits": 1, "misses": 2, "hit_ratio": 1 / 3}
+
+
+def test_per_entry_timeout():
+    key = caching.make_key("t", "ttl")
+    caching.get_or_compute(key, lambda: "old", timeout=1)
+    assert caching.get_or_compute(key, lambda: "new") == "old"
+    time.sleep(1.1)
+    assert caching.get_or_compute(key, lambda: "new") == "new"
+
+
+def test_concurrent_misses_compute_once():
+    key = caching.make_key("t", "stampede")
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.3)
+        return "rendered"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(caching.get_or_compute(key, compute)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ["rendered"] * 8
+    assert len(calls) == 1
+
+
+def test_waiter_computes_when_lock_holder_is_gone(settings):
+    settings.CACHE_LOCK_TIMEOUT = 1
+    key = caching.make_key("t", "dead")
+    cache.add(key + ":lock", 1, timeout=1)  # a holder that never finishes
+    start = time.monotonic()
+    assert caching.get_or_compute(key, lambda: "mine") == "mine"
+    assert time.monotonic() - start < 2
+
+
+@pytest.mark.django_db
+def test_cache_stats_command(capsys, auth_client, note, settings):
+    settings.NOTE_LIST_CACHE_TTL = 300
+    caching.reset_stats()
+    auth_client.get("/notes/list/")
+    auth_client.get("/notes/list/")
+    call_command("cache_stats", "notes-list", "--reset")
+    out = capsys.readouterr().out
+    assert "notes-list: hits=1 misses=1 hit ratio=50.0%" in out
+    assert caching.stats(["notes-list"])["notes-list"]["hits"] == 0
@@ -0,0 +1,86 @@
+import pytest
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from firstsite.models import NoteShare
+from firstsite.versioning import snapshot_note
+
+
+def auth_header(user):
+    token, _ = Token.objects.get_or_create(user=user)
+    return {"HTTP_AUTHORIZATION": f"Token {token.key}"}
+
+
+def revalidate(client, url, first, **extra):
+    return client.get(url, HTTP_IF_NONE_MATCH=first["ETag"], **extra)
+
+
+@pytest.mark.django_db
+def test_note_page_304_until_note_or_tags_change(auth_client, note, tag):
+    note.tags.add(tag)
+    url = f"/notes/{note.pk}/"
+    first = auth_client.get(url)
+    assert first.status_code == 200
+    assert first.has_header("ETag") and first.has_header("Last-Modified")
+    assert "private" in first["Cache-Control"]
+
+    with CaptureQueriesContext(connection) as ctx:
+        again = revalidate(auth_client, url, first)
+    assert again.status_code == 304
+    assert not any("firstsite_renderedmarkdown" in q["sql"] for q in ctx.captured_queries)
+
+    # renaming a tag doesn't touch the note, but changes the page
+    tag.name = "Renamed"
+    tag.save()
+    changed = revalidate(auth_client, url, first)
+    assert changed.status_code == 200 and changed["ETag"] != first["ETag"]
+
+    note.content = "new body"
+    note.save()
+    assert revalidate(auth_client, url, changed).status_code == 200
+
+
+@pytest.mark.django_db
+def test_note_page_etag_tracks_shares_and_viewer(auth_client, user, note, django_user_model):
+    bob = django_user_model.objects.create_user("bob", password="pass1234")
+    share = NoteShare.objects.create(note=note, shared_by=user, shared_with=bob)
+    url = f"/notes/{note.pk}/"
+    owner_view = auth_client.get(url)
+
+    client = Client()
+    client.force_login(bob)
+    # same note, different viewer: no 304 from the owner's ETag
+    bob_view = revalidate(client, url, owner_view)
+    assert bob_view.status_code == 200
+    assert revalidate(client, url, bob_view).status_code == 304
+
+    share.delete()
+    assert revalidate(client, url, bob_view).status_code == 404
+    # the owner's page listed the share, so it changed too
+    assert revalidate(auth_client, url, owner_view).status_code == 200
+
+
+@pytest.mark.django_db
+def test_api_note_detail_conditional(client, user, note, tag):
+    auth = auth_header(user)
+    url = f"/api/notes/{note.pk}/"
+    first = client.get(url, **auth)
+    assert first.status_code == 200 and first.has_header("ETag")
+    assert revalidate(client, url, first, **auth).status_code == 304
+
+    note.tags.add(tag)
+    assert revalidate(client, url, first, **auth).status_code == 200
+
+
+@pytest.mark.django_db
+def test_api_version_detail_conditional(client, user, note):
+    version = snapshot_note(note, user)
+    auth = auth_header(user)
+    url = f"/api/notes/{note.pk}/versions/{version.pk}/"
+    first = client.get(url, **auth)
+    assert first.status_code == 200
+    assert revalidate(client, url, first, **auth).status_code == 304
+    # If-Modified-Since works too (versions are immutable)
+    assert client.get(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"], **auth).status_code == 304
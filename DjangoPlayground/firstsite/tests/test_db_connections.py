@@ -0,0 +1,53 @@
+import re
+import runpy
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+
+from DjangoPlayground import settings_base
+from DjangoPlayground.settings_base import conn_max_age, postgres_options
+
+
+def test_conn_max_age():
+    assert conn_max_age("60") == 60
+    assert conn_max_age("0") == 0
+    assert conn_max_age("None") is None
+
+
+def test_postgres_pool_options(monkeypatch):
+    assert postgres_options(False) == {}
+    monkeypatch.setenv("DB_POOL_MAX_SIZE", "4")
+    assert postgres_options(True) == {"pool": {"min_size": 2, "max_size": 4, "timeout": 10.0}}
+
+
+def database_settings(monkeypatch, **env):
+    """DATABASES["default"] as settings_base builds it from `env` alone."""
+    for name in ("DB_ENGINE", "DB_CONN_MAX_AGE", "DB_CONN_HEALTH_CHECKS", "DB_POOL", "APP_SERVER"):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return runpy.run_path(settings_base.__file__)["DATABASES"]["default"]
+
+
+def test_default_database_reuses_connections(monkeypatch):
+    db = database_settings(monkeypatch)
+    assert db["CONN_MAX_AGE"] == 60
+    assert db["CONN_HEALTH_CHECKS"] is True
+    assert database_settings(monkeypatch, DB_CONN_MAX_AGE="none")["CONN_MAX_AGE"] is None
+    assert database_settings(monkeypatch, APP_SERVER="asgi")["CONN_MAX_AGE"] == 0
+
+
+@pytest.mark.django_db
+def test_bench_db_connect(capsys):
+    call_command("bench_db_connect", "--requests", "5")
+    out = capsys.readouterr().out
+    assert re.search(r"new connection per request: mean=[\d.]+ ms", out)
+    configured = re.escape(f"configured (CONN_MAX_AGE={connection.settings_dict['CONN_MAX_AGE']})")
+    assert re.search(configured + r": mean=[\d.]+ ms", out)
+
+
+@pytest.mark.django_db
+def test_bench_proxy_needs_a_tcp_database():
+    with pytest.raises(CommandError):
+        call_command("bench_db_connect", "--proxy-latency", "5")
@@ -0,0 +1,126 @@
+import threading
+
+import pytest
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from firstsite import events
+from firstsite.models import Note, NoteEvent
+from firstsite.utils import log_note_event
+
+
+@pytest.fixture
+def buffered(settings, monkeypatch):
+    """
+    Route log_note_event through a thread-less sink the test flushes by hand.
+    Events are queued on commit, so tests that log outside transaction.atomic
+    use django_db(transaction=True).
+    """
+    settings.NOTE_EVENT_SINK = "buffered"
+    sink = events.BufferedEventSink(max_queue=5, batch_size=100, start_thread=False)
+    monkeypatch.setattr(events, "_sink", sink)
+    return sink
+
+
+@pytest.mark.django_db(transaction=True)
+def test_buffered_events_are_written_on_flush_with_snapshots(user, note, buffered):
+    before = NoteEvent.objects.count()
+    logged_at = timezone.now()
+    log_note_event(user, note, NoteEvent.ACTION_SEND)
+    log_note_event(user, note, NoteEvent.ACTION_UPDATE)
+    assert NoteEvent.objects.count() == before
+    assert buffered.pending() == 2
+
+    assert buffered.flush() == 2
+    send = NoteEvent.objects.get(action="send")
+    assert send.actor_username == "alice"
+    assert send.note_title == "Hello"
+    assert send.note_id == note.pk
+    # The event keeps the time it happened, not the flush time.
+    assert abs((send.created_at - logged_at).total_seconds()) < 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_full_buffer_falls_back_to_synchronous_insert(user, note, buffered):
+    before = NoteEvent.objects.count()
+    for _ in range(8):
+        log_note_event(user, note, NoteEvent.ACTION_SEND)
+    assert buffered.pending() == 5
+    assert NoteEvent.objects.count() == before + 3   # overflow written inline
+    buffered.flush()
+    assert NoteEvent.objects.count() == before + 8
+
+
+@pytest.mark.django_db(transaction=True)
+def test_event_for_note_purged_before_flush_is_kept(user, buffered):
+    doomed = Note.objects.create(owner=user, title="Doomed", content="x")
+    log_note_event(user, doomed, NoteEvent.ACTION_SEND)
+    Note.all_objects.filter(pk=doomed.pk).delete()
+
+    buffered.flush()
+    event = NoteEvent.objects.get(action="send")
+    assert event.note_id is None
+    assert event.note_title == "Doomed"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_background_thread_loses_no_events_under_concurrency(user, note):
+    sink = events.BufferedEventSink(max_queue=10_000, batch_size=25, interval=0.05)
+    per_thread, threads = 50, 4
+
+    def worker():
+        for _ in range(per_thread):
+            sink.emit(NoteEvent(user=user, note=note, actor_username="alice",
+                                note_title="Hello", action=NoteEvent.ACTION_SEND,
+                                created_at=timezone.now()))
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    sink.shutdown()
+
+    assert sink.pending() == 0
+    sent = NoteEvent.objects.filter(action="send")
+    assert sent.count() == per_thread * threads
+    assert set(sent.values_list("actor_username", "note_title")) == {("alice", "Hello")}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_events_of_a_rolled_back_transaction_are_not_queued(user, note, buffered):
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            log_note_event(user, note, NoteEvent.ACTION_SEND)
+            assert buffered.pending() == 0  # not until commit
+            raise RuntimeError
+    assert buffered.pending() == 0
+
+    with transaction.atomic():
+        log_note_event(user, note, NoteEvent.ACTION_SEND)
+    assert buffered.pending() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_a_bad_event_is_dropped_after_max_attempts(user, note, buffered, monkeypatch, caplog):
+    buffered.max_attempts = 2
+    insert = events._bulk_insert
+
+    def failing_insert(batch):
+        if any(e.note_title == "poison" for e in batch):
+            raise IntegrityError("bad row")
+        insert(batch)
+
+    monkeypatch.setattr(events, "_bulk_insert", failing_insert)
+    log_note_event(user, note, NoteEvent.ACTION_SEND)
+    poison = NoteEvent(user=user, note_title="poison", action=NoteEvent.ACTION_SEND, created_at=timezone.now())
+    buffered.emit(poison)
+    log_note_event(user, note, NoteEvent.ACTION_UPDATE)
+
+    with pytest.raises(IntegrityError):
+        buffered.flush()
+    assert buffered.pending() == 3  # requeued for another try
+    assert buffered.flush() == 2    # second failure: one by one, poison dropped
+    assert buffered.pending() == 0
+    assert sorted(NoteEvent.objects.values_list("action", flat=True)) == ["send", "update"]
+    assert "NoteEvent dropped" in caplog.text and "poison" in caplog.text
@@ -0,0 +1,109 @@
+import io
+import json
+import zipfile
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from rest_framework.authtoken.models import Token
+
+from firstsite.models import Note
+from firstsite.versioning import snapshot_note
+
+
+def auth_header(user):
+    token, _ = Token.objects.get_or_create(user=user)
+    return {"HTTP_AUTHORIZATION": f"Token {token.key}"}
+
+
+def _body(response):
+    assert response.streaming
+    return b"".join(response.streaming_content)
+
+
+@pytest.fixture
+def notes(user, tag):
+    first = Note.objects.create(owner=user, title="First note", content="v1")
+    first.tags.add(tag)
+    snapshot_note(first, user)
+    first.content = "v2"
+    first.save()
+    second = Note.objects.create(owner=user, title="Second", content="# Heading")
+    trashed = Note.objects.create(owner=user, title="Binned", content="x")
+    Note.all_objects.filter(pk=trashed.pk).update(deleted_at=first.created_at)
+    return first, second, trashed
+
+
+@pytest.mark.django_db
+def test_export_jsonl_streams_notes_with_tags_and_versions(client, user, tag, notes, django_user_model):
+    first, second, _ = notes
+    other = django_user_model.objects.create_user("mallory", password="pass1234")
+    Note.objects.create(owner=other, title="Not mine", content="x")
+
+    r = client.get("/api/notes/export/?versions=1", **auth_header(user))
+    assert r.status_code == 200
+    assert r["Content-Type"] == "application/x-ndjson"
+    assert "attachment" in r["Content-Disposition"]
+    records = [json.loads(line) for line in _body(r).decode().splitlines()]
+
+    assert [rec["id"] for rec in records] == [first.pk, second.pk]  # no trash, no other users
+    assert records[0]["tags"] == [tag.name]
+    assert records[0]["content"] == "v2"
+    assert [v["content"] for v in records[0]["versions"]] == ["v1"]
+    assert records[1]["versions"] == []
+
+
+@pytest.mark.django_db
+def test_export_zip_of_markdown(client, user, notes):
+    first, second, trashed = notes
+    r = client.get("/api/notes/export/?as=zip&versions=1&trashed=1", **auth_header(user))
+    assert r.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(_body(r)))
+    assert archive.testzip() is None
+    names = archive.namelist()
+    assert f"notes/{first.pk}-first-note.md" in names
+    assert f"notes/{trashed.pk}-binned.md" in names
+    assert any(n.startswith(f"versions/{first.pk}-first-note/") for n in names)
+    text = archive.read(f"notes/{second.pk}-second.md").decode()
+    assert text.startswith("---\ntitle: \"Second\"\n")
+    assert text.endswith("# Heading")
+
+
+@pytest.mark.django_db
+def test_export_query_count_is_per_chunk_not_per_note(client, user, django_assert_max_num_queries):
+    for i in range(30):
+        note = Note.objects.create(owner=user, title=f"N{i}", content="x")
+        snapshot_note(note, user)
+    auth = auth_header(user)
+    # auth + notes + tags prefetch + versions + delta chains
+    with django_assert_max_num_queries(6):
+        _body(client.get("/api/notes/export/?versions=1", **auth))
+
+
+@pytest.mark.django_db
+def test_export_rejects_unknown_format(client, user):
+    assert client.get("/api/notes/export/?as=pdf", **auth_header(user)).status_code == 400
+
+
+@pytest.mark.django_db
+def test_export_streams_an_async_iterator_under_asgi(client, async_client, user, notes):
+    async def body(response):
+        return b"".join([chunk async for chunk in response.streaming_content])
+
+    for fmt in ("jsonl", "zip"):
+        url = f"/api/notes/export/?as={fmt}&versions=1"
+        token = auth_header(user)["HTTP_AUTHORIZATION"]
+        response = async_to_sync(async_client.get)(url, headers={"Authorization": token})
+        assert response.status_code == 200 and response.is_async
+        assert async_to_sync(body)(response) == _body(client.get(url, **auth_header(user)))
+
+
+@pytest.mark.django_db
+def test_export_notes_command(user, notes, tmp_path):
+    out = io.StringIO()
+    call_command("export_notes", user.username, stdout=out)
+    assert len(out.getvalue().splitlines()) == 2
+
+    path = tmp_path / "notes.zip"
+    call_command("export_notes", user.username, "--as", "zip", "-o", str(path), stderr=io.StringIO())
+    assert len(zipfile.ZipFile(path).namelist()) == 2
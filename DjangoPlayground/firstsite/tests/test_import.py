@@ -0,0 +1,131 @@
+import io
+import json
+import zipfile
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError
+from rest_framework.authtoken.models import Token
+
+from firstsite import importing
+from firstsite.models import Note, NoteEvent, Tag
+
+
+def auth_header(user):
+    token, _ = Token.objects.get_or_create(user=user)
+    return {"HTTP_AUTHORIZATION": f"Token {token.key}"}
+
+
+def jsonl(records):
+    return "".join(json.dumps(r) + "\n" for r in records).encode()
+
+
+@pytest.mark.django_db
+def test_import_jsonl_api_bulk_with_tags_and_errors(client, user, tag):
+    data = jsonl([
+        {"title": "One", "content": "a", "tags": [tag.name, "fresh"], "is_pinned": True},
+        {"title": 5},
+        {"title": "Two", "content": "b", "tags": ["fresh"]},
+    ]) + b"not json\n"
+    events_before = NoteEvent.objects.count()
+
+    r = client.post("/api/notes/import/",
+                    {"file": SimpleUploadedFile("notes.jsonl", data)}, **auth_header(user))
+
+    assert r.status_code == 201
+    body = r.json()
+    assert (body["imported"], body["failed"], body["next_position"]) == (2, 2, 5)
+    assert [e["position"] for e in body["errors"]] == [2, 4]
+    one = Note.objects.get(owner=user, title="One")
+    assert one.is_pinned
+    assert sorted(t.name for t in one.tags.all()) == sorted([tag.name, "fresh"])
+    # existing tag reused, "fresh" created once
+    assert Tag.objects.filter(owner=user, name="fresh").count() == 1
+    # one aggregate event for the batch, not one per note
+    new_events = NoteEvent.objects.order_by("id")[events_before:]
+    assert [(e.action, e.note_title) for e in new_events] == [("create", "Imported 2 notes")]
+
+
+@pytest.mark.django_db
+def test_import_markdown_zip_roundtrips_export(client, user, tag):
+    note = Note.objects.create(owner=user, title="Exported", content="# Body\ntext")
+    note.tags.add(tag)
+    exported = b"".join(client.get("/api/notes/export/?as=zip", **auth_header(user)).streaming_content)
+
+    buf = io.BytesIO(exported)
+    with zipfile.ZipFile(buf, "a") as archive:
+        archive.writestr("loose/plain.md", "# From a heading\nhello")
+    r = client.post("/api/notes/import/",
+                    {"file": SimpleUploadedFile("notes.zip", buf.getvalue())}, **auth_header(user))
+
+    assert r.status_code == 201 and r.json()["imported"] == 2
+    copy = Note.objects.filter(owner=user, title="Exported").exclude(pk=note.pk).get()
+    assert copy.content == "# Body\ntext"
+    assert [t.pk for t in copy.tags.all()] == [tag.pk]
+    assert Note.objects.get(owner=user, title="From a heading").content.endswith("hello")
+
+
+@pytest.mark.django_db
+def test_import_in_batches_is_resumable(user):
+    records = list(importing.iter_jsonl(io.BytesIO(jsonl([{"title": f"N{i}"} for i in range(7)]))))
+    seen = []
+    summary = importing.import_records(user, records, batch_size=3, on_batch=lambda s: seen.append(s["next_position"]))
+    assert seen == [4, 7, 8]
+    assert summary["imported"] == 7
+    # one aggregate event per batch
+    assert NoteEvent.objects.filter(user=user, note_title__startswith="Imported").count() == 3
+
+    # resuming from a position skips what's already in
+    Note.objects.filter(owner=user).delete()
+    summary = importing.import_records(user, records, batch_size=3, start_at=6)
+    assert sorted(Note.objects.filter(owner=user).values_list("title", flat=True)) == ["N5", "N6"]
+
+
+@pytest.mark.django_db
+def test_import_notes_command_with_state_file(user, tmp_path):
+    src = tmp_path / "notes.jsonl"
+    src.write_bytes(jsonl([{"title": f"N{i}", "content": "x"} for i in range(5)]))
+    state = tmp_path / "state.json"
+    state.write_text(json.dumps({"source": str(src), "next_position": 4}))
+
+    out = io.StringIO()
+    call_command("import_notes", user.username, str(src), "--state", str(state), stdout=out)
+
+    assert "Resuming at position 4." in out.getvalue()
+    assert sorted(Note.objects.filter(owner=user).values_list("title", flat=True)) == ["N3", "N4"]
+    assert not state.exists()
+
+
+@pytest.mark.django_db
+def test_import_stops_with_a_resumable_summary_on_a_database_error(client, user, monkeypatch):
+    records = list(importing.iter_jsonl(io.BytesIO(jsonl([{"title": f"N{i}"} for i in range(7)]))))
+    write = importing._write_batch
+    calls = []
+
+    def flaky_write(user, batch):
+        calls.append(len(batch))
+        if len(calls) == 2:
+            raise IntegrityError("boom")
+        return write(user, batch)
+
+    monkeypatch.setattr(importing, "_write_batch", flaky_write)
+    summary = importing.import_records(user, records, batch_size=3)
+    assert (summary["imported"], summary["next_position"]) == (3, 4)
+    assert summary["stopped"] == {"position": 4, "detail": "boom"}
+    assert Note.objects.filter(owner=user).count() == 3  # the failed batch rolled back
+
+    summary = importing.import_records(user, records, batch_size=3, start_at=summary["next_position"])
+    assert "stopped" not in summary
+    assert Note.objects.filter(owner=user).count() == 7
+
+    # Over the API the summary comes back with the error, not a bare 500.
+    def failing_write(user, batch):
+        raise IntegrityError("boom")
+
+    monkeypatch.setattr(importing, "_write_batch", failing_write)
+    r = client.post("/api/notes/import/",
+                    {"file": SimpleUploadedFile("notes.jsonl", jsonl([{"title": "X"}]))}, **auth_header(user))
+    assert r.status_code == 500
+    assert r.json()["next_position"] == 0
+    assert r.json()["stopped"] == {"position": 1, "detail": "boom"}
@@ -1,5 +1,7 @@
 import pytest
-from firstsite.models import Note
+from django.core.management import call_command
+from firstsite.models import Note, RenderedMarkdown
+from firstsite.templatetags import markdown_extras
 from firstsite.templatetags.markdown_extras import markdown_filter
 
 
@@ -63,3 +65,87 @@ def test_note_detail_escapes_html_in_content(auth_client, user):
     r = auth_client.get(f"/notes/{note.pk}/")
     assert r.status_code == 200
     assert b"<script>alert" not in r.content
+
+
+# --- Rendered-HTML cache (LRU + RenderedMarkdown table) ---
+
+@pytest.fixture
+def render_calls(monkeypatch):
+    """Empty the in-process LRU and count real renders."""
+    markdown_extras._lru.clear()
+    calls = []
+    real = markdown_extras.render_markdown
+
+    def counting(text):
+        calls.append(text)
+        return real(text)
+
+    monkeypatch.setattr(markdown_extras, "render_markdown", counting)
+    yield calls
+    markdown_extras._lru.clear()
+
+
+@pytest.mark.django_db
+def test_note_detail_renders_once_then_serves_cache(auth_client, user, render_calls):
+    note = Note.objects.create(owner=user, title="Cached", content="**once**")
+    for _ in range(3):
+        assert b"<strong>once</strong>" in auth_client.get(f"/notes/{note.pk}/").content
+    assert len(render_calls) == 1
+    row = RenderedMarkdown.objects.get(note=note)
+    assert row.digest == markdown_extras.content_digest("**once**")
+
+    # A fresh worker (empty LRU) reads the persistent tier instead of re-rendering.
+    markdown_extras._lru.clear()
+    auth_client.get(f"/notes/{note.pk}/")
+    assert len(render_calls) == 1
+
+
+@pytest.mark.django_db
+def test_content_save_invalidates_rendered_html(auth_client, user, render_calls):
+    note = Note.objects.create(owner=user, title="Edit me", content="old *text*")
+    auth_client.get(f"/notes/{note.pk}/")
+    assert RenderedMarkdown.objects.filter(note=note).exists()
+
+    note.content = "new *text*"
+    note.save()
+    assert not RenderedMarkdown.objects.filter(note=note).exists()
+    assert b"new <em>text</em>" in auth_client.get(f"/notes/{note.pk}/").content
+
+    # Flag-only saves (pin/archive) keep the cached HTML.
+    note.is_pinned = True
+    note.save(update_fields=["is_pinned", "updated_at"])
+    assert RenderedMarkdown.objects.filter(note=note).exists()
+
+
+def test_digest_covers_content_and_config(monkeypatch):
+    base = markdown_extras.content_digest("hello")
+    assert markdown_extras.content_digest("hello!") != base
+    monkeypatch.setattr(markdown_extras, "CONFIG_FINGERPRINT", "other-config")
+    assert markdown_extras.content_digest("hello") != base
+
+
+def test_lru_is_bounded():
+    lru = markdown_extras._LRU(maxsize=2)
+    lru.put("a", "A")
+    lru.put("b", "B")
+    lru.get("a")          # 'a' is now most recently used
+    lru.put("c", "C")     # evicts 'b'
+    assert len(lru) == 2
+    assert lru.get("b") is None
+    assert lru.get("a") == "A" and lru.get("c") == "C"
+
+
+@pytest.mark.django_db
+def test_warm_markdown_cache_command(user, render_calls):
+    a = Note.objects.create(owner=user, title="A", content="# one")
+    b = Note.objects.create(owner=user, title="B", content="# two")
+    RenderedMarkdown.objects.create(note=b, digest="stale", html="<p>old</p>")
+
+    call_command("warm_markdown_cache")
+    assert RenderedMarkdown.objects.get(note=a).html == "<h1>one</h1>"
+    assert RenderedMarkdown.objects.get(note=b).digest == markdown_extras.content_digest("# two")
+
+    # Second run: everything is current, nothing is re-rendered.
+    render_calls.clear()
+    call_command("warm_markdown_cache")
+    assert render_calls == []
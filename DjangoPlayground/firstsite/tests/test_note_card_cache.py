@@ -0,0 +1,62 @@
+import pytest
+from django.core.cache import cache
+from django.test import Client
+
+from firstsite.models import Note
+from firstsite.templatetags.note_cards import CSRF_MARKER, NEXT_MARKER, card_key
+
+
+def _listed(note):
+    note = Note.objects.for_listing().get(pk=note.pk)
+    return note, list(note.tags.all())
+
+
+def cached_card(note):
+    return cache.get(card_key(*_listed(note)))
+
+
+@pytest.mark.django_db
+def test_card_is_cached_without_request_parts(auth_client, note, tag):
+    note.tags.add(tag)
+    response = auth_client.get("/notes/list/?pinned=0")
+    html = cached_card(note)
+    assert html is not None
+    assert CSRF_MARKER in html and NEXT_MARKER in html
+    # the page itself gets the real values
+    body = response.content.decode()
+    assert CSRF_MARKER not in body and NEXT_MARKER not in body
+    assert 'name="next" value="/notes/list/?pinned=0"' in body
+    assert '<span class="chip">Work</span>' in body
+
+
+@pytest.mark.django_db
+def test_cached_card_is_shared_across_sessions(auth_client, note):
+    auth_client.get("/notes/list/")
+    cache.set(card_key(*_listed(note)), cached_card(note).replace("Hello", "From cache"))
+    other = Client()
+    other.login(username="alice", password="pass1234")
+    body = other.get("/notes/list/?page=1").content.decode()
+    assert "From cache" in body
+    # each session's forms carry its own CSRF token
+    assert other.cookies["csrftoken"].value != auth_client.cookies["csrftoken"].value
+
+
+@pytest.mark.django_db
+def test_key_changes_with_note_and_tags(note, tag):
+    first = card_key(*_listed(note))
+    note.tags.add(tag)
+    tagged = card_key(*_listed(note))
+    tag.name = "Home"
+    tag.save()
+    renamed = card_key(*_listed(note))
+    note.title = "Changed"
+    note.save()
+    assert len({first, tagged, renamed, card_key(*_listed(note))}) == 4
+
+
+@pytest.mark.django_db
+def test_htmx_swap_renders_fresh_card(auth_client, note):
+    auth_client.get("/notes/list/")
+    response = auth_client.post(f"/notes/{note.pk}/toggle-pin/", HTTP_HX_REQUEST="true")
+    body = response.content.decode()
+    assert "Unpin" in body and CSRF_MARKER not in body
@@ -0,0 +1,103 @@
+import pytest
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from DjangoPlayground import settings_base
+from firstsite import listcache
+from firstsite.models import Note, Tag
+from firstsite.sending import send_copies
+from firstsite.trash import delete_notes
+
+
+@pytest.fixture(autouse=True)
+def list_cache_on(settings):
+    # Off by default with the tests' locmem cache (settings_base).
+    settings.NOTE_LIST_CACHE_TTL = 300
+
+
+def note_queries(client, url="/notes/list/"):
+    """GET the page; returns (response, number of queries on the note table)."""
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url)
+    assert response.status_code == 200
+    return response, sum('"firstsite_note"' in q["sql"] for q in ctx.captured_queries)
+
+
+@pytest.mark.django_db
+def test_off_by_default_with_a_per_process_cache(auth_client, note, settings):
+    assert settings_base.CACHE_URL == "locmem://" and settings_base.NOTE_LIST_CACHE_TTL == 0
+    settings.NOTE_LIST_CACHE_TTL = settings_base.NOTE_LIST_CACHE_TTL
+    note_queries(auth_client)
+    assert note_queries(auth_client)[1] > 0
+
+
+@pytest.mark.django_db
+def test_repeat_visit_is_served_from_cache(auth_client, note):
+    assert note_queries(auth_client)[1] > 0
+    again, queries = note_queries(auth_client)
+    assert queries == 0
+    assert b'id="note-card-%d"' % note.pk in again.content
+    # other filters are cached separately
+    assert note_queries(auth_client, "/notes/list/?pinned=1")[1] > 0
+
+
+@pytest.mark.django_db
+def test_changes_invalidate_the_page(auth_client, user, note, tag):
+    note_queries(auth_client)
+
+    auth_client.post(f"/notes/{note.pk}/toggle-pin/")
+    response, queries = note_queries(auth_client)
+    assert queries > 0 and b"Unpin" in response.content
+
+    note.tags.add(tag)
+    assert b'<span class="chip">Work</span>' in note_queries(auth_client)[0].content
+
+    tag.name = "Home"
+    tag.save()
+    assert b'<span class="chip">Home</span>' in note_queries(auth_client)[0].content
+
+    auth_client.post(f"/notes/{note.pk}/delete/")
+    assert b"Hello" not in note_queries(auth_client)[0].content
+
+
+@pytest.mark.django_db
+def test_bulk_writers_invalidate_the_page(auth_client, user, note, django_user_model):
+    bob = django_user_model.objects.create_user("bob", password="pass1234")
+    client = Client()
+    client.force_login(bob)
+    assert b"Hello" not in client.get("/notes/list/").content
+    send_copies(note, user, [bob])
+    assert b"Hello" in client.get("/notes/list/").content
+
+    note_queries(auth_client)
+    delete_notes([note.pk])
+    assert b"Hello" not in note_queries(auth_client)[0].content
+
+
+@pytest.mark.django_db
+def test_generation_only_moves_for_its_owner(user, django_user_model):
+    bob = django_user_model.objects.create_user("bob", password="pass1234")
+    mine, bobs = listcache.generation(user.pk), listcache.generation(bob.pk)
+    Note.objects.create(owner=user, title="t", content="c")
+    Tag.objects.create(owner=user, name="x")
+    assert listcache.generation(user.pk) > mine
+    assert listcache.generation(bob.pk) == bobs
+
+
+@pytest.mark.django_db
+def test_entries_per_user_are_bounded(auth_client, note, settings):
+    settings.NOTE_LIST_CACHE_SLOTS = 1
+    note_queries(auth_client, "/notes/list/?pinned=0")
+    note_queries(auth_client, "/notes/list/?pinned=1")
+    # one slot: the second page evicted the first
+    assert note_queries(auth_client, "/notes/list/?pinned=0")[1] > 0
+    assert note_queries(auth_client, "/notes/list/?pinned=0")[1] == 0
+
+
+@pytest.mark.django_db
+def test_new_login_renders_fresh_csrf_tokens(auth_client, note):
+    note_queries(auth_client)
+    auth_client.logout()
+    auth_client.login(username="alice", password="pass1234")
+    assert note_queries(auth_client)[1] > 0
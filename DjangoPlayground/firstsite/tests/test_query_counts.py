@@ -0,0 +1,72 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from firstsite.models import Note, Tag
+
+
+def auth_header(user):
+    token, _ = Token.objects.get_or_create(user=user)
+    return {"HTTP_AUTHORIZATION": f"Token {token.key}"}
+
+
+def _make_notes(user, count, tags_per_note=2, **fields):
+    tags = [Tag.objects.get_or_create(owner=user, name=f"t{i}")[0] for i in range(tags_per_note)]
+    notes = []
+    for i in range(count):
+        note = Note.objects.create(owner=user, title=f"note {i}", content="x", **fields)
+        note.tags.set(tags)
+        notes.append(note)
+    return notes
+
+
+def _count(fn):
+    with CaptureQueriesContext(connection) as ctx:
+        response = fn()
+    assert response.status_code == 200
+    return len(ctx)
+
+
+@pytest.mark.django_db
+def test_note_list_query_count_is_constant(auth_client, user):
+    auth_client.get("/trash/")  # the first request stamps the new session (SessionRefreshMiddleware)
+    _make_notes(user, 2)
+    small = _count(lambda: auth_client.get("/notes/list/"))
+    _make_notes(user, 6)  # fills the 8-card page
+    assert _count(lambda: auth_client.get("/notes/list/")) == small
+
+
+@pytest.mark.django_db
+def test_api_notes_query_count_is_constant(client, user):
+    header = auth_header(user)
+    _make_notes(user, 2)
+    small = _count(lambda: client.get("/api/notes/", **header))
+    _make_notes(user, 10)
+    assert _count(lambda: client.get("/api/notes/", **header)) == small
+
+
+@pytest.mark.django_db
+def test_trash_query_count_is_constant(auth_client, user):
+    auth_client.get("/notes/list/")  # the first request stamps the new session (SessionRefreshMiddleware)
+    _make_notes(user, 2, deleted_at=timezone.now())
+    small = _count(lambda: auth_client.get("/trash/"))
+    _make_notes(user, 10, deleted_at=timezone.now())
+    assert _count(lambda: auth_client.get("/trash/")) == small
+    # No tag prefetch: the Trash page doesn't show tags.
+    with CaptureQueriesContext(connection) as ctx:
+        auth_client.get("/trash/")
+    assert not any("firstsite_note_tags" in q["sql"] for q in ctx.captured_queries)
+
+
+@pytest.mark.django_db
+def test_htmx_card_query_count_does_not_grow_with_tags(auth_client, user):
+    few = _make_notes(user, 1, tags_per_note=1)[0]
+    many = _make_notes(user, 1, tags_per_note=6)[0]
+
+    def toggle(note):
+        return lambda: auth_client.post(f"/notes/{note.pk}/toggle-pin/", HTTP_HX_REQUEST="true")
+
+    toggle(few)()  # warm-up: the first event of the day also creates its rollup row
+    assert _count(toggle(many)) == _count(toggle(few))
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import threading
+
+import pytest
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+
+from firstsite.middleware import (
+    RequestContextFilter,
+    RequestContextMiddleware,
+    get_current_user,
+    get_request_context,
+)
+from firstsite.models import Note, NoteEvent
+
+
+class FakeUser:
+    def __init__(self, username):
+        self.username = username
+
+
+def make_request(username, request_id=None):
+    headers = {"HTTP_X_REQUEST_ID": request_id} if request_id else {}
+    request = RequestFactory().get("/", **headers)
+    request.user = FakeUser(username)
+    return request
+
+
+def test_threads_see_their_own_user():
+    # Both requests are inside their view at the same time (the barrier), on
+    # two threads, as with gunicorn's gthread workers.
+    barrier = threading.Barrier(2)
+    seen = {}
+
+    def view(request):
+        barrier.wait(timeout=5)
+        seen[request.user.username] = (get_current_user().username, get_request_context().request_id)
+        barrier.wait(timeout=5)
+        return HttpResponse()
+
+    middleware = RequestContextMiddleware(view)
+    threads = [
+        threading.Thread(target=middleware, args=(make_request(name, f"id-{name}"),))
+        for name in ("alice", "bob")
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert seen == {"alice": ("alice", "id-alice"), "bob": ("bob", "id-bob")}
+    assert get_request_context() is None
+
+
+def test_interleaved_async_requests_see_their_own_user():
+    # Three requests on one thread, switching at every await: a threading.local
+    # would hand bob's user to alice's second read.
+    seen = {}
+
+    async def view(request):
+        name = request.user.username
+        users = [get_current_user().username]
+        await asyncio.sleep(0)
+        users.append(get_current_user().username)
+        # sync code run for the async view (e.g. signals on an awaited save)
+        users.append(await sync_to_async(lambda: get_current_user().username)())
+        await asyncio.sleep(0)
+        users.append(get_current_user().username)
+        seen[name] = users
+        return HttpResponse()
+
+    middleware = RequestContextMiddleware(view)
+    assert middleware.async_mode
+
+    async def run():
+        return await asyncio.gather(*(middleware(make_request(name)) for name in ("alice", "bob", "carol")))
+
+    responses = asyncio.run(run())
+    assert seen == {name: [name] * 4 for name in ("alice", "bob", "carol")}
+    assert len({r["X-Request-ID"] for r in responses}) == 3
+
+
+def test_request_id_is_kept_or_generated():
+    middleware = RequestContextMiddleware(lambda request: HttpResponse(request.request_id))
+    response = middleware(make_request("alice", "from-proxy-1"))
+    assert response["X-Request-ID"] == "from-proxy-1" == response.content.decode()
+
+    response = middleware(make_request("alice", "bad id\n"))
+    assert response["X-Request-ID"] != "bad id\n"
+    assert len(response["X-Request-ID"]) == 32
+
+
+def test_log_records_carry_the_request():
+    records = []
+
+    def view(request):
+        record = logging.LogRecord("firstsite", logging.WARNING, __file__, 1, "msg", None, None)
+        RequestContextFilter().filter(record)
+        records.append(record)
+        return HttpResponse()
+
+    RequestContextMiddleware(view)(make_request("alice", "req-1"))
+    record = records[0]
+    assert (record.request_id, record.username) == ("req-1", "alice")
+    assert float(record.elapsed_ms) >= 0
+
+    outside = logging.LogRecord("firstsite", logging.WARNING, __file__, 1, "msg", None, None)
+    RequestContextFilter().filter(outside)
+    assert (outside.request_id, outside.username, outside.elapsed_ms) == ("-", "-", "-")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_signals_attribute_interleaved_async_saves_to_the_right_actor():
+    alice = User.objects.create_user("alice", password="pass1234")
+    bob = User.objects.create_user("bob", password="pass1234")
+
+    async def view(request):
+        await asyncio.sleep(0)
+        # No attach_actor: the post_save signal finds the actor in the context.
+        await Note.objects.acreate(owner=request.user, title=request.user.username, content="x")
+        return HttpResponse()
+
+    async def run():
+        middleware = RequestContextMiddleware(view)
+        requests = []
+        for user in (alice, bob, alice, bob):
+            request = RequestFactory().get("/")
+            request.user = user
+            requests.append(middleware(request))
+        await asyncio.gather(*requests)
+
+    asyncio.run(run())
+    events = NoteEvent.objects.filter(action=NoteEvent.ACTION_CREATE)
+    assert sorted((e.actor_username, e.note_title) for e in events) == [
+        ("alice", "alice"), ("alice", "alice"), ("bob", "bob"), ("bob", "bob"),
+    ]
+
+
+@pytest.mark.django_db
+def test_responses_carry_a_request_id(auth_client):
+    r = auth_client.get(reverse("note_lists"), HTTP_X_REQUEST_ID="abc-123")
+    assert (r.status_code, r["X-Request-ID"]) == (200, "abc-123")
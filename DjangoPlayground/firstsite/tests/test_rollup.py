@@ -0,0 +1,77 @@
+import datetime
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from rest_framework.authtoken.models import Token
+
+from firstsite import rollup
+from firstsite.models import Note, NoteEvent, NoteEventDaily
+from firstsite.utils import log_note_event
+
+
+def auth_header(user):
+    token, _ = Token.objects.get_or_create(user=user)
+    return {"HTTP_AUTHORIZATION": f"Token {token.key}"}
+
+
+def _at(day):
+    return datetime.datetime.combine(day, datetime.time(12), tzinfo=datetime.UTC)
+
+
+@pytest.mark.django_db
+def test_logging_events_updates_the_daily_rollup(auth_client, user):
+    # Creating through the view logs 'create' via the post_save signal.
+    auth_client.post("/notes/create/", {"title": "A", "content": "x"})
+    note = Note.objects.get(title="A")
+    log_note_event(user, note, NoteEvent.ACTION_SEND)
+    log_note_event(user, note, NoteEvent.ACTION_SEND)
+
+    rows = {r.action: r.count for r in NoteEventDaily.objects.filter(user=user)}
+    assert rows == {"create": 1, "send": 2}
+    assert rollup.check() == []
+
+
+@pytest.mark.django_db
+def test_buckets_are_summed_from_daily_rows(user):
+    # 2025-01-06 is a Monday; 01-08 same ISO week; 02-03 the next month.
+    for day, n in [(datetime.date(2025, 1, 6), 2), (datetime.date(2025, 1, 8), 3),
+                   (datetime.date(2025, 2, 3), 1)]:
+        for _ in range(n):
+            NoteEvent.objects.create(user=user, action="create", created_at=_at(day))
+
+    assert rollup.series(user, ["create"], "daily") == [
+        ("2025-01-06", "create", 2), ("2025-01-08", "create", 3), ("2025-02-03", "create", 1),
+    ]
+    assert rollup.series(user, ["create"], "weekly") == [
+        ("2025-01-06", "create", 5), ("2025-02-03", "create", 1),
+    ]
+    assert rollup.series(user, ["create"], "monthly") == [
+        ("2025-01-01", "create", 5), ("2025-02-01", "create", 1),
+    ]
+    assert rollup.series(user, ["create"], "yearly") == [("2025-01-01", "create", 6)]
+
+
+@pytest.mark.django_db
+def test_analytics_endpoints_read_the_rollup(client, auth_client, user):
+    NoteEvent.objects.create(user=user, action="create", created_at=_at(datetime.date(2025, 3, 4)))
+    # A stale rollup is what both endpoints report: they never touch the raw table.
+    NoteEventDaily.objects.filter(user=user).update(count=7)
+
+    series = client.get("/api/analytics/notes/?bucket=daily", **auth_header(user)).json()["series"]
+    assert series == {"2025-03-04": {"create": 7}}
+    body = auth_client.get("/analytics/?bucket=daily").content.decode()
+    assert "2025-03-04" in body and "7" in body
+
+
+@pytest.mark.django_db
+def test_rollup_command_backfills_and_checks(user):
+    NoteEvent.objects.create(user=user, action="update")
+    NoteEvent.objects.create(user=user, action="update")
+    NoteEventDaily.objects.all().delete()
+
+    with pytest.raises(CommandError):
+        call_command("rollup_note_events", "--check")
+    call_command("rollup_note_events")
+    call_command("rollup_note_events", "--check")
+    assert NoteEventDaily.objects.get(user=user, action="update").count == 2
@@ -0,0 +1,123 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from rest_framework.authtoken.models import Token
+
+from firstsite import search
+from firstsite.models import Note
+
+
+def auth_header(user):
+    token, _ = Token.objects.get_or_create(user=user)
+    return {"HTTP_AUTHORIZATION": f"Token {token.key}"}
+
+
+def _indexed_ids():
+    with connection.cursor() as cur:
+        cur.execute(f"SELECT rowid FROM {search.FTS_TABLE}")
+        return {row[0] for row in cur.fetchall()}
+
+
+def _search(user, query):
+    qs = search.filter_notes(Note.objects.filter(owner=user), query, with_rank=True)
+    return list(qs.order_by("search_rank").values_list("title", flat=True))
+
+
+@pytest.mark.django_db
+def test_search_matches_title_and_content(user):
+    Note.objects.create(owner=user, title="Groceries", content="milk, eggs")
+    Note.objects.create(owner=user, title="Ideas", content="build a birdhouse")
+    Note.objects.create(owner=user, title="Unrelated", content="nothing here")
+
+    assert _search(user, "groceries") == ["Groceries"]
+    assert _search(user, "birdhouse") == ["Ideas"]
+
+
+@pytest.mark.django_db
+def test_search_is_prefix_and_all_words(user):
+    Note.objects.create(owner=user, title="Project notes", content="kickoff")
+    Note.objects.create(owner=user, title="Project budget", content="numbers")
+
+    # Typing-as-you-go: partial words match, every word must match.
+    assert _search(user, "proj not") == ["Project notes"]
+    assert set(_search(user, "proj")) == {"Project notes", "Project budget"}
+
+
+@pytest.mark.django_db
+def test_search_ranks_more_relevant_notes_first(user):
+    Note.objects.create(owner=user, title="Misc", content="one mention of kafka among many other words here")
+    Note.objects.create(owner=user, title="Kafka", content="kafka kafka kafka")
+
+    assert _search(user, "kafka")[0] == "Kafka"
+
+
+@pytest.mark.django_db
+def test_search_tolerates_query_syntax_characters(user):
+    Note.objects.create(owner=user, title='Say "hi"', content="x")
+    assert _search(user, '"hi" (*') == ['Say "hi"']
+    # No words at all: falls back to a plain substring filter instead of erroring.
+    assert _search(user, '"') == ['Say "hi"']
+
+
+@pytest.mark.django_db
+def test_index_follows_edit_trash_restore_and_purge(auth_client, user):
+    note = Note.objects.create(owner=user, title="Draft", content="alpha")
+    assert _search(user, "alpha") == ["Draft"]
+
+    note.content = "beta"
+    note.save()
+    assert _search(user, "alpha") == []
+    assert _search(user, "beta") == ["Draft"]
+
+    auth_client.post(f"/notes/{note.pk}/delete/")
+    assert note.pk not in _indexed_ids()
+
+    auth_client.post(f"/notes/{note.pk}/restore/")
+    assert note.pk in _indexed_ids()
+
+    auth_client.post(f"/notes/{note.pk}/delete/")
+    auth_client.post(f"/notes/{note.pk}/purge/")
+    assert note.pk not in _indexed_ids()
+
+
+@pytest.mark.django_db
+def test_note_list_and_api_use_the_index(auth_client, client, user):
+    Note.objects.create(owner=user, title="Quarterly report", content="revenue")
+    Note.objects.create(owner=user, title="Shopping", content="apples")
+
+    body = auth_client.get("/notes/list/?search=revenu").content.decode()
+    assert "Quarterly report" in body and "Shopping" not in body
+
+    r = client.get("/api/notes/?search=appl", **auth_header(user))
+    assert r.status_code == 200
+    assert [n["title"] for n in r.json()["results"]] == ["Shopping"]
+
+
+@pytest.mark.django_db
+def test_search_does_not_leak_other_users_notes(auth_client, django_user_model):
+    other = django_user_model.objects.create_user(username="mallory", password="x")
+    Note.objects.create(owner=other, title="Secret plan", content="x")
+    body = auth_client.get("/notes/list/?search=secret").content.decode()
+    assert "Secret plan" not in body
+
+
+@pytest.mark.django_db
+def test_rebuild_search_index_command(user):
+    note = Note.objects.create(owner=user, title="Rebuilt", content="gamma")
+    with connection.cursor() as cur:
+        cur.execute(f"DELETE FROM {search.FTS_TABLE}")
+    assert _search(user, "gamma") == []
+
+    call_command("rebuild_search_index")
+    assert _search(user, "gamma") == ["Rebuilt"]
+    assert _indexed_ids() == {note.pk}
+
+
+@pytest.mark.django_db
+def test_rank_is_only_computed_when_asked_for(user):
+    Note.objects.create(owner=user, title="Groceries", content="milk")
+    plain = search.filter_notes(Note.objects.filter(owner=user), "milk")
+    assert "rank" not in str(plain.query).lower()
+    assert [n.title for n in plain] == ["Groceries"]
+    ranked = search.filter_notes(Note.objects.filter(owner=user), "milk", with_rank=True)
+    assert "rank" in str(ranked.query).lower()
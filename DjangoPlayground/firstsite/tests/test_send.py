@@ -114,3 +114,87 @@ def test_send_note_api_copies_tags_by_name(user):
     assert copy_tags[0].owner == recipient
     assert copy_tags[0].pk != sender_tag.pk
 
+
+
+@pytest.mark.django_db
+def test_copy_tags_is_bulk_and_reuses_recipient_tags(user, django_assert_max_num_queries):
+    from firstsite.utils import copy_tags
+    bob = User.objects.create_user(username="bob", password="pass1234")
+    carol = User.objects.create_user(username="carol", password="pass1234")
+    existing = Tag.objects.create(owner=bob, name="t0")
+    note = Note.objects.create(owner=user, title="Many tags", content="x")
+    note.tags.set([Tag.objects.create(owner=user, name=f"t{i}") for i in range(12)])
+    copies = [Note.objects.create(owner=u, title="copy", content="x") for u in (bob, carol)]
+
+    # source tag names, tag lookup, tag insert, tag re-read, link insert
+    with django_assert_max_num_queries(5):
+        copy_tags(note, copies)
+
+    for copy in copies:
+        tags = list(copy.tags.all())
+        assert sorted(t.name for t in tags) == sorted(f"t{i}" for i in range(12))
+        assert all(t.owner_id == copy.owner_id for t in tags)
+    # bob's existing "t0" was reused, not duplicated
+    assert Tag.objects.filter(owner=bob, name="t0").get().pk == existing.pk
+
+
+@pytest.mark.django_db
+def test_send_api_multiple_recipients_reports_each(client, user):
+    bob = User.objects.create_user(username="bob", password="pass1234")
+    carol = User.objects.create_user(username="carol", password="pass1234")
+    tag = Tag.objects.create(owner=user, name="Team")
+    note = Note.objects.create(owner=user, title="Standup", content="Agenda")
+    note.tags.set([tag])
+
+    r = client.post(
+        f"/api/notes/{note.pk}/send/",
+        data=json.dumps({"recipient_usernames": ["bob", "nobody", "carol", "bob"]}),
+        content_type="application/json",
+        **auth_header(user),
+    )
+    assert r.status_code == 201
+    data = r.json()
+    assert (data["sent"], data["failed"]) == (2, 1)
+    assert [(x["recipient"], x["status"]) for x in data["results"]] == [
+        ("bob", "sent"), ("nobody", "failed"), ("carol", "sent"),
+    ]
+    for recipient, result in ((bob, data["results"][0]), (carol, data["results"][2])):
+        copy = Note.objects.get(pk=result["copy_id"])
+        assert copy.owner == recipient and copy.content == "Agenda"
+        assert [(t.name, t.owner_id) for t in copy.tags.all()] == [("Team", recipient.pk)]
+        # same bookkeeping as a single send: NoteSend, 'send' on the original, 'create' on the copy
+        assert NoteSend.objects.filter(original_note=note, sender=user, recipient=recipient).count() == 1
+        assert NoteEvent.objects.filter(user=user, note=copy, action=NoteEvent.ACTION_CREATE).count() == 1
+    assert NoteEvent.objects.filter(user=user, note=note, action=NoteEvent.ACTION_SEND).count() == 2
+
+
+@pytest.mark.django_db
+def test_send_api_multiple_recipients_all_unknown(client, user):
+    note = Note.objects.create(owner=user, title="X", content="Y")
+    r = client.post(
+        f"/api/notes/{note.pk}/send/",
+        data=json.dumps({"recipient_usernames": ["ghost"]}),
+        content_type="application/json",
+        **auth_header(user),
+    )
+    assert r.status_code == 400
+    assert r.json()["results"][0]["status"] == "failed"
+    assert not NoteSend.objects.exists()
+
+
+@pytest.mark.django_db
+def test_send_note_html_to_several_users(auth_client, user):
+    User.objects.create_user(username="bob", password="pass1234")
+    User.objects.create_user(username="carol", password="pass1234")
+    note = Note.objects.create(owner=user, title="Team note", content="x")
+
+    r = auth_client.post(f"/notes/{note.pk}/send/", data={"recipient_username": "bob, carol"})
+    assert r.status_code == 302
+    assert set(Note.objects.filter(title="Team note").exclude(owner=user)
+               .values_list("owner__username", flat=True)) == {"bob", "carol"}
+
+    # an unknown name rejects the whole form, nothing is sent
+    r = auth_client.post(f"/notes/{note.pk}/send/", data={"recipient_username": "bob, ghost"})
+    assert r.status_code == 200
+    assert "No such user: ghost." in r.content.decode()
+    assert NoteSend.objects.filter(original_note=note).count() == 2
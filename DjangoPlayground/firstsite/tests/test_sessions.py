@@ -0,0 +1,74 @@
+import time
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from firstsite.middleware import SESSION_REFRESHED_KEY
+
+
+def session_writes(client, n=5):
+    with CaptureQueriesContext(connection) as ctx:
+        for _ in range(n):
+            assert client.get("/notes/list/").status_code == 200
+    return sum(q["sql"].startswith("UPDATE") and "django_session" in q["sql"] for q in ctx.captured_queries)
+
+
+def login(client, remember):
+    data = {"username": "alice", "password": "pass1234"}
+    if remember:
+        data["remember_me"] = "on"
+    assert client.post("/accounts/login/", data).status_code == 302
+
+
+@pytest.mark.django_db
+def test_fresh_session_is_not_rewritten(client, user):
+    login(client, remember=True)
+    assert session_writes(client) == 0
+
+
+@pytest.mark.django_db
+def test_old_behaviour_with_fraction_one(client, user, settings):
+    settings.SESSION_REFRESH_FRACTION = 1.0
+    login(client, remember=True)
+    assert session_writes(client) == 5
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("remember", [True, False])
+def test_session_past_the_threshold_is_refreshed(client, user, settings, remember):
+    login(client, remember=remember)
+    session = client.session
+    lifetime = settings.SESSION_COOKIE_AGE
+    # 60% of the lifetime used: less than half left, so the next request refreshes
+    session[SESSION_REFRESHED_KEY] = int(time.time()) - int(lifetime * 0.6)
+    session.save()
+
+    response = client.get("/notes/list/")
+    assert abs(client.session[SESSION_REFRESHED_KEY] - time.time()) < 5
+    cookie = response.cookies[settings.SESSION_COOKIE_NAME]
+    if remember:
+        # still a persistent cookie, pushed out to a full lifetime
+        assert cookie["max-age"] == lifetime
+    else:
+        # still a browser-session cookie
+        assert cookie["max-age"] == "" and cookie["expires"] == ""
+    assert session_writes(client) == 0
+
+
+@pytest.mark.django_db
+def test_signed_cookie_sessions(client, user, settings):
+    settings.SESSION_ENGINE = "django.contrib.sessions.backends.signed_cookies"
+    login(client, remember=True)
+    response = client.get("/notes/list/")
+    assert response.status_code == 200
+    assert settings.SESSION_COOKIE_NAME not in response.cookies
+
+
+@pytest.mark.django_db
+def test_bench_sessions_command(capsys):
+    call_command("bench_sessions", "--requests", "3")
+    out = capsys.readouterr().out
+    assert "every request: 1.00 session row writes/request" in out
+    assert "fraction=0.5: 0.00 session row writes/request" in out
@@ -0,0 +1,28 @@
+import re
+
+from django.core.management import call_command
+
+from DjangoPlayground.settings_base import sqlite_options
+
+
+def test_default_profile_leaves_sqlite_alone():
+    assert sqlite_options("default") == {}
+
+
+def test_production_profile(monkeypatch):
+    monkeypatch.setenv("SQLITE_BUSY_TIMEOUT_MS", "2500")
+    options = sqlite_options("production")
+    assert options["transaction_mode"] == "IMMEDIATE"
+    assert options["init_command"].split(";") == [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA mmap_size=268435456",
+        "PRAGMA cache_size=-32000",
+        "PRAGMA busy_timeout=2500",
+    ]
+
+
+def test_stress_production_profile_has_no_lock_errors(capsys):
+    call_command("stress_sqlite", "--profile", "production", "--writers", "4", "--readers", "2", "--ops", "25")
+    out = capsys.readouterr().out
+    assert re.search(r"production: 100 writes committed, 0 lock errors, write p50=[\d.]+ ms p99=[\d.]+ ms", out)
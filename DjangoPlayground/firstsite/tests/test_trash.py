@@ -107,3 +107,96 @@ def test_cannot_trash_or_restore_other_users_note(auth_client, django_user_model
     note.save(update_fields=["deleted_at"])
     assert auth_client.post(f"/notes/{note.pk}/restore/").status_code == 404
     assert auth_client.post(f"/notes/{note.pk}/purge/").status_code == 404
+
+
+# --- set-based purge (trash.py) / purge_trash command ---
+
+def _trashed(user, title, days_ago=0):
+    note = Note.all_objects.create(owner=user, title=title, content="x")
+    Note.all_objects.filter(pk=note.pk).update(deleted_at=timezone.now() - timezone.timedelta(days=days_ago))
+    return note
+
+
+@pytest.mark.django_db
+def test_empty_trash_cleans_up_related_rows(auth_client, user, tag, django_user_model):
+    from firstsite.models import NoteSend, NoteShare, NoteVersion, RenderedMarkdown
+    from firstsite.versioning import snapshot_note
+    bob = django_user_model.objects.create_user("bob", password="pass1234")
+    note = Note.objects.create(owner=user, title="Busy", content="v1")
+    note.tags.add(tag)
+    for text in ("v2", "v3"):
+        snapshot_note(note, user)
+        note.content = text
+        note.save()
+    NoteShare.objects.create(note=note, shared_by=user, shared_with=bob)
+    send = NoteSend.objects.create(original_note=note, sender=user, recipient=bob)
+    RenderedMarkdown.objects.create(note=note, digest="d", html="<p>v3</p>")
+    auth_client.post(f"/notes/{note.pk}/delete/")
+    event_ids = list(NoteEvent.objects.filter(note=note).values_list("pk", flat=True))
+    assert event_ids
+
+    auth_client.post("/trash/empty/")
+
+    assert not Note.all_objects.filter(pk=note.pk).exists()
+    assert not NoteVersion.objects.filter(note_id=note.pk).exists()
+    assert not NoteShare.objects.filter(note_id=note.pk).exists()
+    assert not RenderedMarkdown.objects.filter(note_id=note.pk).exists()
+    assert not Note.tags.through.objects.filter(note_id=note.pk).exists()
+    send.refresh_from_db()
+    assert send.original_note_id is None
+    # event history is kept, just unlinked; the tag itself survives
+    assert NoteEvent.objects.filter(pk__in=event_ids, note__isnull=True).count() == len(event_ids)
+    assert type(tag).objects.filter(pk=tag.pk).exists()
+
+
+@pytest.mark.django_db
+def test_purge_notes_batches_and_skips_live_notes(user):
+    from firstsite import trash
+    live = Note.objects.create(owner=user, title="Live", content="x")
+    doomed = [_trashed(user, f"T{i}") for i in range(5)]
+    batches = []
+
+    purged = trash.purge_notes(Note.all_objects.filter(owner=user), batch_size=2, on_batch=batches.append)
+
+    assert purged == 5
+    assert batches == [2, 4, 5]
+    assert Note.objects.filter(pk=live.pk).exists()
+    assert not Note.all_objects.filter(pk__in=[n.pk for n in doomed]).exists()
+
+
+@pytest.mark.django_db
+def test_note_restored_before_its_batch_keeps_everything(user, tag):
+    # purge_notes read the id while the note was trashed; it was restored
+    # before its batch ran. Nothing of it may be deleted.
+    from firstsite import search, trash
+    from firstsite.models import NoteShare, NoteVersion
+    from firstsite.versioning import snapshot_note
+    note = Note.objects.create(owner=user, title="Comeback", content="v1")
+    note.tags.add(tag)
+    snapshot_note(note, user)
+    NoteShare.objects.create(note=note, shared_by=user, shared_with=user)
+    stale_ids = [note.pk]  # as selected while trashed
+
+    assert trash.delete_notes(stale_ids, trashed_only=True) == 0
+
+    assert Note.objects.filter(pk=note.pk).exists()
+    assert NoteVersion.objects.filter(note_id=note.pk).exists()
+    assert NoteShare.objects.filter(note_id=note.pk).exists()
+    assert list(note.tags.all()) == [tag]
+    assert [n.pk for n in search.filter_notes(Note.objects.all(), "Comeback")] == [note.pk]
+
+
+@pytest.mark.django_db
+def test_purge_trash_command_expires_old_notes_only(user):
+    from django.core.management import call_command
+    old = _trashed(user, "Old", days_ago=40)
+    recent = _trashed(user, "Recent", days_ago=5)
+    live = Note.objects.create(owner=user, title="Live", content="x")
+
+    call_command("purge_trash", "--older-than", "30", "--dry-run")
+    assert Note.all_objects.filter(pk=old.pk).exists()
+
+    call_command("purge_trash", "--older-than", "30", "--batch-size", "1")
+    assert not Note.all_objects.filter(pk=old.pk).exists()
+    assert Note.all_objects.filter(pk=recent.pk).exists()
+    assert Note.objects.filter(pk=live.pk).exists()
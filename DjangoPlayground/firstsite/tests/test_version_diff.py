@@ -1,4 +1,7 @@
 import pytest
+from django.core.cache import cache
+
+from firstsite import diffing
 from firstsite.models import Note, NoteVersion
 
 
@@ -37,3 +40,63 @@ def test_version_diff_rejects_other_users_note(auth_client, django_user_model):
     version = NoteVersion.objects.create(note=note, title="secret", content="secret", updated_by=other)
     r = auth_client.get(f"/notes/{note.pk}/versions/{version.pk}/diff/")
     assert r.status_code == 404
+
+
+# --- diff engine (diffing.py) ---
+
+
+def _flatten(rows):
+    out = []
+    for row in rows:
+        out.extend(row["rows"] if row["kind"] == "skip" else [row])
+    return out
+
+
+def test_diff_engine_reproduces_both_sides():
+    old = "a\nb\nc\nd\ne"
+    new = "a\nc\nd\nX\ne\nf"
+    rows = _flatten(diffing.diff_lines(old, new)["rows"])
+    assert [r["text"] for r in rows if r["kind"] != "add"] == old.split("\n")
+    assert [r["text"] for r in rows if r["kind"] != "del"] == new.split("\n")
+    assert [r["text"] for r in rows if r["kind"] == "del"] == ["b"]
+    assert [r["text"] for r in rows if r["kind"] == "add"] == ["X", "f"]
+
+
+def test_diff_engine_collapses_long_unchanged_runs():
+    lines = [f"line {i}" for i in range(100)]
+    new = list(lines)
+    new[50] = "changed"
+    result = diffing.diff_lines("\n".join(lines), "\n".join(new))
+    skips = [r for r in result["rows"] if r["kind"] == "skip"]
+    assert [s["count"] for s in skips] == [50 - diffing.CONTEXT, 49 - diffing.CONTEXT]
+    assert not result["coarse"]
+
+
+def test_diff_engine_falls_back_to_coarse_over_budget(monkeypatch):
+    monkeypatch.setattr(diffing, "MAX_LINES", 10)
+    old = "\n".join(f"l{i}" for i in range(20))
+    new = old.replace("l5", "five")
+    result = diffing.diff_lines(old, new)
+    assert result["coarse"]
+    rows = _flatten(result["rows"])
+    assert [r["text"] for r in rows if r["kind"] != "add"] == old.split("\n")
+
+
+@pytest.mark.django_db
+def test_version_diff_is_cached_per_version_and_note_update(auth_client, user, monkeypatch):
+    cache.clear()
+    calls = []
+    real = diffing.diff_lines
+    monkeypatch.setattr("firstsite.views.diff_lines", lambda a, b: calls.append(1) or real(a, b))
+
+    note = Note.objects.create(owner=user, title="T", content="new")
+    version = NoteVersion.objects.create(note=note, title="T", content="old", updated_by=user)
+    url = f"/notes/{note.pk}/versions/{version.pk}/diff/"
+    auth_client.get(url)
+    auth_client.get(url)
+    assert len(calls) == 1
+
+    note.content = "newer"
+    note.save()
+    assert "newer" in auth_client.get(url).content.decode()
+    assert len(calls) == 2
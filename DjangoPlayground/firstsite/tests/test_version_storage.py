@@ -0,0 +1,129 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.db.models import RestrictedError
+from rest_framework.authtoken.models import Token
+
+from firstsite import versioning
+from firstsite.models import Note, NoteVersion
+
+
+def auth_header(user):
+    token, _ = Token.objects.get_or_create(user=user)
+    return {"HTTP_AUTHORIZATION": f"Token {token.key}"}
+
+
+def _long_text(n=60, edited=None):
+    lines = [f"paragraph {i}: the quick brown fox jumps over the lazy dog" for i in range(n)]
+    if edited is not None:
+        lines[edited] = f"paragraph {edited}: EDITED"
+    return "\n".join(lines) + "\n"
+
+
+def _edit_history(user, edits=12):
+    """Snapshot a long note `edits` times, changing one line each time."""
+    note = Note.objects.create(owner=user, title="Long", content=_long_text())
+    texts = []
+    for i in range(edits):
+        texts.append(note.content)
+        versioning.snapshot_note(note, user)
+        note.content = _long_text(edited=i)
+        note.save()
+    return note, texts
+
+
+@pytest.mark.parametrize("old,new", [
+    ("", "a\nb\n"),
+    ("a\nb\nc", "a\nc\nd"),
+    ("no newline", "no newline\n"),
+    ("x\r\ny\r\n", "x\r\nz\r\n"),
+    ("same\n", "same\n"),
+])
+def test_delta_roundtrip(old, new):
+    assert versioning.apply_delta(old, versioning.make_delta(old, new)) == new
+
+
+@pytest.mark.django_db
+def test_snapshots_store_keyframes_and_deltas(user, settings):
+    settings.NOTE_VERSION_KEYFRAME_INTERVAL = 5
+    note, texts = _edit_history(user, edits=12)
+
+    versions = list(note.versions.order_by("id"))
+    assert [v.is_delta for v in versions] == [False, True, True, True, True] * 2 + [False, True]
+    for v in versions:
+        if v.is_delta:
+            assert v.content == ""
+            assert len(v.delta) < len(texts[0]) // 4
+
+    # Fresh instances rebuild the exact text.
+    for v, text in zip(note.versions.order_by("id"), texts):
+        assert v.full_content == text
+
+
+@pytest.mark.django_db
+def test_full_mode_stores_complete_copies(user, settings):
+    settings.NOTE_VERSION_STORAGE = "full"
+    note, texts = _edit_history(user, edits=3)
+    assert [v.content for v in note.versions.order_by("id")] == texts
+
+
+@pytest.mark.django_db
+def test_readers_see_full_content(auth_client, client, user):
+    note, texts = _edit_history(user, edits=3)
+    delta = note.versions.order_by("id")[2]
+    assert delta.is_delta
+
+    r = client.get(f"/api/notes/{note.pk}/versions/{delta.pk}/", **auth_header(user))
+    assert r.json()["content"] == texts[2]
+    listed = client.get(f"/api/notes/{note.pk}/versions/", **auth_header(user)).json()["results"]
+    assert sorted(v["content"] for v in listed) == sorted(texts)
+
+    body = auth_client.get(f"/notes/{note.pk}/versions/{delta.pk}/diff/").content.decode()
+    assert "paragraph 1: EDITED" in body  # in the current note only -> shown as added
+
+    auth_client.post(f"/notes/{note.pk}/versions/{delta.pk}/restore/")
+    note.refresh_from_db()
+    assert note.content == texts[2]
+
+
+@pytest.mark.django_db
+def test_compact_command_converts_and_preserves_history(user, settings):
+    settings.NOTE_VERSION_STORAGE = "full"
+    note, texts = _edit_history(user, edits=8)
+    full_size = sum(versioning.stored_size(v) for v in note.versions.all())
+
+    call_command("compact_note_versions", "--mode", "delta")
+    versions = list(note.versions.order_by("id"))
+    assert sum(v.is_delta for v in versions) == 7
+    assert sum(versioning.stored_size(v) for v in versions) < full_size / 3
+    assert [NoteVersion.objects.get(pk=v.pk).full_content for v in versions] == texts
+
+    call_command("compact_note_versions", "--mode", "full")
+    assert [v.content for v in note.versions.order_by("id")] == texts
+
+
+@pytest.mark.django_db
+def test_deleting_a_version_keeps_the_rest_of_the_history(user, admin_client):
+    note, texts = _edit_history(user, edits=15)
+    versions = list(note.versions.order_by("id"))
+    middle = versions[4]
+    assert any(v.base_id == middle.pk for v in versions)
+
+    with pytest.raises(RestrictedError):
+        middle.delete()
+
+    r = admin_client.post(f"/admin/firstsite/noteversion/{middle.pk}/delete/", {"post": "yes"})
+    assert r.status_code == 302
+    left = list(note.versions.order_by("id"))
+    assert [v.pk for v in left] == [v.pk for v in versions if v.pk != middle.pk]
+    assert [NoteVersion.objects.get(pk=v.pk).full_content for v in left] == texts[:4] + texts[5:]
+    assert sum(v.is_delta for v in left) > 0
+
+    versioning.delete_versions(left[:2])
+    assert [v.full_content for v in note.versions.order_by("id")] == texts[2:4] + texts[5:]
+
+
+def test_delta_is_compact_json():
+    ops = json.loads(versioning.make_delta("a\nb\nc\n", "a\nB\nc\n"))
+    assert ops == [1, -1, ["B\n"], 1]
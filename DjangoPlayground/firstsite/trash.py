@@ -0,0 +1,99 @@
+"""
+Set-based permanent deletion of trashed notes.
+
+`note.delete()` runs Django's collector per note: it loads every related
+version/share/tag link, cascades them one relation at a time and sends
+pre/post_delete for each object, so emptying a big trash was thousands of
+queries in one request. `purge_notes` instead deletes in batches of note ids,
+each batch in its own short transaction, with one statement per table:
+
+- NoteVersion, NoteShare, RenderedMarkdown, tag links: deleted (CASCADE);
+- NoteSend.original_note, NoteEvent.note: set to NULL (SET_NULL);
+- the notes themselves, then their rows in the search index;
+- a NoteTombstone per note, for delta-sync clients (sync.py);
+- a new list-cache generation for the owners (listcache.py).
+
+No model signals are sent. The post_delete receivers for Note are the event
+logger (trash purges are silent anyway, see `_suppress_event`), the search
+index, the tombstone writer and the list cache, all handled here directly. If a new relation to Note is
+added, it needs a line in `delete_notes` too.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import listcache, search, sync
+from .models import Note, NoteEvent, NoteSend, NoteShare, NoteVersion, RenderedMarkdown
+
+BATCH_SIZE = 500
+
+
+def delete_notes(ids, trashed_only=False):
+    """
+    Permanently delete the notes with these ids in one go (see the module
+    docstring). Returns the number of notes deleted. Callers pass a bounded
+    list; `purge_notes` batches for you.
+
+    The notes are locked and re-selected first, and every child table is
+    cleared only for the ids that are left. With `trashed_only`, a note
+    restored since its id was read is therefore left whole: versions, tags,
+    shares and search entry included.
+    """
+    with transaction.atomic():
+        notes = Note.all_objects.select_for_update().filter(pk__in=list(ids))
+        if trashed_only:
+            # A note restored since it was selected must survive.
+            notes = notes.filter(deleted_at__isnull=False)
+        rows = list(notes.values_list('pk', 'owner_id'))
+        if not rows:
+            return 0
+        ids = [pk for pk, _ in rows]
+        sync.record_tombstones(rows)
+        # _raw_delete: a single DELETE ... WHERE, skipping the collector. Safe
+        # because nothing else points at these rows (versions only point at
+        # versions of the same note, which go in the same statement).
+        for qs in (
+            NoteVersion.objects.filter(note_id__in=ids),
+            NoteShare.objects.filter(note_id__in=ids),
+            RenderedMarkdown.objects.filter(note_id__in=ids),
+            Note.tags.through.objects.filter(note_id__in=ids),
+        ):
+            qs._raw_delete(qs.db)
+        NoteSend.objects.filter(original_note_id__in=ids).update(original_note=None)
+        NoteEvent.objects.filter(note_id__in=ids).update(note=None)
+        notes = Note.all_objects.filter(pk__in=ids)
+        deleted = notes._raw_delete(notes.db)
+        search.remove_notes(ids)
+        listcache.bump_many(owner_id for _, owner_id in rows)
+    return deleted
+
+
+def purge_notes(queryset, batch_size=BATCH_SIZE, on_batch=None):
+    """
+    Permanently delete the trashed notes in `queryset` (live notes in it are
+    left alone), `batch_size` at a time. Returns the number deleted.
+    `on_batch(total_so_far)` is called after each committed batch.
+    """
+    queryset = queryset.filter(deleted_at__isnull=False)
+    total = 0
+    last_id = 0
+    while True:
+        # Walk by id so a note that can't be deleted can't stall the loop.
+        ids = list(
+            queryset.filter(pk__gt=last_id)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return total
+        last_id = ids[-1]
+        total += delete_notes(ids, trashed_only=True)
+        if on_batch is not None:
+            on_batch(total)
+
+
+def expired(days, now=None):
+    """Trashed notes (any owner) whose deleted_at is more than `days` days ago."""
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+    return Note.all_objects.filter(deleted_at__isnull=False, deleted_at__lt=cutoff)
@@ -1,6 +1,6 @@
 from django.urls import path
 from firstsite import views as v
-from firstsite import api
+from firstsite import api, api_async
 
 
 urlpatterns = [
@@ -46,6 +46,10 @@ urlpatterns = [
     path('api/notes/', api.api_user_notes, name='api_user_notes'), # API endpoint to get user notes
     path('api/analytics/notes/', api.api_note_analytics, name='api_note_analytics'),
     #path('api/notes/create/', api_user_notes, name='api_create_note'), # API endpoint to create a new note
+    path('api/notes/batch/', api.api_notes_batch, name='api_notes_batch'),
+    path('api/notes/changes/', api.api_note_changes, name='api_note_changes'),
+    path('api/notes/export/', api.api_notes_export, name='api_notes_export'),
+    path('api/notes/import/', api.api_notes_import, name='api_notes_import'),
     path('api/notes/<int:pk>/', api.api_note_detail, name='api_note_detail'), # API endpoint to get a specific note
     path('api/notes/<int:pk>/send/', api.api_note_send, name='api_note_send'), 
     path('api/notes/<int:pk>/versions/', api.api_note_versions, name='api_note_versions'),
@@ -56,6 +60,12 @@ urlpatterns = [
     
     # API tag endpoints
     path('api/tags/', api.api_list_tags, name='api_list_tags'), # API endpoint to list all tags
+    # Async (ASGI) variants of the read-only endpoints above, see api_async.py.
+    path('api/async/notes/', api_async.api_user_notes, name='api_async_user_notes'),
+    path('api/async/notes/<int:pk>/', api_async.api_note_detail, name='api_async_note_detail'),
+    path('api/async/inbox/', api_async.api_inbox_list, name='api_async_inbox'),
+    path('api/async/sent/', api_async.api_sent_list, name='api_async_sent'),
+    path('api/async/analytics/notes/', api_async.api_note_analytics, name='api_async_note_analytics'),
 
     # Analytics endpoint
     path('analytics/', v.analytics_view, name='analytics'), # View for analytics
@@ -1,23 +1,59 @@
 from typing import Any
 from django.contrib.auth.models import AnonymousUser
-from .models import NoteEvent, Tag
+from django.db import transaction
+from django.utils import timezone
+from .events import get_event_sink
+from .models import Note, NoteEvent, Tag
 
 
-def copy_tags_for_recipient(note: Any, copy: Any, recipient: Any) -> None:
+def resolve_tags(owner_ids: Any, names: Any) -> dict:
     """
-    Attach tags to a sent-note copy without leaking the sender's Tag rows.
+    Return {(owner_id, name): Tag} for every owner x name pair, creating the
+    missing Tags in bulk: one lookup, one INSERT, and one re-read of the rows
+    just created (bulk_create(ignore_conflicts=True) doesn't return their pks,
+    and a concurrent request may have created some of them first).
+    """
+    owner_ids, names = set(owner_ids), set(names)
+    if not owner_ids or not names:
+        return {}
+    found = {
+        (t.owner_id, t.name): t
+        for t in Tag.objects.filter(owner_id__in=owner_ids, name__in=names)
+    }
+    missing = [(o, n) for o in owner_ids for n in names if (o, n) not in found]
+    if missing:
+        Tag.objects.bulk_create(
+            [Tag(owner_id=o, name=n) for o, n in missing], ignore_conflicts=True
+        )
+        for t in Tag.objects.filter(
+            owner_id__in={o for o, _ in missing}, name__in={n for _, n in missing}
+        ):
+            found.setdefault((t.owner_id, t.name), t)
+    return found
+
+
+def copy_tags(note: Any, copies: Any) -> None:
+    """
+    Attach tags to copies of `note` (e.g. sent-note copies) without leaking
+    the sender's Tag rows.
 
     `copy.tags.set(note.tags.all())` would attach the *sender's* Tag rows to
     the recipient's note, which the recipient can't see or manage (tag views
-    filter by owner) and which breaks their `?untagged=1` filter. Instead,
-    get_or_create a same-named Tag owned by the recipient for each tag on the
-    original note, and attach those.
+    filter by owner) and which breaks their `?untagged=1` filter. Instead each
+    copy gets same-named Tags owned by the copy's owner, created if missing
+    (see resolve_tags). Copies may belong to different users; the tag links
+    for all of them go in with a single INSERT.
     """
-    tags = [
-        Tag.objects.get_or_create(owner=recipient, name=tag.name)[0]
-        for tag in note.tags.all()
-    ]
-    copy.tags.set(tags)
+    copies = [c for c in copies if c.pk is not None]
+    names = {tag.name for tag in note.tags.all()}
+    if not copies or not names:
+        return
+    tags = resolve_tags({c.owner_id for c in copies}, names)
+    Link = Note.tags.through
+    Link.objects.bulk_create(
+        [Link(note_id=c.pk, tag_id=tags[(c.owner_id, name)].pk) for c in copies for name in names],
+        ignore_conflicts=True,
+    )
 
 
 def attach_actor(instance: Any, user: Any) -> None:
@@ -28,11 +64,11 @@ def attach_actor(instance: Any, user: Any) -> None:
     if user and not isinstance(user, AnonymousUser):
         setattr(instance, '_actor', user)
 
-def log_note_event(user: Any, note: Any, action: str) -> NoteEvent | None:
+def build_note_event(user: Any, note: Any, action: str) -> NoteEvent:
     """
-    Central function that audit events.
-    - Stores FKs (user/note) but also denormalized snapshots (actor_username, note_title)
-      so analytics survive deletions/renames.
+    An unsaved NoteEvent with the denormalized snapshots (actor_username,
+    note_title) filled in. log_note_event saves one; bulk paths collect them
+    for bulk_create + rollup.record_events.
     """
     username =  None
     if user and not isinstance(user, AnonymousUser):
@@ -42,10 +78,30 @@ def log_note_event(user: Any, note: Any, action: str) -> NoteEvent | None:
     if note is not None:
         title = getattr(note, 'title', None)
     
-    return NoteEvent.objects.create(
+    return NoteEvent(
         user=user if username else None,
         note=note if note else None,
         actor_username=username,
         note_title=title,
         action=action,
-    )
\ No newline at end of file
+        created_at=timezone.now(),  # event time, not flush time
+    )
+
+def log_note_event(user: Any, note: Any, action: str) -> NoteEvent | None:
+    """
+    Central function that audit events.
+    - Stores FKs (user/note) but also denormalized snapshots (actor_username, note_title)
+      so analytics survive deletions/renames.
+    - With NOTE_EVENT_SINK="buffered" the event is queued and written later in
+      bulk (see events.py); the returned instance is then not saved yet, and
+      inside a transaction it is only queued if that transaction commits.
+    """
+    event = build_note_event(user, note, action)
+    sink = get_event_sink()
+    if sink is None:
+        event.save()
+    else:
+        # Queued once the surrounding transaction (if any) commits; written
+        # synchronously instead if the buffer is full.
+        transaction.on_commit(lambda: sink.emit(event) or event.save())
+    return event
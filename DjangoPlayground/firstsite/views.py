@@ -1,6 +1,5 @@
-import difflib
-
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import login
@@ -9,10 +8,14 @@ from django.views.decorators.http import require_POST
 from django.core.paginator import Paginator
 from django.utils.dateparse import parse_date
 from django.utils import timezone
-from django.db.models import Q, Count
-from django.db.models.functions import TruncDay, TruncWeek, TruncMonth, TruncYear
-from .utils import attach_actor, log_note_event, copy_tags_for_recipient
+from django.db.models import Q
+from .utils import attach_actor, log_note_event
+from .versioning import snapshot_note, resolve_many
+from .diffing import diff_lines
+from .conditional import conditional, note_page_validators
 from .models import Note, NoteVersion, Tag, NoteSend, NoteEvent, NoteShare
+from . import search as note_search
+from . import caching, listcache, rollup, sending, trash
 from .forms import NoteForm, TagForm, SendNoteForm, ShareNoteForm
 
 # HTML (server-rendered) views. DRF API views live in api.py.
@@ -56,6 +59,13 @@ def home(request):
 # View to list notes for the logged-in user. Render a template with the notes.
 @login_required
 def note_lists_view(request):
+    # The filters + cards are cached per user until their notes or tags change (listcache.py)
+    content = listcache.cached_page(request, lambda: render_to_string(
+        'firstsite/note_list_content.html', _note_list_context(request), request))
+    return render(request, 'firstsite/note_list.html', {'content': content})
+
+
+def _note_list_context(request):
     # Query params
     tag_id = request.GET.get('tag')                 # e.g. ?tag=3
     untagged = request.GET.get('untagged') == '1'   # e.g. ?untagged=1
@@ -63,8 +73,8 @@ def note_lists_view(request):
     pinned = request.GET.get('pinned')              # '1', '0', or None
     archived = request.GET.get('archived')          # '1', '0', or None
 
-    # Base queryset: only current user's notes
-    notes = Note.objects.filter(owner=request.user)
+    # Base queryset: only current user's notes (tags prefetched for the cards)
+    notes = Note.objects.filter(owner=request.user).for_listing()
 
     # Tag filtering (exclusive with untagged)
     if tag_id:
@@ -84,11 +94,11 @@ def note_lists_view(request):
     elif archived == '0':
         notes = notes.filter(is_archived=False)
     
-    # Search filtering
+    # Search filtering (full-text index, see search.py)
     if search:
-        notes = notes.filter(
-            Q(title__icontains=search) | Q(content__icontains=search)
-        )
+        # The rank is only computed when the results are ordered by it.
+        ranked = (request.GET.get('sort') or 'relevance') == 'relevance'
+        notes = note_search.filter_notes(notes, search, with_rank=ranked)
 
     # ---- Date range filtering ----
     # Choose which field to filter: updated_at (default) or created_at
@@ -108,18 +118,23 @@ def note_lists_view(request):
         notes = notes.filter(**{f'{target_field}__date__lte': to_date})
 
 
-    # ---- Sorting (defaults: updated description) ----
-    sort = request.GET.get('sort', 'updated')   # 'updated' | 'created' | 'title'
+    # ---- Sorting (defaults: relevance when searching, else updated description) ----
+    # 'relevance' | 'updated' | 'created' | 'title'
+    sort = request.GET.get('sort') or ('relevance' if search else 'updated')
     direction = request.GET.get('dir', 'desc')  # 'asc' | 'desc'
     field_map = {
         'updated': 'updated_at',
         'created': 'created_at',
         'title':   'title',
     }
-    order_field = field_map.get(sort, 'updated_at')
-    prefix = '' if direction == 'asc' else '-'
     # Keep pinned notes first; then apply chosen ordering
-    notes = notes.order_by('-is_pinned', f'{prefix}{order_field}').distinct()
+    if sort == 'relevance' and search:
+        # search_rank is lower-is-better on every backend; ties go to the newest edit
+        notes = notes.order_by('-is_pinned', 'search_rank', '-updated_at').distinct()
+    else:
+        order_field = field_map.get(sort, 'updated_at')
+        prefix = '' if direction == 'asc' else '-'
+        notes = notes.order_by('-is_pinned', f'{prefix}{order_field}').distinct()
 
 
     # Paginate the notes shown, 8 per page.
@@ -144,13 +159,13 @@ def note_lists_view(request):
         'querystring': querystring,
         'notes':page_obj.object_list,  # the notes for the current page
     }
-    return render(request, 'firstsite/note_list.html', ctx)
+    return ctx
 
 # Toggle pin status of a note
 @login_required
 @require_POST
 def note_toggle_pin(request, pk):
-    note = get_object_or_404(Note, pk=pk, owner=request.user)
+    note = get_object_or_404(Note.objects.for_listing(), pk=pk, owner=request.user)
     note.is_pinned = not note.is_pinned
     attach_actor(note, request.user)
     note.save(update_fields=['is_pinned', 'updated_at'])
@@ -166,7 +181,7 @@ def note_toggle_pin(request, pk):
 @login_required
 @require_POST
 def note_toggle_archive(request, pk):
-    note = get_object_or_404(Note, pk=pk, owner=request.user)
+    note = get_object_or_404(Note.objects.for_listing(), pk=pk, owner=request.user)
     note.is_archived = not note.is_archived
     attach_actor(note, request.user)
     note.save(update_fields=['is_archived', 'updated_at'])
@@ -176,6 +191,7 @@ def note_toggle_archive(request, pk):
     return redirect(request.POST.get('next') or 'note_lists')
 
 @login_required
+@conditional(note_page_validators)  # ETag/Last-Modified -> 304 (see conditional.py)
 def note_detail_view(request, pk):
     # Owner OR a user the note has been shared with may view it.
     note = get_object_or_404(
@@ -183,7 +199,8 @@ def note_detail_view(request, pk):
         pk=pk,
     )
     is_owner = note.owner_id == request.user.id
-    versions = note.versions.order_by('-timestamp') if is_owner else NoteVersion.objects.none()
+    versions = list(note.versions.order_by('-timestamp')) if is_owner else []
+    resolve_many(versions)  # rebuild delta-stored versions in one query
     shares = note.shares.select_related('shared_with').order_by('shared_with__username') if is_owner else None
     my_share = None if is_owner else note.shares.get(shared_with=request.user)
     return render(request, 'firstsite/note_detail.html', {
@@ -229,12 +246,7 @@ def note_update_view(request, pk):
         form = NoteForm(request.POST, instance=note, user=request.user)
         if form.is_valid():
             # Snapshot current state before updating (versioning)
-            NoteVersion.objects.create(
-                note=note,
-                title=note.title,
-                content=note.content,
-                updated_by=request.user,
-            )
+            snapshot_note(note, request.user)
             # signal who made the change
             attach_actor(note, user=request.user)
             form.save()  # saves fields + m2m
@@ -268,6 +280,7 @@ def note_delete_view(request, pk):
 # Trash: list soft-deleted notes
 @login_required
 def trash_list_view(request):
+    # trash.html shows no tags, so nothing to prefetch.
     notes = Note.all_objects.filter(
         owner=request.user, deleted_at__isnull=False
     ).order_by("-deleted_at")
@@ -302,11 +315,8 @@ def note_purge(request, pk):
 @login_required
 @require_POST
 def trash_empty(request):
-    count = 0
-    for note in Note.all_objects.filter(owner=request.user, deleted_at__isnull=False):
-        note._suppress_event = True
-        note.delete()
-        count += 1
+    # Set-based, batched delete (see trash.py); like single purges, logs no event.
+    count = trash.purge_notes(Note.all_objects.filter(owner=request.user))
     messages.success(request, f"Trash emptied ({count} note{'s' if count != 1 else ''} deleted).")
     return redirect("trash")
 
@@ -317,40 +327,30 @@ def note_restore_version(request, pk, version_id):
     note = get_object_or_404(Note, pk=pk, owner=request.user)
     version =  get_object_or_404(NoteVersion, pk=version_id, note=note)
     # Snapshot current state before restoring (so we don't lose it)
-    NoteVersion.objects.create(
-        note=note,
-        title=note.title,
-        content=note.content,
-        updated_by=request.user,
-    )
+    snapshot_note(note, request.user)
 
     # Restore the note's content from the selected version
     note.title = version.title
-    note.content = version.content
+    note.content = version.full_content
     attach_actor(note, request.user)
     note.save(update_fields=['title', 'content', 'updated_at'])
     messages.success(request, "Version restored.")
     return redirect("note_detail", pk=note.pk)
 
 # Show what changed between a saved version and the current note.
-def _diff_rows(old_text, new_text):
+DIFF_CACHE_TIMEOUT = 60 * 60 * 24
+
+def _cached_diff(note, version):
     """
-    Build a line-by-line diff between two blocks of text.
-    Returns a list of {'kind': 'add'|'del'|'same', 'text': str} for the template.
+    Line diff (see diffing.py) of a version against the current note. Versions
+    never change, so (version id, note.updated_at) fully identifies the result
+    and repeat views skip the diff entirely.
     """
-    old_lines = (old_text or "").splitlines()
-    new_lines = (new_text or "").splitlines()
-    rows = []
-    for line in difflib.ndiff(old_lines, new_lines):
-        tag, text = line[:2], line[2:]
-        if tag == '+ ':
-            rows.append({'kind': 'add', 'text': text})
-        elif tag == '- ':
-            rows.append({'kind': 'del', 'text': text})
-        elif tag == '  ':
-            rows.append({'kind': 'same', 'text': text})
-        # '? ' hint lines from ndiff are intentionally skipped
-    return rows
+    key = caching.make_key("note-diff", version.pk, note.updated_at.isoformat())
+    return caching.get_or_compute(
+        key, lambda: diff_lines(version.full_content, note.content),
+        timeout=DIFF_CACHE_TIMEOUT, namespace="note-diff",
+    )
 
 @login_required
 def note_version_diff(request, pk, version_id):
@@ -359,11 +359,13 @@ def note_version_diff(request, pk, version_id):
     """
     note = get_object_or_404(Note, pk=pk, owner=request.user)
     version = get_object_or_404(NoteVersion, pk=version_id, note=note)
+    diff = _cached_diff(note, version)
     ctx = {
         'note': note,
         'version': version,
         'title_changed': version.title != note.title,
-        'content_rows': _diff_rows(version.content, note.content),
+        'content_rows': diff['rows'],
+        'coarse_diff': diff['coarse'],
     }
     return render(request, 'firstsite/note_diff.html', ctx)
 
@@ -417,35 +419,23 @@ def tag_delete_view(request, pk):
 def note_send_view(request, pk):
     """
     HTML flow:
-    - GET: show a small form to enter recipient username
-    - POST: validate, copy the note to recipient (including tags), log send event
+    - GET: show a small form to enter recipient username(s)
+    - POST: validate, copy the note to each recipient (including tags), log send events
     """
     note = get_object_or_404(Note, pk=pk, owner=request.user)
     if request.method == "POST":
         form = SendNoteForm(request.POST)
         if form.is_valid():
 
-            # SendNoteForm.clean_recipient_username validates and returns the User.
-            recipient = form.cleaned_data['recipient_username']
-
-            # Create a copy of the note for the recipient.
-            copy = Note(
-                title = note.title,
-                content = note.content,
-                owner =  recipient,
-                is_pinned = False,
-                is_archived = False,
-            )
-            attach_actor(copy, request.user)
-            copy.save()
-            # Copy tags by name into the recipient's own tags (not the sender's Tag rows).
-            copy_tags_for_recipient(note, copy, recipient)
+            # SendNoteForm.clean_recipient_username validates and returns the Users.
+            recipients = form.cleaned_data['recipient_username']
 
-            # Log send action
-            NoteSend.objects.create(original_note=note, sender=request.user, recipient=recipient)
-            log_note_event(request.user, note, NoteEvent.ACTION_SEND)
+            # One copy per recipient, with tags copied by name into each
+            # recipient's own tags; sends and events are logged in bulk.
+            sending.send_copies(note, request.user, recipients)
 
-            messages.success(request, f"Note sent to {recipient.username}.")
+            names = ", ".join(r.username for r in recipients)
+            messages.success(request, f"Note sent to {names}.")
             return redirect("note_detail", pk=note.pk)
     else:
         form = SendNoteForm()
@@ -546,32 +536,15 @@ def analytics_view(request):
     allowed = {'create', 'update', 'delete', 'send'}
     actions = [a for a in actions if a in allowed] or ['create', 'update', 'delete', 'send']
 
-    # Map bucket to trunc function
-    trunc_map = {
-        'daily': TruncDay('created_at'),
-        'weekly': TruncWeek('created_at'),
-        'monthly': TruncMonth('created_at'),
-        'yearly': TruncYear('created_at'),
-    }
-    trunc = trunc_map.get(bucket, TruncDay('created_at'))
-    if bucket not in trunc_map:
+    if bucket not in rollup.BUCKETS:
         bucket = 'daily'
-    
-    #aggregate NoteEvents
-    qs = (NoteEvent.objects
-        .filter(user=request.user, action__in=actions)
-        .annotate(period=trunc)
-        .values('period','action')
-        .annotate(count=Count('id'))
-        .order_by('period')
-        )
 
+    # aggregate from the daily rollup (see rollup.py)
     # assemble a consistent structure for rendering
     per_period = {}
-    for row in qs:
-        period_key = row['period'].date().isoformat()
+    for period_key, action, count in rollup.series(request.user, actions, bucket):
         per_period.setdefault(period_key, {a: 0 for a in actions})
-        per_period[period_key][row['action']] = row['count']
+        per_period[period_key][action] = count
 
     periods = sorted(per_period.keys())  
 
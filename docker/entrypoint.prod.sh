@@ -1,7 +1,13 @@
 #!/bin/sh
 # Apply migrations (creates the schema on the persistent volume on first run),
 # then start gunicorn. Static files were already collected at build time.
+# APP_SERVER=asgi runs the ASGI app on uvicorn workers instead (needed for the
+# async views under /api/async/, see firstsite/api_async.py); the default is
+# the WSGI app on gunicorn's sync workers.
 set -e
 
 python manage.py migrate --noinput
+if [ "$APP_SERVER" = "asgi" ]; then
+    exec gunicorn DjangoPlayground.asgi:application -k uvicorn_worker.UvicornWorker --bind 0.0.0.0:8000
+fi
 exec gunicorn DjangoPlayground.wsgi:application --bind 0.0.0.0:8000